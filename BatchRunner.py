@@ -0,0 +1,181 @@
+"""
+Headless batch runner: maps x modes x seeds x truck counts, one SUMO per worker process.
+Every cell runs SUMO with its own --output-prefix, so the outputs the map's files
+name with a shared relative path (e.g. detector_aggregated_output.xml) are not
+overwritten by the cells running at the same time.
+
+Example:
+    python BatchRunner.py --maps Nantes --modes all --seeds 1 2 3 --trucks 100 500 --workers 4
+"""
+import argparse
+import csv
+import itertools
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+ALL_MODES = [f"Mode{a}{b}{c}" for a, b, c in itertools.product("01", repeat=3)]
+DEFAULT_SUMO_BINARY = "sumo"
+# warmup: warm-up time asked for; warmup_used: time simulated before the fork (clamped to the first
+# truck departure, 0 if skipped, empty when the cell resumed from its own checkpoint)
+SUMMARY_FIELDS = ["map", "mode", "seed", "trucks", "status", "wall_time_s", "steps", "exited", "warmup", "warmup_used",
+                  "results_dir"]
+
+
+def instance_name(seed, nb_trucks):
+    return f"seed{seed}_trk{nb_trucks}"
+
+
+def instance_dir(map_name, seed, nb_trucks):
+    return os.path.join("cases", map_name, "instances", instance_name(seed, nb_trucks))
+
+
+def cell_results_dir(map_name, mode, seed, nb_trucks):
+    suffix = instance_name(seed, nb_trucks) if nb_trucks is not None else f"seed{seed}"
+    return os.path.join("cases", map_name, "results", mode, suffix)
+
+
+def prepare_warmup(job):
+    """Worker: builds the shared warm-up state of one instance before its mode cells run."""
+    import warmup
+    map_name, seed, nb_trucks, warmup_seconds, sumo_binary, backend = job
+    warmup.ensure(map_name, warmup_seconds, seed=seed,
+                  instance_dir=instance_dir(map_name, seed, nb_trucks) if nb_trucks is not None else None,
+                  sumo_binary=sumo_binary, backend=backend)
+    return job
+
+
+def cell_output_prefix(mode, seed, nb_trucks):
+    suffix = instance_name(seed, nb_trucks) if nb_trucks is not None else f"seed{seed}"
+    return f"{mode}_{suffix}_"
+
+
+def run_cell(cell):
+    """Worker: runs one simulation in its own process with its own headless SUMO."""
+    import Starter
+    map_name, mode, seed, nb_trucks = cell["map"], cell["mode"], cell["seed"], cell["trucks"]
+    results_dir = cell_results_dir(map_name, mode, seed, nb_trucks)
+    os.makedirs(results_dir, exist_ok=True)
+    row = dict(cell, status="error", wall_time_s=0.0, steps=0, exited=0, warmup_used=None, results_dir=results_dir)
+    begin = time.perf_counter()
+    try:
+        summary = Starter.run_simulation(
+            map_name, mode, simulation_end_seconds=cell["end"],
+            sumo_binary=cell["sumo_binary"],
+            instance_dir=instance_dir(map_name, seed, nb_trucks) if nb_trucks is not None else None,
+            results_dir=results_dir, seed=seed,
+            label=f"{map_name}_{mode}_{os.path.basename(results_dir)}",
+            monitor=False, backend=cell["backend"],
+            checkpoint_every=cell.get("checkpoint_every"), resume=cell.get("resume", False),
+            warmup_seconds=cell.get("warmup"), profile=cell.get("profile", False),
+            record_trace=cell.get("record_trace", False),
+            output_prefix=cell_output_prefix(mode, seed, nb_trucks))
+        if summary:
+            row.update(status="ok", steps=summary["steps"], exited=summary["exited"], warmup_used=summary["warmup"])
+    except Exception as e:
+        print(f"ERROR in batch cell {cell}: {e}")
+        traceback.print_exc()
+    row["wall_time_s"] = round(time.perf_counter() - begin, 2)
+    return row
+
+
+def build_cells(maps, modes, seeds, trucks, end, sumo_binary, backend, checkpoint_every=None, resume=False,
+                warmup=None, profile=False, record_trace=False):
+    return [{"map": m, "mode": mode, "seed": seed, "trucks": n, "end": end,
+             "sumo_binary": sumo_binary, "backend": backend,
+             "checkpoint_every": checkpoint_every, "resume": resume, "warmup": warmup, "profile": profile,
+             "record_trace": record_trace}
+            for m, mode, seed, n in itertools.product(maps, modes, seeds, trucks)]
+
+
+def write_summary(rows):
+    """Prints the summary table and writes cases/<map>/results/batch_summary.csv per map."""
+    print("\n" + " ".join(f"{field:>12}" for field in SUMMARY_FIELDS[:-1]))
+    for row in rows:
+        print(" ".join(f"{str(row[field]):>12}" for field in SUMMARY_FIELDS[:-1]))
+    for map_name in sorted({row["map"] for row in rows}):
+        summary_path = os.path.join("cases", map_name, "results", "batch_summary.csv")
+        os.makedirs(os.path.dirname(summary_path), exist_ok=True)
+        with open(summary_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS, delimiter=";", extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(row for row in rows if row["map"] == map_name)
+        print(f"Saved: {summary_path}")
+
+
+def run_batch(maps, modes, seeds, trucks=None, end=None, workers=None,
+              sumo_binary=DEFAULT_SUMO_BINARY, vehicle_type="Truck", backend="traci",
+              checkpoint_every=None, resume=False, warmup=None, profile=False, record_trace=False):
+    """
+    Runs every cell of the matrix and returns the summary rows.
+    Args:
+        trucks (list): Truck counts; an instance is generated per (map, seed, count).
+                       None runs the instance already present in each map folder.
+        checkpoint_every (int): Checkpoint period in steps for every cell (see checkpoint.py).
+        resume (bool): Restart each cell from its latest checkpoint; existing instances are kept.
+        warmup (int): Warm-up time in seconds shared by all modes of an instance (see warmup.py).
+        profile (bool): Write a per-phase <mode>_Profile.csv next to each cell's reports.
+        record_trace (bool): Record each cell's truck states to <mode>_Trace.bin (see state_trace.py).
+    """
+    truck_counts = trucks or [None]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        if trucks and not resume:
+            import Creator
+            for map_name in maps:
+                # Seeded and generated in parallel, the map files parsed once per map
+                specs = [(seed, n, instance_dir(map_name, seed, n)) for seed, n in itertools.product(seeds, trucks)]
+                for out_dir in Creator.createInstances(map_name, specs, vehicle_type, workers):
+                    print(f"Instance ready: {map_name} {os.path.basename(out_dir)}")
+
+        if warmup:
+            jobs = [(m, seed, n, warmup, sumo_binary, backend)
+                    for m, seed, n in itertools.product(maps, seeds, truck_counts)]
+            for job in pool.map(prepare_warmup, jobs):
+                print(f"Warm-up ready: {job[0]} seed={job[1]} trucks={job[2]}")
+
+        cells = build_cells(maps, modes, seeds, truck_counts, end, sumo_binary, backend, checkpoint_every, resume,
+                            warmup, profile, record_trace)
+        print(f"Running {len(cells)} cells on {workers or os.cpu_count()} workers...")
+        rows = []
+        futures = [pool.submit(run_cell, cell) for cell in cells]
+        for future in as_completed(futures):
+            row = future.result()
+            print(f"Cell done: {row['map']} {row['mode']} seed={row['seed']} trucks={row['trucks']} "
+                  f"-> {row['status']} in {row['wall_time_s']}s")
+            rows.append(row)
+
+    rows.sort(key=lambda r: (r["map"], r["mode"], r["seed"], r["trucks"] or 0))
+    write_summary(rows)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a headless scenario sweep.")
+    parser.add_argument("--maps", nargs="+", default=["Nantes"])
+    parser.add_argument("--modes", nargs="+", default=["all"], help="Launch modes, or 'all' for Mode000..Mode111")
+    parser.add_argument("--seeds", nargs="+", type=int, default=[42])
+    parser.add_argument("--trucks", nargs="+", type=int, default=None,
+                        help="Truck counts (generates one instance per map/seed/count)")
+    parser.add_argument("--end", type=int, default=None, help="Simulation end time in seconds")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--sumo-binary", default=DEFAULT_SUMO_BINARY)
+    parser.add_argument("--vehicle-type", default="Truck", choices=["Truck", "MissionVehicle"])
+    parser.add_argument("--backend", default="traci", choices=["traci", "libsumo"],
+                        help="libsumo runs SUMO in-process (no GUI, no socket)")
+    parser.add_argument("--checkpoint-every", type=int, default=None, help="Checkpoint period in steps")
+    parser.add_argument("--resume", action="store_true", help="Restart each cell from its latest checkpoint")
+    parser.add_argument("--warmup", type=int, default=None,
+                        help="Warm-up time in seconds, simulated once per instance and shared by all modes")
+    parser.add_argument("--profile", action="store_true", help="Per-phase step timings and TraCI call counts")
+    parser.add_argument("--record-trace", action="store_true", help="Record truck states for state_trace.py replays")
+    args = parser.parse_args()
+
+    modes = ALL_MODES if args.modes == ["all"] else args.modes
+    run_batch(args.maps, modes, args.seeds, args.trucks, args.end, args.workers,
+              args.sumo_binary, args.vehicle_type, args.backend, args.checkpoint_every, args.resume, args.warmup, args.profile,
+              args.record_trace)
+
+
+if __name__ == "__main__":
+    main()
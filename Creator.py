@@ -1,13 +1,15 @@
 import Starter
 import myPyLib
 import xml.etree.ElementTree as ET
-from random import randint
-from xml.dom import minidom
 import random
 import xml.dom
 from decimal import Decimal
 import os
-import sumolib
+from concurrent.futures import ProcessPoolExecutor
+import bulk_generation
+import map_metadata
+import net_cache
+import xml_stream
 # from libsumo.libsumo import vehicle
 
 inputs = []
@@ -19,77 +21,93 @@ routes = []
 
 mapName = "Nantes"
 
-
-def sortchildrenby(parent, attr):
-    parent[:] = sorted(parent, key=lambda child: float(child.get(attr)))
-
-
-def is_route_possible(net, from_edge_id, to_edge_id):
-    fromEdge = net.getEdge(from_edge_id)
-    toEdge = net.getEdge(to_edge_id)
-
-    if fromEdge and toEdge:
-        route = net.getShortestPath(fromEdge, toEdge)
-        return route is not None
-    else:
-        return False
-
-
-def injectionTraffic(mapName, nbTrucks, vehicle_type):
-
-    net = sumolib.net.readNet('cases/' + mapName + '/MyNetwork.net.xml')
-    meta = myPyLib.readMeta(mapName, nbTrucks)
-    inputs = meta[0]
-    outputs = meta[1]
-    missions = meta[2]
-    parkings = meta[3]
-    stops = meta[4]
-    routes = meta[5]
-    '''for i in meta:
-        print(i)
-   
-    meta[]
-    0 inputs=[]
-    1 outputs=[]
-    2 missions=[]
-    3 parkings=[]
-    4 stops=[]
-    5 routes=[]'''
-
-    injectionTraffic = myPyLib.randomList(missions, nbTrucks)
-
-    print(injectionTraffic)
-    id = 1
-    script = ""
-
-    '''1 Creation des vehicules'''
-    print("reading ..."+'cases/'+mapName+'/myRoutes.rou.xml'+" -->> inRoot")
-    inRoot = ET.parse('cases/'+mapName+'/myRoutes.rou.xml').getroot()
-
-    '''2 recuperer les anciens vehicules'''
-    vehRoot = ET.Element("routes")
-    for veh in inRoot:
+# Contexte partage par les workers de createInstances (voir _initWorker)
+_workerContext = None
+
+
+def is_route_possible(routeTable, from_edge_id, to_edge_id):
+    # Table lookup, see net_cache.load_route_table
+    return routeTable.reachable(from_edge_id, to_edge_id)
+
+
+def loadRouteTable(mapName, meta):
+    '''
+    :param meta: map_metadata.MapMetadata of the map
+    :return: net_cache.RouteTable between the inputs, outputs, stops, parkings and route ends, or None
+    '''
+    points = list(meta.inputs) + list(meta.outputs)
+    points += [p.edge for p in meta.parkings] + [s.edge for s in meta.stops]
+    for edges in meta.routes:
+        if edges:
+            points += [edges[0], edges[-1]]
+    try:
+        return net_cache.load_route_table(mapName, points, net_cache.TRUCK_VCLASS)
+    except (OSError, ImportError) as e:
+        print("Warning: no route table for " + mapName + " (" + str(e) + "), routes are not validated")
+        return None
+
+
+def unreachableLegs(routeTable, startEdge, mission):
+    '''
+    Checks that every leg of a truck (route start -> action edges) is drivable.
+    :return: list of (from edge, to edge) that cannot be reached
+    '''
+    unreachable = []
+    previousEdge = startEdge
+    for action in mission:
+        edge = action.get("edge")
+        if previousEdge is not None and not is_route_possible(routeTable, previousEdge, edge):
+            unreachable.append((previousEdge, edge))
+        previousEdge = edge
+    return unreachable
+
+
+def draw(rng, sequence):
+    '''
+    Picks an element with a single rng.random(): index = int(u * n).
+    Every draw of an instance uses rng.random(), in block order (departs, routes,
+    mission types, action targets), so the sequence only depends on the seed.
+    '''
+    return sequence[int(rng.random() * len(sequence))]
+
+
+def drawDeparts(rng, nbTrucks):
+    '''Departs in [0, nbTrucks*120], sorted'''
+    span = nbTrucks * 120 + 1
+    return sorted(int(rng.random() * span) for i in range(nbTrucks))
+
+
+def loadMapContext(mapName):
+    '''
+    Parses what every instance of a map needs, once: metadata, route table and
+    background vehicles. The result is handed to the generation workers.
+    '''
+    meta = map_metadata.load(mapName)
+    return {"map": mapName, "meta": meta, "routeTable": loadRouteTable(mapName, meta),
+            "background": backgroundVehicles(mapName)}
+
+
+def backgroundVehicles(mapName):
+    '''Non-truck vehicles of cases/<map>/myRoutes.rou.xml, sorted by depart'''
+    print("reading ..."+'cases/'+mapName+'/myRoutes.rou.xml')
+    vehicles = []
+    for event, veh in ET.iterparse('cases/'+mapName+'/myRoutes.rou.xml', events=("end",)):
         if veh.tag == "vehicle":
             veh_id = veh.get("id")
             if veh_id and not veh_id.startswith("trk"):
-                vehRoot.append(veh)
+                vehicles.append(veh)
+    vehicles.sort(key=lambda veh: float(veh.get("depart")))
+    return vehicles
 
-    '''3 creation et tri des departs'''
-    departs = []
-    for i in range(nbTrucks):
-        departs.append(randint(0, nbTrucks*120))
-    departs.sort()
-    print("depart=" + str(departs))
 
-    id = 1  # initialize before loop
+def truckVehicles(nbTrucks, vehicle_type, departs, routes, truckStarts):
+    '''Yields the trucks in depart order, recording each start edge in truckStarts
+    :param routes: route of each truck (tuples of edges), already drawn
+    '''
+    for id in range(1, nbTrucks + 1):
+        edge_list = routes[id - 1]  # tuple of edges
 
-    while id <= nbTrucks:
-        # Randomly pick one safe predefined route
-        selected_route = random.choice(routes)  # routes loaded from MetaData
-        edge_list = selected_route.split()  # split string into list of edges
-
-        # Now create the vehicle and assign this route
-        vehicle = ET.SubElement(vehRoot, "vehicle")
+        vehicle = ET.Element("vehicle")
         vehicle.set("id", "trk" + str(id))
         vehicle.set("color", "255,0,0")
         vehicle.set("type", vehicle_type)
@@ -97,117 +115,168 @@ def injectionTraffic(mapName, nbTrucks, vehicle_type):
 
         route_elem = ET.SubElement(vehicle, "route")
         route_elem.set("edges", " ".join(edge_list))
-        print(f"✅ Added vehicle {vehicle.get('id')} with route {edge_list}")
-
-        id += 1
-
-    ''' 5 Trier inRoot '''
-    sortchildrenby(vehRoot, 'depart')
-    ET.dump(vehRoot)
-
-    ''' 6 fusion avec outRoot'''
-    outRoot = ET.Element("routes")
-    # if(inRoot.findtext("vType")==None):
-
-    vType = ET.SubElement(outRoot, "vType")
-    vType.set("id", vehicle_type)
-
-    if vehicle_type == "Truck":
-        vType.set("vClass", "trailer")
-        vType.set("guiShape", "truck")
-    else:  # MissionVehicle
-        vType.set("vClass", "passenger")
-        vType.set("guiShape", "passenger")
-        vType.set("color", "0,0,255")
-        vType.set("accel", "2.6")
-        vType.set("decel", "4.5")
-        vType.set("length", "4.5")
-        vType.set("maxSpeed", "25")
-
-    for veh in vehRoot:
-        outRoot.append(veh)
-
-    '''7 formatage et sauvegarde'''
-    dom = minidom.parseString(ET.tostring(
-        outRoot, encoding="unicode", method=None))
-    formated = dom.toprettyxml(indent="  ", newl="")
-    f = open("cases/"+mapName+"/MyRoutes.rou.xml", "w")
-    f.write(formated)
-
-    " Supprimer les lignes vides "
-
-    f.close()
-    return outRoot
-
+        truckStarts[vehicle.get("id")] = edge_list[0] if edge_list else None
+        yield vehicle
+
+
+def injectionTraffic(mapName, nbTrucks, vehicle_type, out_dir=None, indent="  ", rng=None, context=None):
+    '''
+    Writes MyRoutes.rou.xml: background vehicles and trucks merged in depart order,
+    streamed to disk one vehicle at a time.
+    :param rng: random.Random of the instance (default: the global random module)
+    :param context: loadMapContext(mapName), to reuse already parsed map files
+    :return: dict truck id -> first edge of its route
+    '''
+    rng = rng or random
+    context = context or {}
+    metaRoutes = (context.get("meta") or map_metadata.load(mapName)).routes
+
+    '''1 recuperer les anciens vehicules'''
+    background = context.get("background")
+    if background is None:
+        background = backgroundVehicles(mapName)
+
+    '''2 creation et tri des departs, puis choix des routes (routes sures de MetaData)'''
+    departs = drawDeparts(rng, nbTrucks)
+    routes = [draw(rng, metaRoutes) for i in range(nbTrucks)]
+
+    '''3 fusion triee et ecriture'''
+    truckStarts = {}
+    filePath = os.path.join(out_dir or "cases/"+mapName, "MyRoutes.rou.xml")
+    with xml_stream.XMLStreamWriter(filePath, "routes", indent=indent) as writer:
+        xml_stream.write_vtype(writer, vehicle_type)
+        trucks = truckVehicles(nbTrucks, vehicle_type, departs, routes, truckStarts)
+        for veh in xml_stream.merge_by_depart(background, trucks):
+            writer.write(veh)
+    print("MyRoutes.rou.xml: " + str(len(background)) + " background vehicles, " + str(nbTrucks) + " trucks -> " + filePath)
+    return truckStarts
+
+
+def createAction(kind, outputs, parkings, stops, rng=random):
+    pAction = ET.Element("action")
+    if kind == "L":
+        pAction.set("type", "Load")
+        rdmStop = draw(rng, stops)
+        pAction.set("target", rdmStop.name)
+        pAction.set("edge", rdmStop.edge)
+    elif kind == "U":
+        pAction.set("type", "Unload")
+        rdmStop = draw(rng, stops)
+        pAction.set("target", rdmStop.name)
+        pAction.set("edge", rdmStop.edge)
+    elif kind == "P":
+        pAction.set("type", "Park")
+        rdmParking = draw(rng, parkings)
+        pAction.set("target", rdmParking.name)
+        pAction.set("edge", rdmParking.edge)
+    elif kind == "G":
+        pAction.set("type", "Go")
+        output = draw(rng, outputs)
+        pAction.set("target", output)
+        pAction.set("edge", output)
+    else:
+        return None
+    pAction.set("status", "0")
+    return pAction
 
-def createMissions(mapName, nbTrucks, traffic):
 
+def createMissions(mapName, nbTrucks, traffic, out_dir=None, indent="  ", rng=None, context=None):
+    '''
+    Writes missions.mis.xml one mission at a time, in truck (depart) order.
+    :param traffic: dict truck id -> first route edge, as returned by injectionTraffic
+    :param rng, context: as for injectionTraffic
+    '''
     print("Creating " + str(nbTrucks) + " missions")
-    missionRoot = ET.Element("Missions")
-    missionsList = []
-
-    meta = myPyLib.readMeta(mapName, nbTrucks)
-    inputs = meta[0]
-    outputs = meta[1]
-    missions = meta[2]
-    parkings = meta[3]
-    stops = meta[4]
-    routes = meta[5]
-
-    i = 0
-    for trk in range(nbTrucks):  # traffic.findall("vehicle"):
-        # if trk.get("id").contains("trk"):
-        newMission = random.choice(missions)
-        missionsList.append(newMission)
-        # print(missionsList)
-        # missionRoot.append(newMission)
-        pmission = ET.SubElement(missionRoot, "mission")
-        pmission.set("id", "trk" + str(i + 1))
-        pmission.set("type", newMission)
-
-        for j in range(len(newMission)):
-            pAction = ET.SubElement(pmission, "action")
-
-            if newMission[j] == "L":
-                pAction.set("type", "Load")
-                rdmStop = random.choice(stops)
-                pAction.set("target", rdmStop["name"])
-                pAction.set("edge", rdmStop["edge"])
-                pAction.set("status", "0")
-            elif newMission[j] == "U":
-                pAction.set("type", "Unload")
-                rdmStop = random.choice(stops)
-                pAction.set("target", rdmStop["name"])
-                pAction.set("edge", rdmStop["edge"])
-                pAction.set("status", "0")
-            elif newMission[j] == "P":
-                pAction.set("type", "Park")
-                rdmParking = random.choice(parkings)
-                pAction.set("target", rdmParking.get('name'))
-                pAction.set("edge", rdmParking.get('edge'))
-                pAction.set("status", "0")
-            elif newMission[j] == "G":
-                pAction.set("type", "Go")
-                output = random.choice(outputs)
-                pAction.set("target", output)
-                pAction.set("edge", output)
-                pAction.set("status", "0")
-        i += 1
-
-    f = open('cases/'+mapName+"/missions.mis.xml", "w")
-    # , parser).parse("data/output.xml") # or xml.dom.minidom.parseString(xml_string)
-    dom = minidom.parseString(ET.tostring(missionRoot, encoding="unicode"))
-    missionFormated = dom.toprettyxml(indent="  ", newl="\n")
-    # print(missionFormated)
-    f.write(missionFormated)
-
-
-def create(mapName, nbTrucks, vehicle_type):
+
+    rng = rng or random
+    context = context or {}
+    meta = context.get("meta") or map_metadata.load(mapName)
+    outputs = meta.outputs
+    missions = meta.missions
+    parkings = meta.parkings
+    stops = meta.stops
+
+    routeTable = context["routeTable"] if "routeTable" in context else loadRouteTable(mapName, meta)
+    unreachable = []
+
+    '''types de mission de tous les camions, puis les cibles des actions'''
+    missionTypes = [draw(rng, missions) for i in range(nbTrucks)]
+
+    filePath = os.path.join(out_dir or 'cases/'+mapName, "missions.mis.xml")
+    with xml_stream.XMLStreamWriter(filePath, "Missions", indent=indent) as writer:
+        for i in range(nbTrucks):
+            newMission = missionTypes[i]
+            pmission = ET.Element("mission")
+            pmission.set("id", "trk" + str(i + 1))
+            pmission.set("type", newMission)
+            for kind in newMission:
+                pAction = createAction(kind, outputs, parkings, stops, rng)
+                if pAction is not None:
+                    pmission.append(pAction)
+
+            if routeTable is not None:
+                for fromEdge, toEdge in unreachableLegs(routeTable, traffic.get(pmission.get("id")), pmission):
+                    unreachable.append((pmission.get("id"), fromEdge, toEdge))
+            writer.write(pmission)
+
+    if routeTable is not None:
+        print(str(len(unreachable)) + " unreachable mission legs")
+        for trkId, fromEdge, toEdge in unreachable[:10]:
+            print("  " + trkId + ": no route from " + fromEdge + " to " + toEdge)
+
+
+def create(mapName, nbTrucks, vehicle_type, out_dir=None, seed=None, context=None, bulk=None):
+    '''
+    :param out_dir: folder receiving MyRoutes.rou.xml and missions.mis.xml (default: the map folder)
+    :param seed: seed of the instance; the same seed gives the same files. None uses the global random module
+    :param context: loadMapContext(mapName), to reuse already parsed map files
+    :param bulk: vectorized generation (bulk_generation, same files); None = for seeded instances
+    '''
     print("Welcome to Instance Creator ")
     print("..creating "+str(nbTrucks)+'trucks on the map "'+mapName+'"')
     # create()
-    traffic = injectionTraffic(mapName, nbTrucks, vehicle_type)
-    createMissions(mapName, nbTrucks, traffic)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    if bulk is None:
+        bulk = seed is not None
+    if bulk:
+        bulk_generation.create(mapName, nbTrucks, vehicle_type, out_dir, seed=seed, context=context)
+        return
+    rng = random.Random(seed) if seed is not None else random
+    traffic = injectionTraffic(mapName, nbTrucks, vehicle_type, out_dir, rng=rng, context=context)
+    createMissions(mapName, nbTrucks, traffic, out_dir, rng=rng, context=context)
+
+
+def instanceDir(mapName, seed, nbTrucks):
+    return os.path.join("cases", mapName, "instances", "seed" + str(seed) + "_trk" + str(nbTrucks))
+
+
+def _initWorker(context):
+    global _workerContext
+    _workerContext = context
+
+
+def _createInstanceJob(job):
+    seed, nbTrucks, vehicle_type, out_dir = job
+    create(_workerContext["map"], nbTrucks, vehicle_type, out_dir, seed=seed, context=_workerContext)
+    return out_dir
+
+
+def createInstances(mapName, specs, vehicle_type="Truck", workers=None):
+    '''
+    Generates several reproducible instances of a map in parallel worker processes.
+    The map files are parsed once here and shared with the workers.
+    :param specs: list of (seed, nbTrucks) or (seed, nbTrucks, out_dir); out_dir defaults to instanceDir()
+    :return: list of the instance folders, in specs order
+    '''
+    context = loadMapContext(mapName)
+    jobs = []
+    for spec in specs:
+        seed, nbTrucks = spec[0], spec[1]
+        out_dir = spec[2] if len(spec) > 2 else instanceDir(mapName, seed, nbTrucks)
+        jobs.append((seed, nbTrucks, vehicle_type, out_dir))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_initWorker, initargs=(context,)) as pool:
+        return list(pool.map(_createInstanceJob, jobs))
 
 
 # Launcher.start("data/MyRoutes.rou.xml","data/missions.mis.xml")
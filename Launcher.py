@@ -3,9 +3,12 @@ import sys
 import random  # For random.randint, random.choice
 import xml.etree.ElementTree as ET
 
-import traci
+from sim_backend import traci
 import traci.constants as tc  # Used for stop states
 import myPyLib
+from mission_store import MissionStore
+from route_cache import RouteCache
+from subscriptions import VehicleSubscriptions
 
 
 class StateListener(traci.StepListener):
@@ -183,9 +186,11 @@ def start_traci_and_listener(map_name, _mode_name):
     traci.addStepListener(state_listener)
 
 
-def assign_mission_action(veh_id, action_element):
+def assign_mission_action(veh_id, action_element, routes=None, state=None):
     """
     Assigns a specific mission action to a vehicle.
+    With a RouteCache and the vehicle's subscribed state (road and speed factor, see subscriptions.py),
+    a route already computed from the vehicle's edge to the target edge is reused.
     """
     new_target = action_element.get("target")
     action_type = action_element.get("type")
@@ -205,7 +210,10 @@ def assign_mission_action(veh_id, action_element):
                 f"Error: No valid edge determined for action {action_type} for vehicle {veh_id}")
             return
 
-        traci.vehicle.changeTarget(veh_id, target_edge)
+        if routes is not None and state is not None:
+            routes.change_target(veh_id, state[tc.VAR_ROAD_ID], target_edge, state.get(tc.VAR_SPEED_FACTOR, 1.0))
+        else:
+            traci.vehicle.changeTarget(veh_id, target_edge)
 
         if action_type == "Load" or action_type == "Unload":
             print(
@@ -238,31 +246,22 @@ def assign_mission_action(veh_id, action_element):
             f"Unexpected error in assign_mission_action for {veh_id}: {e_unexp}")
 
 
-def get_pending_action(veh_id, mission_tree_root):
+def get_pending_action(veh_id, mission_store):
     """
-    Gets the first pending action (status != '3') for a vehicle from the mission XML root.
+    Gets the first pending action (status != '3') for a vehicle from the mission store.
     """
-    if mission_tree_root is None:
+    if mission_store is None:
         return None
-    mission_element = mission_tree_root.find(f".//mission[@id='{veh_id}']")
-    if mission_element is not None:
-        for action_element in mission_element.findall("action"):
-            if action_element.get("status") != "3":
-                return action_element
-    return None
+    return mission_store.pending_action(veh_id)
 
 
-def get_current_target_for_inprogress_action(veh_id, mission_tree_root):
+def get_current_target_for_inprogress_action(veh_id, mission_store):
     """
     Gets the target of the current in-progress action (status == '1').
     """
-    if mission_tree_root is None:
-        return None
-    mission_element = mission_tree_root.find(f".//mission[@id='{veh_id}']")
-    if mission_element is not None:
-        for action_element in mission_element.findall("action"):
-            if action_element.get("status") == "1":
-                return action_element.get("target")
+    action = get_pending_action(veh_id, mission_store)
+    if action is not None and action.get("status") == "1":
+        return action.get("target")
     return None
 
 
@@ -296,22 +295,27 @@ def launch_simulation(map_name, mode_name):
     stats_data_list = []
 
     mission_file_path = f"cases/{map_name}/missions.mis.xml"
-    mission_tree_root = None
+    mission_store = None
     if os.path.exists(mission_file_path):
         try:
-            mission_tree = ET.parse(mission_file_path)
-            mission_tree_root = mission_tree.getroot()
+            mission_store = MissionStore.from_file(mission_file_path)
         except ET.ParseError as e:
             print(f"Error parsing mission file '{mission_file_path}': {e}")
     else:
         print(f"Warning: Mission file not found: {mission_file_path}")
 
     traci.start(sumo_cmd_list)
+    subscriptions = VehicleSubscriptions() # road and speed factor of the trucks, for the route cache
+    subscriptions.start()
+    routes = RouteCache()
     step = 0
     max_steps = 3000
 
     while step < max_steps:
         traci.simulationStep()
+        step += 1
+        routes.set_time(step) # 1 step = 1 s
+        subscriptions.update()
         current_active_vehicles = traci.vehicle.getIDList()
 
         for veh_id in current_active_vehicles:
@@ -322,15 +326,18 @@ def launch_simulation(map_name, mode_name):
                 co_trucks += vehicle_stats[3]
                 stats_data_list.append(vehicle_stats)
 
-                if mission_tree_root:
-                    action = get_pending_action(veh_id, mission_tree_root)
+                if mission_store is not None:
+                    action = get_pending_action(veh_id, mission_store)
                     if action is not None:
                         action_status = action.get("status")
                         action_type = action.get("type")
                         action_target = action.get("target")
 
                         if action_status == '0':
-                            assign_mission_action(veh_id, action)
+                            state = subscriptions.get(veh_id)
+                            if state is None:
+                                continue  # subscribed on departure: assigned next step, with its road
+                            assign_mission_action(veh_id, action, routes, state)
                             action.set('status', '1')
                             print(
                                 f"{veh_id}: New action '{action_type}' Target='{action_target}'. "
@@ -393,17 +400,14 @@ def launch_simulation(map_name, mode_name):
             # print(f"  Total Truck CO2 Emissions (CO2trk): {co2_trucks}")
             # print(f"  Total Truck CO Emissions (COtrk): {co_trucks}")
 
-        step += 1
         if not current_active_vehicles and step > 50:
             print("No more vehicles in simulation. Ending early.")
             break
 
-    if mission_tree_root is not None:
+    if mission_store is not None:
         try:
-            final_mission_tree_str = ET.tostring(
-                mission_tree_root, encoding='unicode')
-            with open(f"cases/{map_name}/missions_final_state.mis.xml", "w", encoding="utf-8") as f_out:
-                f_out.write(final_mission_tree_str)
+            mission_store.write(
+                f"cases/{map_name}/missions_final_state.mis.xml")
             print(
                 f"Saved final mission states to cases/{map_name}/missions_final_state.mis.xml")
         except IOError as e_save_io:  # More specific
@@ -414,6 +418,7 @@ def launch_simulation(map_name, mode_name):
 
     myPyLib.save(stats_data_list)
     print("\nSimulation loop finished.")
+    print(routes.summary())
     print("Stopping the TraCI server...")
     traci.close()
 
@@ -10,6 +10,7 @@ import threading
 import traceback
 import Starter # This will now have the modified run_simulation
 import Creator
+import sim_logging
 
 # --- Define Config File Path ---
 CONFIG_FILE = "gui_config.json"
@@ -421,11 +422,28 @@ def log_message(message):
     log_area.config(state=DISABLED)
     log_area.see(END)
 
+# Step-loop messages of the simulation (sim_logging.py) are shown in the log panel too
+MAX_LOG_LINES = 2000
+gui_log_handler = sim_logging.GuiLogHandler()
+sim_logging.add_handler(gui_log_handler)
+
+def poll_simulation_log():
+    lines = gui_log_handler.drain()
+    if lines:
+        log_area.config(state=NORMAL)
+        log_area.insert(END, "\n".join(lines) + "\n")
+        excess = int(log_area.index("end-1c").split(".")[0]) - MAX_LOG_LINES
+        if excess > 0: log_area.delete("1.0", f"{excess + 1}.0")
+        log_area.config(state=DISABLED)
+        log_area.see(END)
+    window.after(200, poll_simulation_log)
+
 # --- Load settings and initialize UI state ---
 load_settings() # This must be called AFTER all UI elements it might affect are defined.
 
 log_message("LS2N Simulator Ready.")
 log_message("Please select map and options, then Create or Launch.")
 window.protocol("WM_DELETE_WINDOW", on_closing)
+poll_simulation_log()
 window.mainloop()
 # --- END OF FILE Main.py ---
\ No newline at end of file
@@ -1,21 +1,38 @@
 # --- START OF FILE Starter.py ---
 
-import os, sys, winsound
-import traci
+import os, sys
+import sim_backend
+from sim_backend import traci
 import random
 import traci.constants as tc
 import myPyLib as PL
 import xml.etree.ElementTree as ET
 import glob
 from datetime import datetime
-from myPyLib import getHeader
+from metrics_sink import MetricsSink
+from truck_accumulators import TruckAccumulators, StepBatch
+from parking_registry import AlternativeParkingIndex, ParkingRegistry, additional_files
+from route_cache import RouteCache
+from command_buffer import CommandBuffer
+from fleet_tracker import FleetTracker
 # from Lib.linecache import getline # Seems unused
 
 # ---- NEW IMPORTS ----
 import threading
-import queue
 import monitor_gui # Import the new GUI module
 import time
+import traceback
+from subscriptions import VehicleSubscriptions, speed_of, is_stopped as state_is_stopped
+from mission_store import MissionStore
+from mission_engine import MissionEngine
+import checkpoint
+import warmup
+from step_profiler import StepProfiler, NullProfiler
+import pickle
+import map_metadata
+from state_trace import TraceWriter, trace_file
+import sim_logging
+import detector_store
 # ---- END NEW IMPORTS ----
 
 from os import path # Already imported via 'import os', but keep for clarity if preferred
@@ -24,29 +41,37 @@ from os import path # Already imported via 'import os', but keep for clarity if
 if 'SUMO_HOME' in os.environ:
     tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
     sys.path.append(tools)
+elif sim_backend.backend_name() == "mock":
+    pass # mock_traci.py needs no SUMO installation
 else:
     print("ERROR: please declare environment variable 'SUMO_HOME'")
     sys.exit("Environment variable 'SUMO_HOME' not set.") # Exit if SUMO_HOME is missing
 
 # --- Global Settings & Variables ---
+# Step-loop messages go through the asynchronous, rate-limited loggers of sim_logging.py
+mission_log = sim_logging.get_logger("mission")
+speed_log = sim_logging.get_logger("speed")
+teleport_log = sim_logging.get_logger("teleport")
+alert_log = sim_logging.get_logger("alert")
+report_log = sim_logging.get_logger("report")
 sumoBinary = "C:/Program Files (x86)/Eclipse/Sumo/bin/sumo-gui"  # Adjust path if necessary
 Entry1 = "-13963" # Example edge ID
 Exit1 = "-2252"  # Example edge ID
 
-# --- Globals for Monitor Communication & Shared State ---
-data_queue = queue.Queue()
-monitor_thread = None
-mission_root_global = None # Parsed missions XML root
-metadata_root_global = None # Parsed metadata XML root (needed for getAlternative)
-routes_root_global = None # Parsed routes XML root (needed for some logic?)
+# Note: run state (mission store, metadata, monitor channel) is local to run_simulation so that
+# several runs can execute side by side (see BatchRunner.py).
 
 
 # --- Helper Functions (Many from Original) ---
 
-# Note: StateListener class seems unused if we fetch data directly in the loop. Removing for now.
-# If you need its specific collision/emergency break logic, it would need integration.
+# Writes of the helpers called without the CommandBuffer of a run are sent at once
+direct_commands = CommandBuffer(immediate=True)
 
-def initMode(mode, mapName): # Added mapName as it seems necessary for config path
+# Note: per-vehicle state is read through subscriptions (see subscriptions.py), which replaces
+# the StateListener idea from Launcher.py. Its collision/emergency break logic is not integrated.
+
+def initMode(mode, mapName, routes=None): # Added mapName as it seems necessary for config path
+    # routes: RouteCache, emptied as the edge speeds change the travel times
     global checkParking # Make sure checkParking is accessible if needed elsewhere
     print(f"Initiating mode: {mode} for map: {mapName}")
     # Check if config file exists (optional but good practice)
@@ -75,6 +100,7 @@ def initMode(mode, mapName): # Added mapName as it seems necessary for config pa
                  print(f"Warning: Unknown setting for mode[4]: {mode[4]}. Using default speeds.")
                  # Optionally set default speeds here
             # Add logic for mode[5], mode[6] if they control other things like parking behaviour
+            if routes is not None: routes.invalidate()
         else:
              print(f"Warning: Invalid mode format '{mode}'. Cannot apply mode settings.")
 
@@ -95,78 +121,40 @@ def getRemainingEdges(vehID):
         index = traci.vehicle.getRouteIndex(vehID)
         return len(route) - index if index >= 0 else len(route)
     except traci.TraCIException as e:
-        print(f"Warning: TraCI error getting route/index for {vehID}: {e}")
+        mission_log.warning("Warning: TraCI error getting route/index for %s: %s", vehID, e)
         return 0 # Or another sensible default
 
-def isParkWaiting(vehID):
-    # Requires getAction to work correctly with mission_root_global
-    action = getAction(vehID, mission_root_global)
+def isParkWaiting(vehID, missions, speed=None):
+    # speed: subscribed speed of the vehicle, saves a getSpeed round-trip when given
+    action = getAction(vehID, missions)
     if not action or action.get("type") != 'Park':
         return False
     try:
-        return getRemainingEdges(vehID) <= 2 and traci.vehicle.getSpeed(vehID) < 0.1 # Use speed threshold
+        if speed is None: speed = traci.vehicle.getSpeed(vehID)
+        return speed < 0.1 and getRemainingEdges(vehID) <= 2 # Use speed threshold
     except traci.TraCIException as e:
-         print(f"Warning: TraCI error checking park waiting for {vehID}: {e}")
+         mission_log.warning("Warning: TraCI error checking park waiting for %s: %s", vehID, e)
          return False
 
 
-def isFull(target_parking_area_id):
-    """Checks if a specific parking area is full using getParameter for capacity."""
-    try:
-        count = traci.parkingarea.getVehicleCount(target_parking_area_id)
-        # SUMO uses <param key="parkingArea.capacity" value="X"/> in the parkingArea definition
-        # or <parkingArea id="Prk1" lane="-101938#11_0" startPos="10" endPos="60" capacity="10"/>
-        # Check if 'capacity' is directly available as an attribute for the parkingArea object in TraCI
-        # Trying to get capacity parameter, which is how it's often defined if not directly an attribute
-        capacity_str = ""
-        try:
-            # This is the standard way to get <param> values associated with simulation objects
-            capacity_str = traci.simulation.getParameter(target_parking_area_id, "parkingArea.capacity")
-        except traci.TraCIException:
-             # If getParameter fails, it might be directly available via parkingarea.getCapacity
-             # This depends on the SUMO version and how parking areas are defined/queried.
-             # Let's assume if the above fails, we try a more direct approach if available or fallback.
-             # For now, let's assume the parameter method is primary.
-             # If parkingArea.getCapacity exists and is reliable, it could be a fallback:
-             # capacity = traci.parkingarea.getCapacity(target_parking_area_id)
-             pass # Handled below
-
-        if not capacity_str: # If getParameter returned empty or failed
-            # Fallback or error: try to get it from the XML definition if really needed,
-            # or assume a default, or make it a hard requirement for the parkingArea definition.
-            # For now, if not found via getParameter, we'll log a warning.
-            # A more robust solution would be to parse the additional file where parkings are defined.
-            print(f"Warning: Capacity parameter not directly found for parking area '{target_parking_area_id}'. "
-                  f"Ensure 'parkingArea.capacity' param is set or it's an attribute in your SUMO version.")
-            # Attempting to read from a typical parkingArea definition attribute as a last resort
-            # This is speculative and might not work for all SUMO versions or definitions.
-            # A common way to define capacity is directly in the <parkingArea> tag:
-            # <parkingArea id="Prk1" lane="..." capacity="10" .../>
-            # However, traci.simulation.getParameter is usually for <param> sub-elements.
-            # The traci.parkingarea module itself might have a getCapacity method in newer SUMO.
-            # Let's assume for now that if getParameter doesn't work, we cannot determine capacity reliably.
-            return False # Cannot determine fullness if capacity is unknown/unretrievable via TraCI
-
-        capacity = int(capacity_str)
-        return count >= capacity
-
-    except traci.TraCIException as e:
-        print(f"Warning: TraCI error checking fullness of parking area '{target_parking_area_id}': {e}")
-        return False
-    except (ValueError, TypeError) as e:
-        print(f"Warning: Error converting capacity parameter '{capacity_str}' to int for '{target_parking_area_id}': {e}")
-        return False
-    except Exception as e:
-        print(f"Warning: Unexpected error in isFull for '{target_parking_area_id}': {e}")
+def isFull(target_parking_area_id, parkings):
+    """Checks if a parking area is full using the ParkingRegistry (capacity from the
+    additional files, occupancy refreshed once per step). Unknown areas are never full."""
+    if target_parking_area_id not in parkings:
+        mission_log.warning("Warning: Capacity unknown for parking area '%s' "
+                            "(not defined as a parkingArea in the additional files).", target_parking_area_id)
         return False
+    return parkings.is_full(target_parking_area_id)
 
 
-def assignMission(vehID, action):
-    """Assigns the next mission step using TraCI commands and updates the action status in memory."""
-    global mission_root_global
-
+def assignMission(vehID, action, routes=None, road_id=None, commands=None, speed_factor=1.0):
+    """Assigns the next mission step using TraCI commands and updates the action status in memory.
+    With a RouteCache and the current edge (road_id), a route already computed for that edge pair (and
+    speed_factor) is reused.
+    The stop goes through commands (CommandBuffer, default: sent at once); if SUMO refuses it, the status
+    goes back to '0'."""
     if action is None:
-        print(f"Warning: assignMission called with None action for {vehID}")
+        mission_log.warning("Warning: assignMission called with None action for %s", vehID)
         return
 
     newTarget = action.get("target")
@@ -174,75 +162,59 @@ def assignMission(vehID, action):
     actionType = action.get("type")
 
     if not newTarget or not newEdge or not actionType:
-         print(f"ERROR: Incomplete action details for {vehID}: Type={actionType}, Target={newTarget}, Edge={newEdge}")
+         mission_log.error("ERROR: Incomplete action details for %s: Type=%s, Target=%s, Edge=%s", vehID, actionType, newTarget, newEdge)
          return
 
-    print(f"{vehID}: Assigning Action: Type={actionType}, Target={newTarget}, Edge={newEdge}")
+    mission_log.info("%s: Assigning Action: Type=%s, Target=%s, Edge=%s", vehID, actionType, newTarget, newEdge)
 
+    commands = commands or direct_commands
     try:
-        traci.vehicle.changeTarget(vehID, newEdge)
+        commands.flush_vehicle(vehID) # earlier writes of this truck go before the reroute
+        if routes is not None: routes.change_target(vehID, road_id, newEdge, speed_factor)
+        else: traci.vehicle.changeTarget(vehID, newEdge)
+        action.set("status", "1")
+        mission_log.debug("  %s: Action status set to '1'", vehID)
         stop_duration = 600
         if actionType == "Load" or actionType == "Unload":
             stop_duration = 180
-            traci.vehicle.setParkingAreaStop(vehID, newTarget, duration=stop_duration)
-            print(f"  {vehID}: Set ParkingAreaStop at '{newTarget}' for {stop_duration}s")
+            commands.set_parking_area_stop(vehID, newTarget, stop_duration, on_error=lambda e: action.set("status", "0"))
+            mission_log.debug("  %s: Set ParkingAreaStop at '%s' for %ss", vehID, newTarget, stop_duration)
         elif actionType == "Park":
-             traci.vehicle.setParkingAreaStop(vehID, newTarget, duration=stop_duration)
-             print(f"  {vehID}: Set ParkingAreaStop at '{newTarget}' for {stop_duration}s")
+             commands.set_parking_area_stop(vehID, newTarget, stop_duration, on_error=lambda e: action.set("status", "0"))
+             mission_log.debug("  %s: Set ParkingAreaStop at '%s' for %ss", vehID, newTarget, stop_duration)
         elif actionType == "Go":
-             print(f"  {vehID}: Route set towards Edge '{newEdge}'. No stop defined.")
+             mission_log.debug("  %s: Route set towards Edge '%s'. No stop defined.", vehID, newEdge)
              pass
         else:
-            print(f"Warning: Unknown action type '{actionType}' for {vehID}. Cannot set stop.")
-
-        action.set("status", "1")
-        print(f"  {vehID}: Action status set to '1'")
+            mission_log.warning("Warning: Unknown action type '%s' for %s. Cannot set stop.", actionType, vehID)
 
     except traci.TraCIException as e:
-        print(f"ERROR: TraCI error assigning mission for {vehID} (Target:{newTarget}, Edge:{newEdge}): {e}")
+        mission_log.error("ERROR: TraCI error assigning mission for %s (Target:%s, Edge:%s): %s", vehID, newTarget, newEdge, e)
     except Exception as e:
-        print(f"ERROR: Unexpected error assigning mission for {vehID}: {e}")
+        mission_log.error("ERROR: Unexpected error assigning mission for %s: %s", vehID, e)
 
 
-def getAction(vehID, mission_root):
-    root_to_use = mission_root_global if mission_root_global is not None else mission_root
-    if root_to_use is None:
-        return None
-    for mission in root_to_use.findall(".//mission[@id='{}']".format(vehID)):
-        for action in mission.findall("action"):
-            if action.get("status") != "3":
-                return action
+def getAction(vehID, missions):
+    if missions is None:
         return None
-    return None
-
-
-def setAction(vehID, mission_root, newAction):
-    global mission_root_global
-    root_to_use = mission_root_global if mission_root_global is not None else mission_root
-    if root_to_use is None: return
-
-    action_updated = False
-    for mission in root_to_use.findall(".//mission[@id='{}']".format(vehID)):
-        for action in mission.findall("action"):
-            if action.get("status") != "3":
-                old_target = action.get('target')
-                action.set('target', newAction.get('target'))
-                action.set('edge', newAction.get('edge'))
-                action.set('type', newAction.get('type'))
-                action.set('status', '0')
-                print(f"{vehID}: Replaced action target '{old_target}' with '{newAction.get('target')}', status reset to '0'")
-                action_updated = True
-                return
-    if not action_updated:
-        print(f"Warning: setAction - Could not find pending action to replace for {vehID}")
-
-
-def get_mission_action_info(vehID):
-    global mission_root_global
-    if mission_root_global is None:
+    return missions.pending_action(vehID)
+
+
+def setAction(vehID, missions, newAction):
+    if missions is None: return
+
+    old_target = missions.replace_pending_action(vehID, newAction)
+    if old_target is not None:
+        mission_log.info("%s: Replaced action target '%s' with '%s', status reset to '0'", vehID, old_target, newAction.get('target'))
+    else:
+        mission_log.warning("Warning: setAction - Could not find pending action to replace for %s", vehID)
+
+
+def get_mission_action_info(vehID, missions):
+    if missions is None:
         return {"type": "N/A", "target": "N/A", "status": "No Missions"}
 
-    action = getAction(vehID, mission_root_global)
+    action = getAction(vehID, missions)
 
     if action is not None:
          return {
@@ -251,33 +223,128 @@ def get_mission_action_info(vehID):
                 "status": action.get("status", "0")
             }
     else:
-        for mission in mission_root_global.findall(".//mission[@id='{}']".format(vehID)):
-             if len(mission.findall("action")) > 0:
-                  all_done = True
-                  for act in mission.findall("action"):
-                      if act.get("status") != "3":
-                          all_done = False; break
-                  if all_done:
-                       last_action = mission.findall("action")[-1]
-                       return { "type": last_action.get("type", "N/A"),
-                                "target": last_action.get("target", "N/A"),
-                                "status": "Completed" }
-             break
+        # No pending action left: the mission is completed if it has any action at all
+        mission = missions.get_mission(vehID)
+        if mission is not None and mission.actions:
+            last_action = mission.actions[-1]
+            return { "type": last_action.get("type", "N/A"),
+                     "target": last_action.get("target", "N/A"),
+                     "status": "Completed" }
         return {"type": "Unknown", "target": "Unknown", "status": "Unknown"}
 
+def updateTruckMission(vehID, state, missions, metadata, parkings, mode, alternatives=None, routes=None, commands=None):
+    """
+    Mission state machine of one truck, on its subscribed state (see subscriptions.py).
+    Called by the MissionEngine only when one of the truck's events fires.
+    alternatives (AlternativeParkingIndex) picks the nearest free parking when the target is full;
+    routes (RouteCache) reuses the routes of the actions; the writes are queued in commands (CommandBuffer).
+    """
+    commands = commands or direct_commands
+    speed_ms = state.get(tc.VAR_SPEED, 0.0)
+    speed_factor = state.get(tc.VAR_SPEED_FACTOR, 1.0)
+    is_stopped = state_is_stopped(state)
+
+    action = getAction(vehID, missions)
+    if action is not None:
+        current_action_status = action.get("status", "0")
+        action_type = action.get("type")
+        action_target = action.get("target")
+
+        if current_action_status == '0':
+            assignMission(vehID, action, routes, state.get(tc.VAR_ROAD_ID), commands, speed_factor)
+        elif current_action_status == '1':
+            status_updated_this_step = False
+            try:
+                if mode[6] == "1" and not is_stopped and action_type != 'Go':
+                    target_full = False
+                    if action_target: target_full = isFull(action_target, parkings)
+                    if target_full and speed_factor > 0.5:
+                        speed_log.info("%s: Target '%s' is full. Reducing speed factor to 0.5", vehID, action_target)
+                        commands.set_speed_factor(vehID, 0.5)
+                    elif not target_full and speed_factor < 1.0:
+                        speed_log.info("%s: Target '%s' not full. Increasing speed factor to 1.0", vehID, action_target)
+                        commands.set_speed_factor(vehID, 1.0)
+            except IndexError: pass # Mode string too short
+            except traci.TraCIException as e: speed_log.warning("Warning: TraCI error adjusting speed factor for %s: %s", vehID, e)
+
+            if action_type == 'Park':
+                try:
+                    if mode[5] == "0":
+                        if is_stopped: action.set('status', '2'); status_updated_this_step = True; mission_log.info("%s: Parked (Mode *0*). Status -> '2'.", vehID)
+                        elif isParkWaiting(vehID, missions, speed_ms):
+                            # No C-ITS: the truck does not know the occupancy, it tries the nearest other parking
+                            alternativeAction = PL.getAlternative(metadata, action_target, alternatives)
+                            if alternativeAction != "no alternatives" and isinstance(alternativeAction, ET.Element):
+                                 commands.replace_stop(vehID, duration=0, flags=0)
+                                 setAction(vehID, missions, alternativeAction)
+                            else: mission_log.info("%s: No alternative parking found.", vehID)
+                    elif mode[5] == "1":
+                         if is_stopped: action.set('status', '2'); status_updated_this_step = True; mission_log.info("%s: Parked (Mode *1*). Status -> '2'.", vehID)
+                         elif action_target and isFull(action_target, parkings):
+                             alternativeAction = PL.getAlternative(metadata, action_target, alternatives, parkings)
+                             if alternativeAction != "no alternatives" and isinstance(alternativeAction, ET.Element) and not isFull(alternativeAction.get("target"), parkings):
+                                  commands.replace_stop(vehID, duration=0, flags=0)
+                                  setAction(vehID, missions, alternativeAction)
+                                  mission_log.info("%s: Found alternative parking '%s'. Replacing action.", vehID, alternativeAction.get('target'))
+                             else: mission_log.info("%s: Target full and no suitable alternative found (Mode *1*).", vehID)
+                except IndexError: pass # Mode string too short
+                except traci.TraCIException as e: mission_log.warning("Warning: TraCI error during parking logic for %s: %s", vehID, e)
+            elif action_type in ['Load', 'Unload'] and is_stopped and not status_updated_this_step:
+                action.set('status', '2'); status_updated_this_step = True; mission_log.info("%s: Stopped for %s. Status -> '2'.", vehID, action_type)
+            elif action_type == 'Go' and not status_updated_this_step:
+                 try:
+                     if traci.vehicle.getRouteIndex(vehID) == len(traci.vehicle.getRoute(vehID)) - 1:
+                          action.set('status', '3'); status_updated_this_step = True; mission_log.info("%s: Reached end of route for Go. Status -> '3'.", vehID)
+                 except traci.TraCIException: pass
+        elif current_action_status == '2':
+            if action_type in ['Load', 'Unload', 'Park'] and not is_stopped:
+                action.set('status', '3'); mission_log.info("%s: Finished stop for %s. Status -> '3'.", vehID, action_type)
+
+
 # --- Main Simulation Function ---
 # --- MODIFIED HERE ---
-def run_simulation(mapName_param, mode, simulation_end_seconds=None):
-    global data_queue, monitor_thread, mission_root_global, metadata_root_global, routes_root_global
-    global mapName
-    mapName = mapName_param
-
-    data_queue = queue.Queue()
+def run_simulation(mapName, mode, simulation_end_seconds=None, sumo_binary=None, instance_dir=None,
+                   results_dir=None, seed=None, label=None, port=None, monitor=True, backend=None,
+                   monitor_period=0.5, checkpoint_every=None, checkpoint_dir=None, resume=False,
+                   warmup_seconds=None, profile=False, profile_every=600, record_trace=False, output_prefix=None):
+    """
+    Runs one simulation of a map under a launch mode.
+    Args:
+        mapName (str): Map folder under cases/.
+        mode (str): Launch mode string, e.g. "Mode111".
+        simulation_end_seconds (int): Maximum number of steps (default 30000).
+        sumo_binary (str): SUMO executable, defaults to the module-level sumoBinary (sumo-gui).
+        instance_dir (str): Folder holding MyRoutes.rou.xml/missions.mis.xml, defaults to the map folder.
+        results_dir (str): Output folder for the reports, defaults to cases/<map>/results/<mode>.
+        seed (int): Passed to SUMO with --seed.
+        label (str), port (int): TraCI connection label and port, for parallel runs.
+        monitor (bool): Open the monitor window.
+        backend (str): "traci", "libsumo" or "mock" (see sim_backend.py), defaults to the active backend.
+        monitor_period (float): Minimum wall-clock seconds between two monitor snapshots.
+        checkpoint_every (int): Save a checkpoint every N steps (see checkpoint.py), None to disable.
+        checkpoint_dir (str): Checkpoint folder, defaults to <results_dir>/checkpoints.
+        resume (bool): Restart from the latest checkpoint of checkpoint_dir, if any.
+        warmup_seconds (int): Start from the cached mode-neutral warm-up state at this time (see warmup.py).
+        profile (bool): Time each phase of the step loop and count TraCI calls (see step_profiler.py).
+        profile_every (int): Steps between two profile log lines / rows of <mode>_Profile.csv.
+        record_trace (bool): Append the per-step truck states to <mode>_Trace.bin (see state_trace.py).
+        output_prefix (str): SUMO --output-prefix, so that runs sharing a map do not overwrite each other's
+            outputs (detector files...); by default the outputs keep the names set in the map's files.
+    Returns:
+        dict: Summary of the run (steps, trucks, exited trucks, warm-up time used), or None if it could not start.
+    """
+    if backend and backend != sim_backend.backend_name():
+        sim_backend.use_backend(backend)
+    sim_logging.setup()
+    monitor_channel = monitor_gui.SnapshotChannel() if monitor else None
+    next_snapshot_time = 0.0
+    monitor_thread = None
 
     base_path = f"cases/{mapName}"
-    mission_file_path = f"{base_path}/missions.mis.xml"
+    instance_path = instance_dir or base_path
+    mission_file_path = f"{instance_path}/missions.mis.xml"
     metadata_file_path = f"{base_path}/metaData.xml"
-    routes_file_path = f"{base_path}/MyRoutes.rou.xml"
+    routes_file_path = f"{instance_path}/MyRoutes.rou.xml"
     config_file_path = f"{base_path}/network.sumocfg"
     # Also check for Network.sumocfg (capital N)
     if not os.path.exists(config_file_path):
@@ -292,41 +359,38 @@ def run_simulation(mapName_param, mode, simulation_end_seconds=None):
 
     print("Parsing configuration files...")
     try:
-        mission_tree = ET.parse(mission_file_path)
-        mission_root_global = mission_tree.getroot()
-        print(f"Successfully parsed missions from {mission_file_path}")
+        missions = MissionStore.from_file(mission_file_path)
+        print(f"Successfully parsed {len(missions)} missions from {mission_file_path}")
     except FileNotFoundError:
         print(f"ERROR: Mission file not found: {mission_file_path}")
-        mission_root_global = None
+        missions = None
     except ET.ParseError as e:
         print(f"ERROR: Failed to parse mission file {mission_file_path}: {e}")
-        mission_root_global = None
+        missions = None
 
     try:
-        metadata_tree = ET.parse(metadata_file_path)
-        metadata_root_global = metadata_tree.getroot()
-        print(f"Successfully parsed metadata from {metadata_file_path}")
+        metadata = map_metadata.load(mapName)
     except FileNotFoundError:
         print(f"ERROR: Metadata file not found: {metadata_file_path}")
-        metadata_root_global = None
+        metadata = None
     except ET.ParseError as e:
         print(f"ERROR: Failed to parse metadata file {metadata_file_path}: {e}")
-        metadata_root_global = None
+        metadata = None
 
     try:
         routes_tree = ET.parse(routes_file_path)
-        routes_root_global = routes_tree.getroot()
+        routes_root = routes_tree.getroot()
         print(f"Successfully parsed routes from {routes_file_path}")
     except FileNotFoundError:
         print(f"Warning: Routes file not found: {routes_file_path}")
-        routes_root_global = None
+        routes_root = None
     except ET.ParseError as e:
         print(f"Warning: Failed to parse routes file {routes_file_path}: {e}")
-        routes_root_global = None
+        routes_root = None
 
     directory = mode
     parent_dir = f"{base_path}/results/"
-    folderPath = os.path.join(parent_dir, directory)
+    folderPath = results_dir or os.path.join(parent_dir, directory)
     try:
         if not path.exists(folderPath):
             os.makedirs(folderPath)
@@ -334,48 +398,73 @@ def run_simulation(mapName_param, mode, simulation_end_seconds=None):
     except OSError as e:
          print(f"ERROR creating results directory {folderPath}: {e}")
 
+    checkpoint_dir = checkpoint_dir or os.path.join(folderPath, "checkpoints")
+    checkpointer = checkpoint.Checkpointer(checkpoint_dir, checkpoint_every) if checkpoint_every else None
+    resume_path, resume_state = None, None
+    if resume:
+        resume_path = checkpoint.latest(checkpoint_dir)
+        if resume_path is None:
+            print(f"No checkpoint found in {checkpoint_dir}, starting from step 0.")
+        else:
+            try:
+                resume_state = checkpoint.load_run_state(resume_path)
+            except (OSError, ValueError, EOFError, pickle.UnpicklingError) as e:
+                print(f"ERROR reading checkpoint {resume_path}: {e}. Starting from step 0.")
+                resume_path = None
+
+    # Fork from the shared warm-up: mode logic (initMode included) only applies from there on
+    warmup_used = None # warm-up time actually simulated before the fork; may be clamped or 0
+    if warmup_seconds and resume_state is None and mode != warmup.WARMUP_MODE:
+        warmup_path = warmup.ensure(mapName, warmup_seconds, seed=seed, instance_dir=instance_dir,
+                                    sumo_binary=sumo_binary or sumoBinary, backend=backend)
+        warmup_used = 0
+        if warmup_path is not None:
+            resume_path = warmup.checkpoint_path(warmup_path)
+            resume_state = checkpoint.load_run_state(resume_path)
+            resume_state["metrics_offsets"] = warmup.fork_results(warmup_path, folderPath, mode)
+            warmup_used = resume_state["step"]
+
     def gui_thread_target():
         try:
             print("Monitor GUI thread starting.")
-            monitor_gui.start_monitor_gui(data_queue)
+            monitor_gui.start_monitor_gui(monitor_channel)
             print("Monitor GUI thread finished.")
         except Exception as e:
             print(f"ERROR in Monitor GUI thread: {e}")
             traceback.print_exc()
 
-    monitor_thread = threading.Thread(target=gui_thread_target, daemon=True)
-    monitor_thread.start()
-    print("Waiting for GUI thread to initialize...")
-    time.sleep(1.5)
+    if monitor:
+        monitor_thread = threading.Thread(target=gui_thread_target, daemon=True)
+        monitor_thread.start()
+        print("Waiting for GUI thread to initialize...")
+        time.sleep(1.5)
 
     sumoConfig = ["-c", config_file_path, "-S"]
-    sumoCmd = [sumoBinary, sumoConfig[0], sumoConfig[1], sumoConfig[2]]
+    sumoCmd = [sumo_binary or sumoBinary, sumoConfig[0], sumoConfig[1], sumoConfig[2]]
+    if instance_dir:
+        sumoCmd += ["-r", os.path.abspath(routes_file_path)]
+    if seed is not None:
+        sumoCmd += ["--seed", str(seed)]
+    if checkpoint_every or warmup_seconds:
+        sumoCmd += ["--save-state.rng"] # saved states restore the random number generators too
+    if output_prefix:
+        sumoCmd += ["--output-prefix", output_prefix]
 
     step = 0
-    ttWaiting = 0
-    nbTrucks = PL.countTrucks(mission_root_global) if mission_root_global else 0
+    nbTrucks = len(missions) if missions else 0
     print(f"Number of trucks detected in mission file: {nbTrucks}")
 
-    inTrucks = []
-    outTrucks = []
+    fleet = FleetTracker(nbTrucks) # entered/exited trucks, from the departed/arrived lists
     inPort = []
     begin = datetime.now()
 
-    dynamicAvgSpeeds=[]
-    dynamicSpeeds=[]
-
-    distances = PL.initList(nbTrucks, 0.0)
-    speeds = PL.initList(nbTrucks, 0.0)
-    speedFactors = PL.initList(nbTrucks, 0.0)
-    co2s = PL.initList(nbTrucks, 0.0)
-    noxs = PL.initList(nbTrucks, 0.0)
+    parkings = ParkingRegistry.from_config(config_file_path)
+    alternatives = AlternativeParkingIndex.from_metadata(mapName, metadata) if metadata else None
+    routes = RouteCache()
+    commands = CommandBuffer() # writes of a step, sent before the next simulationStep
+    accumulators = TruckAccumulators(nbTrucks) # distances, speeds, speedFactors, co2s, noxs + waiting count
 
-    truckReport = ""
-    distancesRep = getHeader(nbTrucks, "trk") + "\n"
-    speedsRep = getHeader(nbTrucks, "trk") + "\n"
-    speedFactorsRep = getHeader(nbTrucks, "trk") + "\n"
-    co2sRep = getHeader(nbTrucks, "trk") + "\n"
-    noxsRep = getHeader(nbTrucks, "trk") + "\n"
+    metrics = None # MetricsSink, opened below: each reporting interval is appended to disk
 
     blocked_counter = {}
     
@@ -392,27 +481,79 @@ def run_simulation(mapName_param, mode, simulation_end_seconds=None):
     print(f"Starting simulation at {begin.strftime('%H:%M:%S')}")
     print(f"Map: {mapName}, Mode: {mode}, Max Steps: {max_steps}")
 
+    profiler = StepProfiler(folderPath, mode, profile_every) if profile else NullProfiler()
+
+    interval = 60 # reporting interval (steps)
+    # Ensure Parking1 and Parking2 are valid IDs in your simulation
+    # These might need to be dynamically discovered or configured per map
+    report_parkings = ("Parking1", "Parking2") # Example IDs, replace with actual
+    if metadata and len(metadata.parkings) >= 2: # If metadata is loaded, take the parking IDs from there
+        report_parkings = (metadata.parkings[0].name, metadata.parkings[1].name)
+
+    recorder = None
+    if record_trace:
+        recorder = TraceWriter(trace_file(folderPath, mode), {
+            "map": mapName, "mode": mode, "nb_trucks": nbTrucks, "interval": interval,
+            "capacities": parkings.capacities, "report_parkings": report_parkings})
+
     simulation_running = True
     try:
+        profiler.open()
+        metrics = MetricsSink(folderPath, mode, nbTrucks).open(resume_state["metrics_offsets"] if resume_state else None)
+        if recorder is not None:
+            recorder.open(resume_state.get("trace_offset") if resume_state else None)
         print("Attempting to start TraCI...")
-        traci.start(sumoCmd)
+        traci.start(sumoCmd, port=port, label=label or "default")
         print("TraCI Connection Established.")
-        initMode(mode, mapName)
+        if resume_state is not None:
+            print(f"Resuming from checkpoint {resume_path} (step {resume_state['step']})")
+            checkpoint.restore_sumo_state(resume_path)
+            step = resume_state["step"]
+            if missions is not None and resume_state["missions"] is not None:
+                missions.restore(resume_state["missions"])
+            accumulators.load_state(resume_state["accumulators"])
+            blocked_counter.update(resume_state["blocked_counter"])
+            fleet.load_state(resume_state["fleet"])
+            inPort.extend(resume_state["inPort"])
+        if mode != warmup.WARMUP_MODE:
+            initMode(mode, mapName, routes) # edge speeds are not part of the SUMO state, applied after a resume too
+        subscriptions = VehicleSubscriptions()
+        subscriptions.start()
+        fleet.start(traci.vehicle.getIDList(), step)
+        parkings.start()
+        engine = None
+        if missions is not None:
+            engine = MissionEngine(missions, parkings, mode,
+                                   lambda vehID, state: updateTruckMission(vehID, state, missions, metadata, parkings, mode,
+                                                                        alternatives, routes, commands))
+            engine.start(traci.vehicle.getIDList())
 
         while simulation_running:
             try:
+                t_phase = profiler.now()
+                saved_round_trips = commands.flush()
+                t_phase = profiler.lap("commands", t_phase)
                 traci.simulationStep()
                 step += 1
-                current_step_truck_data_for_gui = []
-                active_truck_ids = set(traci.vehicle.getIDList())
+                routes.set_time(step) # 1 step = 1 s
+                t_phase = profiler.lap("step", t_phase)
+                # Snapshots for the monitor are only built at monitor_period, not every step
+                build_snapshot = monitor_channel is not None and time.monotonic() >= next_snapshot_time
+                current_step_truck_data_for_gui = [] if build_snapshot else None
+                vehicle_states = subscriptions.update()
+                commands.forget(subscriptions.arrived)
+                fleet.update(subscriptions.departed, subscriptions.arrived, step)
+                for vehID in subscriptions.arrived: blocked_counter.pop(vehID, None)
+                parking_changed = parkings.refresh()
+                active_truck_ids = list(vehicle_states)
+                t_phase = profiler.lap("fetch", t_phase)
 
                 currentTrucks_this_step = []
-                dynamicSpeeds = []
+                step_batch = StepBatch()
 
                 for vehID in active_truck_ids:
                     if "trk" in vehID:
                         currentTrucks_this_step.append(vehID)
-                        if vehID not in inTrucks: inTrucks.append(vehID)
 
                         index = -1
                         try:
@@ -420,163 +561,109 @@ def run_simulation(mapName_param, mode, simulation_end_seconds=None):
                            if index < 0 or index >= nbTrucks: index = -1
                         except ValueError: index = -1
 
-                        mission_info = get_mission_action_info(vehID)
-                        road_id, speed_ms, wait_time_accumulated, distance_step, speed_factor, co2_step, nox_step, is_stopped, current_speed_kmh = "N/A", 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, False, 0.0
-                        try:
-                            road_id = traci.vehicle.getRoadID(vehID)
-                            speed_ms = traci.vehicle.getSpeed(vehID)
+                        road_id, speed_ms, wait_time_accumulated, distance_step, speed_factor, co2_step, nox_step, current_speed_kmh = "N/A", 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0
+                        state = vehicle_states[vehID]
+                        if tc.VAR_ROAD_ID in state:
+                            road_id = state[tc.VAR_ROAD_ID]
+                            speed_ms = state[tc.VAR_SPEED]
                             current_speed_kmh = speed_ms * 3.6
-                            wait_time_accumulated = traci.vehicle.getAccumulatedWaitingTime(vehID)
-                            distance_step = traci.vehicle.getDistance(vehID)
-                            speed_factor = traci.vehicle.getSpeedFactor(vehID)
-                            co2_step = traci.vehicle.getCO2Emission(vehID)
-                            nox_step = traci.vehicle.getNOxEmission(vehID)
-                            is_stopped = traci.vehicle.isStopped(vehID)
-                            if current_speed_kmh > 100: print(f"*** alert *** {vehID} speed= {current_speed_kmh:.1f} km/h")
-                            if speed_factor > 2: print(f"*** alert *** {vehID} speedFactor= {speed_factor:.1f}")
-                        except traci.TraCIException: road_id = "Departed?"
-
-                        truck_info_bundle = {
-                            "id": vehID, "action_type": mission_info["type"],
-                            "action_target": mission_info["target"], "mission_status": mission_info["status"],
-                            "road_id": road_id, "speed": current_speed_kmh, "wait_time": wait_time_accumulated
-                        }
-                        current_step_truck_data_for_gui.append(truck_info_bundle)
-
-                        action = getAction(vehID, mission_root_global)
-                        if action is not None:
-                            current_action_status = action.get("status", "0")
-                            action_type = action.get("type")
-                            action_target = action.get("target")
-
-                            if current_action_status == '0':
-                                assignMission(vehID, action)
-                            elif current_action_status == '1':
-                                status_updated_this_step = False
-                                try:
-                                    if mode[6] == "1" and not is_stopped and action_type != 'Go':
-                                        target_full = False
-                                        if action_target: target_full = isFull(action_target)
-                                        if target_full and speed_factor > 0.5:
-                                            print(f"{vehID}: Target '{action_target}' is full. Reducing speed factor to 0.5")
-                                            traci.vehicle.setSpeedFactor(vehID, 0.5)
-                                        elif not target_full and speed_factor < 1.0:
-                                            print(f"{vehID}: Target '{action_target}' not full. Increasing speed factor to 1.0")
-                                            traci.vehicle.setSpeedFactor(vehID, 1.0)
-                                except IndexError: pass # Mode string too short
-                                except traci.TraCIException as e: print(f"Warning: TraCI error adjusting speed factor for {vehID}: {e}")
-
-                                if action_type == 'Park':
-                                    try:
-                                        if mode[5] == "0":
-                                            if is_stopped: action.set('status', '2'); status_updated_this_step = True; print(f"{vehID}: Parked (Mode *0*). Status -> '2'.")
-                                            elif isParkWaiting(vehID):
-                                                alternativeAction = PL.getAlternative(metadata_root_global, action_target)
-                                                if alternativeAction != "no alternatives" and isinstance(alternativeAction, ET.Element):
-                                                     traci.vehicle.replaceStop(vehID, duration=0, flags=0)
-                                                     setAction(vehID, mission_root_global, alternativeAction)
-                                                else: print(f"{vehID}: No alternative parking found.")
-                                        elif mode[5] == "1":
-                                             if is_stopped: action.set('status', '2'); status_updated_this_step = True; print(f"{vehID}: Parked (Mode *1*). Status -> '2'.")
-                                             elif action_target and isFull(action_target):
-                                                 alternativeAction = PL.getAlternative(metadata_root_global, action_target)
-                                                 if alternativeAction != "no alternatives" and isinstance(alternativeAction, ET.Element) and not isFull(alternativeAction.get("target")):
-                                                      traci.vehicle.replaceStop(vehID, duration=0, flags=0)
-                                                      setAction(vehID, mission_root_global, alternativeAction)
-                                                      print(f"{vehID}: Found alternative parking '{alternativeAction.get('target')}'. Replacing action.")
-                                                 else: print(f"{vehID}: Target full and no suitable alternative found (Mode *1*).")
-                                    except IndexError: pass # Mode string too short
-                                    except traci.TraCIException as e: print(f"Warning: TraCI error during parking logic for {vehID}: {e}")
-                                elif action_type in ['Load', 'Unload'] and is_stopped and not status_updated_this_step:
-                                    action.set('status', '2'); status_updated_this_step = True; print(f"{vehID}: Stopped for {action_type}. Status -> '2'.")
-                                elif action_type == 'Go' and not status_updated_this_step:
-                                     try:
-                                         if traci.vehicle.getRouteIndex(vehID) == len(traci.vehicle.getRoute(vehID)) - 1:
-                                              action.set('status', '3'); status_updated_this_step = True; print(f"{vehID}: Reached end of route for Go. Status -> '3'.")
-                                     except traci.TraCIException: pass
-                            elif current_action_status == '2':
-                                if action_type in ['Load', 'Unload', 'Park'] and not is_stopped:
-                                    action.set('status', '3'); print(f"{vehID}: Finished stop for {action_type}. Status -> '3'.")
+                            wait_time_accumulated = state[tc.VAR_ACCUMULATED_WAITING_TIME]
+                            distance_step = state[tc.VAR_DISTANCE]
+                            speed_factor = state[tc.VAR_SPEED_FACTOR]
+                            co2_step = state[tc.VAR_CO2EMISSION]
+                            nox_step = state[tc.VAR_NOXEMISSION]
+                            if current_speed_kmh > 100: alert_log.info("*** alert *** %s speed= %.1f km/h", vehID, current_speed_kmh)
+                            if speed_factor > 2: alert_log.info("*** alert *** %s speedFactor= %.1f", vehID, speed_factor)
+                        else: road_id = "Departed?"
+
+                        mission_info = get_mission_action_info(vehID, missions) if build_snapshot or recorder is not None else None
+                        if recorder is not None:
+                            recorder.truck(vehID, road_id, speed_ms, wait_time_accumulated, distance_step, speed_factor,
+                                           co2_step, nox_step, state_is_stopped(state), mission_info)
+
+                        if build_snapshot:
+                            truck_info_bundle = {
+                                "id": vehID, "action_type": mission_info["type"],
+                                "action_target": mission_info["target"], "mission_status": mission_info["status"],
+                                "road_id": road_id, "speed": current_speed_kmh, "wait_time": wait_time_accumulated
+                            }
+                            current_step_truck_data_for_gui.append(truck_info_bundle)
 
                         if index != -1:
-                            if distance_step > 0: distances[index] += distance_step / 1000.0
-                            dynamicSpeeds.append(current_speed_kmh)
-                            if speed_ms >= 0: speeds[index] += current_speed_kmh
-                            if speed_factor >= 0: speedFactors[index] += speed_factor
-                            if co2_step > 0: co2s[index] += co2_step / 1000.0
-                            if nox_step > 0: noxs[index] += nox_step / 1000.0
-                            if speed_ms < 0.1: ttWaiting += 1
+                            step_batch.append(index, distance_step, speed_ms, speed_factor, co2_step, nox_step)
 
                     if vehID not in blocked_counter: blocked_counter[vehID] = 0
-                    current_speed_teleport_check = traci.vehicle.getSpeed(vehID)
+                    current_speed_teleport_check = speed_of(vehicle_states[vehID])
                     if current_speed_teleport_check < 0.1: blocked_counter[vehID] += 1
                     else: blocked_counter[vehID] = 0
                     if blocked_counter[vehID] > 60 and not "trk" in vehID:
-                        print(f"⚡ {vehID} blocked for {blocked_counter[vehID]} steps. Attempting teleport...")
+                        teleport_log.info("⚡ %s blocked for %s steps. Attempting teleport...", vehID, blocked_counter[vehID])
+                        t_teleport = profiler.now()
                         try:
                             current_lane = traci.vehicle.getLaneID(vehID)
                             current_pos = traci.vehicle.getLanePosition(vehID)
                             lane_len = traci.lane.getLength(current_lane)
                             move_to_pos = min(lane_len - 1.0, current_pos + 15.0)
-                            traci.vehicle.moveTo(vehID, current_lane, move_to_pos)
-                            print(f"  {vehID} teleported on {current_lane} to position {move_to_pos:.1f}")
+                            commands.move_to(vehID, current_lane, move_to_pos)
+                            teleport_log.info("  %s teleported on %s to position %.1f", vehID, current_lane, move_to_pos)
                             blocked_counter[vehID] = 0
-                        except traci.TraCIException as e: print(f"  Error teleporting {vehID}: {e}."); blocked_counter[vehID] = 0
-                        except Exception as e: print(f"  Unexpected error during teleport for {vehID}: {e}"); blocked_counter[vehID] = 0
+                        except traci.TraCIException as e: teleport_log.warning("  Error teleporting %s: %s.", vehID, e); blocked_counter[vehID] = 0
+                        except Exception as e: teleport_log.error("  Unexpected error during teleport for %s: %s", vehID, e); blocked_counter[vehID] = 0
+                        profiler.lap("teleport", t_teleport) # also counted in "trucks"
+
+                accumulators.add(step_batch)
 
-                if current_step_truck_data_for_gui:
-                    data_queue.put(current_step_truck_data_for_gui)
+                if recorder is not None: recorder.end_step(step, fleet.entered_count, len(inPort), parkings.occupancy)
+                t_phase = profiler.lap("trucks", t_phase)
 
-                active_truck_ids_this_step = set(currentTrucks_this_step)
-                for v_id in inTrucks:
-                   if v_id not in active_truck_ids_this_step and v_id not in outTrucks:
-                       print(f"Truck {v_id} exited simulation.")
-                       outTrucks.append(v_id)
+                # Mission logic only for the trucks with a depart/stop/arrival/parking event
+                if engine is not None:
+                    engine.step(vehicle_states, subscriptions.departed, subscriptions.arrived,
+                                subscriptions.stop_events, parking_changed)
+                t_phase = profiler.lap("missions", t_phase)
+
+                if build_snapshot:
+                    monitor_channel.publish(current_step_truck_data_for_gui)
+                    next_snapshot_time = time.monotonic() + monitor_period
+                    t_phase = profiler.lap("monitor", t_phase)
 
-                interval = 60
                 if step % interval == 0 or step == 1:
-                    print(f"\n--- Reporting Interval: Step {step} ---")
-                    avgSpeed_interval = sum(dynamicSpeeds) / len(dynamicSpeeds) if dynamicSpeeds else 0.0 # Corrected this line
-                    # dynamicAvgSpeeds was reset above, should use dynamicSpeeds from current interval
-                    
+                    report_log.info("\n--- Reporting Interval: Step %s ---", step)
                     parked_count, total_capacity, capacity_percent = 0, 0, 0.0
                     try:
-                        # Ensure Parking1 and Parking2 are valid IDs in your simulation
-                        # These might need to be dynamically discovered or configured per map
-                        prk1_id, prk2_id = "Parking1", "Parking2" # Example IDs, replace with actual
-                        if metadata_root_global: # If metadata is loaded, try to get parking IDs from there
-                            parking_elements = metadata_root_global.find(".//parkings")
-                            if parking_elements is not None and len(parking_elements) >= 2:
-                                prk1_id = parking_elements[0].get("value") # Assuming 'value' is the ID
-                                prk2_id = parking_elements[1].get("value")
-                        
-                        cap1_str = traci.simulation.getParameter(prk1_id, "parkingArea.capacity")
-                        cap2_str = traci.simulation.getParameter(prk2_id, "parkingArea.capacity")
-                        total_capacity = (int(cap1_str) if cap1_str else 0) + \
-                                         (int(cap2_str) if cap2_str else 0)
-                        parked_count = traci.parkingarea.getVehicleCount(prk1_id) + \
-                                       traci.parkingarea.getVehicleCount(prk2_id)
+                        total_capacity = sum(parkings.capacity(p) for p in report_parkings)
+                        parked_count = sum(parkings.count(p) for p in report_parkings)
                         capacity_percent = (parked_count * 100.0 / total_capacity) if total_capacity > 0 else 0.0
-                        print(f"  Parking Stats: Total Parked={parked_count}, Total Capacity={total_capacity}")
-                    except traci.TraCIException as e: print(f"Warning: Error getting parking info via TraCI: {e}")
-                    except (ValueError, TypeError, IndexError) as e: print(f"Warning: Error processing parking capacity/IDs: {e}")
-
-                    if truckReport == "":
-                        truckReport = "step;time;inTrucks[#];Total distance[km/T.U];Average Speed[km/h/truck];parked[#];Parkings[%];Total CO2[g/T.U];Total NOx[g/T.U];TWT [T.U];inPort[#];Current Trucks[#]\n"
-                    report_line = f"{step};{step / interval:.1f};{len(inTrucks)};{sum(distances):.3f};{avgSpeed_interval:.2f};{parked_count};{capacity_percent:.1f};{sum(co2s):.3f};{sum(noxs):.3f};{ttWaiting};{len(inPort)};{len(currentTrucks_this_step)}\n"
-                    truckReport += report_line
-                    print(f"Report Line: {report_line.strip()}")
-
-                    distancesRep += PL.listToLine(distances, 1) + "\n"
-                    speedsRep += PL.listToLine(speeds, interval) + "\n"
-                    speedFactorsRep += PL.listToLine(speedFactors, interval) + "\n"
-                    co2sRep += PL.listToLine(co2s, 1) + "\n"
-                    noxsRep += PL.listToLine(noxs, 1) + "\n"
-
-                    distances, speeds, speedFactors, co2s, noxs = (PL.initList(nbTrucks, 0.0) for _ in range(5))
-                    ttWaiting = 0
-
-                if nbTrucks > 0 and len(outTrucks) == nbTrucks:
+                        report_log.info("  Parking Stats: Total Parked=%s, Total Capacity=%s", parked_count, total_capacity)
+                    except traci.TraCIException as e: report_log.warning("Warning: Error getting parking info via TraCI: %s", e)
+                    except (ValueError, TypeError, IndexError) as e: report_log.warning("Warning: Error processing parking capacity/IDs: %s", e)
+
+                    report_fields = metrics.write_interval(step, interval, accumulators, fleet.entered_count, parked_count,
+                                                           capacity_percent, len(inPort), len(currentTrucks_this_step))
+                    report_log.info("Report Line: %s", ';'.join(map(str, report_fields)))
+                    if recorder is not None: recorder.flush()
+
+                    accumulators.reset()
+                    t_phase = profiler.lap("report", t_phase)
+
+                if checkpointer is not None and checkpointer.due(step):
+                    metrics.flush()
+                    commands.flush() # queued writes belong to the saved SUMO state
+                    if recorder is not None: recorder.flush()
+                    # Copies only; pickling and writing happen on the checkpoint thread
+                    checkpointer.save(step, {
+                        "missions": missions.snapshot() if missions is not None else None,
+                        "accumulators": accumulators.state(),
+                        "blocked_counter": dict(blocked_counter),
+                        "fleet": fleet.state(), "inPort": list(inPort),
+                        "metrics_offsets": metrics.offsets(),
+                        "trace_offset": recorder.offset() if recorder is not None else None,
+                    })
+                    t_phase = profiler.lap("checkpoint", t_phase)
+
+                profiler.end_step(step, saved_round_trips)
+
+                if fleet.complete():
                     print(f"\nAll {nbTrucks} trucks have exited. Ending simulation at step {step}.")
                     simulation_running = False
                 elif step >= max_steps: # Check against potentially modified max_steps
@@ -588,37 +675,59 @@ def run_simulation(mapName_param, mode, simulation_end_seconds=None):
     except traci.TraCIException as e: print(f"\nERROR: Failed TraCI connection or fatal error: {e}")
     except Exception as e: print(f"\nERROR: Unexpected error before simulation loop: {e}"); traceback.print_exc()
     finally:
+        sim_logging.flush() # queued step-loop messages before the plain prints below
         print("\n--- Simulation Loop Finished ---")
         end = datetime.now()
         duration_sim = end - begin
         print(f"Simulation started at {begin.strftime('%H:%M:%S')} ended at {end.strftime('%H:%M:%S')} (Duration: {duration_sim})")
+        try: commands.flush() # writes queued by the last step
+        except Exception as e: print(f"Warning: Error sending the last TraCI writes: {e}")
         print('Saving results files...')
         try:
-            report_header = f"Simulation started at {begin.strftime('%H:%M:%S')} ended at {end.strftime('%H:%M:%S')}\n"
-            report_path = os.path.join(folderPath, f"{mode}_Truck Report.csv")
-            with open(report_path, "w") as f: f.write(report_header + truckReport)
-            print(f"Saved: {report_path}")
-            file_mappings = {"_DistancesRep.csv": distancesRep, "_SpeedsRep.csv": speedsRep, "_SpeedFactorsRep.csv": speedFactorsRep, "_co2sRep.csv": co2sRep, "_noxsRep.csv": noxsRep}
-            for suffix, data_str in file_mappings.items():
-                file_path = os.path.join(folderPath, f"{mode}{suffix}")
-                with open(file_path, "w") as f: f.write(data_str)
-                print(f"Saved: {file_path}")
+            if metrics is not None:
+                for file_path in metrics.close(begin, end):
+                    print(f"Saved: {file_path}")
         except IOError as e: print(f"ERROR saving report files to {folderPath}: {e}")
         except Exception as e: print(f"ERROR during report saving: {e}")
 
+        if missions is not None:
+            final_missions_path = os.path.join(folderPath, "missions_final_state.mis.xml")
+            try:
+                missions.write(final_missions_path)
+                print(f"Saved final mission states to {final_missions_path}")
+            except IOError as e: print(f"ERROR saving final mission states to {final_missions_path}: {e}")
+
+        if checkpointer is not None: checkpointer.close()
+        if recorder is not None:
+            recorder.close()
+            print(f"Saved trace: {recorder.file_path}")
+        profiler.close(step)
+        print(routes.summary())
+        print(commands.summary())
+        print(fleet.summary())
+
         print("Sending shutdown signal to Monitor GUI...")
-        if data_queue: data_queue.put("SHUTDOWN")
+        if monitor_channel: monitor_channel.close()
         print("Closing TraCI connection...")
         try: traci.close(); print("TraCI closed.")
         except traci.TraCIException as e: print(f"Warning: TraCI exception during close: {e}")
         except Exception as e: print(f"Warning: Error closing TraCI: {e}")
 
+        # e1 detector output is complete once SUMO has closed; only files written by this run
+        try:
+            detector_store.ingest_run(additional_files(config_file_path), folderPath, mode, output_prefix or "",
+                                    since=begin.timestamp())
+        except (OSError, ET.ParseError, ValueError) as e: print(f"ERROR converting the detector output: {e}")
+
         print("Waiting briefly for GUI thread...")
         if monitor_thread and monitor_thread.is_alive():
              monitor_thread.join(timeout=2.0)
              if monitor_thread.is_alive(): print("Warning: Monitor GUI thread did not exit cleanly.")
         print("--- Starter.run_simulation finished ---")
 
+    return {"steps": step, "trucks": nbTrucks, "exited": fleet.exited_count, "results_dir": folderPath,
+            "warmup": warmup_used}
+
 start = run_simulation
 
 if __name__ == "__main__":
@@ -0,0 +1,42 @@
+"""
+Runs the same headless simulation on the TraCI and libsumo backends and reports steps per second.
+
+Usage (from the repository root, SUMO_HOME set, instance already created):
+    python benchmarks/bench_backends.py [mapName] [mode] [steps]
+"""
+import multiprocessing
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_backend(backend, map_name, mode, steps, results):
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    import Starter
+    results_dir = os.path.join("cases", map_name, "results", "bench_backends", backend)
+    begin = time.perf_counter()
+    summary = Starter.run_simulation(map_name, mode, simulation_end_seconds=steps, sumo_binary="sumo",
+                                     results_dir=results_dir, seed=42, monitor=False, backend=backend)
+    elapsed = time.perf_counter() - begin
+    results[backend] = (summary["steps"] if summary else 0, elapsed)
+
+
+if __name__ == "__main__":
+    map_name = sys.argv[1] if len(sys.argv) > 1 else "Nantes"
+    mode = sys.argv[2] if len(sys.argv) > 2 else "Mode111"
+    steps = int(sys.argv[3]) if len(sys.argv) > 3 else 3600
+
+    manager = multiprocessing.Manager()
+    results = manager.dict()
+    for backend in ("traci", "libsumo"):
+        # One process per backend: libsumo keeps SUMO loaded in the interpreter
+        process = multiprocessing.Process(target=run_backend, args=(backend, map_name, mode, steps, results))
+        process.start()
+        process.join()
+
+    print(f"\n{'backend':>8} {'steps':>7} {'time [s]':>9} {'steps/s':>8}")
+    for backend, (done, elapsed) in results.items():
+        print(f"{backend:>8} {done:>7} {elapsed:>9.2f} {done / elapsed if elapsed else 0:>8.1f}")
@@ -0,0 +1,68 @@
+"""
+Compares instance generation by Creator (one ElementTree element per vehicle and
+action) with the vectorized bulk_generation on the synthetic MockPort map, and
+checks that both write the same files for the same seed. No SUMO installation is
+needed (the route table is skipped: MockPort has no network file).
+
+Usage (from the repository root):
+    python benchmarks/bench_generation.py [fleet sizes...]
+    python benchmarks/bench_generation.py 1000 10000 100000
+"""
+import contextlib
+import filecmp
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import bench_mock  # sets the mock backend and the repository path
+
+import Creator
+
+SEED = 7
+BACKGROUND_VEHICLES = 1000
+FILES = ("MyRoutes.rou.xml", "missions.mis.xml")
+
+
+def write_background(base_dir):
+    """cases/MockPort/myRoutes.rou.xml: background vehicles merged with the trucks."""
+    with open(os.path.join(base_dir, "cases", bench_mock.MAP_NAME, "myRoutes.rou.xml"), "w") as f:
+        f.write("<routes>\n")
+        for i in range(BACKGROUND_VEHICLES):
+            f.write(f'  <vehicle id="car{i}" depart="{i * 7 % 3600}.00"><route edges="in0 a"/></vehicle>\n')
+        f.write("</routes>\n")
+
+
+def timed_create(nb_trucks, out_dir, context, bulk):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        Creator.create(bench_mock.MAP_NAME, nb_trucks, "Truck", out_dir, seed=SEED, context=context, bulk=bulk)
+    return time.perf_counter() - start
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as base_dir:
+        bench_mock.write_case(base_dir, 0)
+        write_background(base_dir)
+        os.chdir(base_dir)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                context = Creator.loadMapContext(bench_mock.MAP_NAME)
+            context["routeTable"] = None
+            print(f"{'trucks':>7} {'Creator [s]':>12} {'bulk [s]':>9} {'speed-up':>9}  same files")
+            for nb_trucks in sizes:
+                reference = timed_create(nb_trucks, "reference", context, False)
+                bulk = timed_create(nb_trucks, "bulk", context, True)
+                same = all(filecmp.cmp(os.path.join("reference", name), os.path.join("bulk", name), shallow=False)
+                           for name in FILES)
+                print(f"{nb_trucks:>7} {reference:>12.2f} {bulk:>9.2f} {reference / bulk:>8.1f}x  {same}")
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Compares pending-action lookups: XPath scan of the missions tree vs. MissionStore.
+
+Usage (from the repository root):
+    python benchmarks/bench_mission_index.py [lookups]
+"""
+import os
+import random
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mission_store import MissionStore
+
+
+def synthetic_missions(nb_missions):
+    root = ET.Element("Missions")
+    for i in range(nb_missions):
+        mission = ET.SubElement(root, "mission", id=f"trk{i + 1}", type="LPG")
+        for action_type in ("Load", "Park", "Go"):
+            ET.SubElement(mission, "action", type=action_type, target="X", edge="E", status="0")
+    return root
+
+
+def xpath_pending_action(mission_root, veh_id):
+    """The lookup previously done by Starter.getAction."""
+    for mission in mission_root.findall(".//mission[@id='{}']".format(veh_id)):
+        for action in mission.findall("action"):
+            if action.get("status") != "3":
+                return action
+        return None
+    return None
+
+
+def time_lookups(lookup, ids):
+    begin = time.perf_counter()
+    for veh_id in ids:
+        lookup(veh_id)
+    return (time.perf_counter() - begin) / len(ids)
+
+
+if __name__ == "__main__":
+    nb_lookups = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    print(f"{'missions':>9} {'xpath [us]':>12} {'index [us]':>12} {'speed-up':>9}")
+    for nb_missions in (100, 1000, 10000):
+        root = synthetic_missions(nb_missions)
+        store = MissionStore.from_root(root)
+        ids = [f"trk{random.randint(1, nb_missions)}" for _ in range(nb_lookups)]
+        xpath_time = time_lookups(lambda veh_id: xpath_pending_action(root, veh_id), ids)
+        index_time = time_lookups(store.pending_action, ids)
+        print(f"{nb_missions:>9} {xpath_time * 1e6:>12.1f} {index_time * 1e6:>12.2f} {xpath_time / index_time:>8.0f}x")
@@ -0,0 +1,103 @@
+"""
+Measures the overhead of the control loop (Starter.run_simulation) on the mock backend,
+so the cost of our Python code is isolated from SUMO. No SUMO installation is needed.
+
+A synthetic map cases/MockPort is generated in a temporary folder for each fleet size:
+an entry, two terminals (Crane1, Crane2), two parkings and an exit, with the whole
+fleet departing within the first DEPART_WINDOW seconds and Load/Unload/Park/Go missions.
+
+Usage (from the repository root):
+    python benchmarks/bench_mock.py [steps] [mode] [fleet sizes...]
+    python benchmarks/bench_mock.py 600 Mode111 100 1000 10000
+"""
+import contextlib
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ["LS2N_SUMO_BACKEND"] = "mock"
+sys.path.insert(0, ROOT)
+
+MAP_NAME = "MockPort"
+EDGES = ("in0", "a", "p1", "c1", "b", "p2", "c2", "out0")
+PARKINGS = (("Parking1", "p1", 50), ("Parking2", "p2", 50), ("Crane1", "c1", 20), ("Crane2", "c2", 20))
+MISSION_TYPES = ("LUG", "LPUG", "PLUG")
+DEPART_WINDOW = 60
+
+
+def write_case(base_dir, nb_trucks, seed=42):
+    rng = random.Random(seed)
+    case_dir = os.path.join(base_dir, "cases", MAP_NAME)
+    os.makedirs(case_dir)
+    with open(os.path.join(case_dir, "network.sumocfg"), "w") as f:
+        f.write('<configuration>\n  <input>\n    <net-file value="network.net.xml"/>\n'
+                '    <route-files value="MyRoutes.rou.xml"/>\n'
+                '    <additional-files value="parkings.add.xml"/>\n  </input>\n</configuration>\n')
+    with open(os.path.join(case_dir, "parkings.add.xml"), "w") as f:
+        f.write("<additional>\n")
+        for name, edge, capacity in PARKINGS:
+            f.write(f'  <parkingArea id="{name}" lane="{edge}_0" startPos="50" endPos="150" roadsideCapacity="{capacity}"/>\n')
+        f.write("</additional>\n")
+    with open(os.path.join(case_dir, "metaData.xml"), "w") as f:
+        f.write('<metaData>\n  <inputs><input value="in0"/></inputs>\n  <outputs><output value="out0"/></outputs>\n'
+                '  <missions>' + "".join(f'<mission value="{m}"/>' for m in MISSION_TYPES) + '</missions>\n'
+                '  <parkings><parking value="Parking1" edge="p1"/><parking value="Parking2" edge="p2"/></parkings>\n'
+                '  <stops><stop value="Crane1" edge="c1"/><stop value="Crane2" edge="c2"/></stops>\n'
+                f'  <routes><route edges="{" ".join(EDGES)}"/></routes>\n</metaData>\n')
+    vehicles = [(float(i * DEPART_WINDOW // max(nb_trucks, 1)), f"trk{i + 1}") for i in range(nb_trucks)]
+    with open(os.path.join(case_dir, "MyRoutes.rou.xml"), "w") as f:
+        f.write("<routes>\n")
+        for depart, veh_id in vehicles:
+            f.write(f'  <vehicle id="{veh_id}" depart="{depart:.2f}"><route edges="in0 a"/></vehicle>\n')
+        f.write("</routes>\n")
+    with open(os.path.join(case_dir, "missions.mis.xml"), "w") as f:
+        f.write("<missions>\n")
+        for i in range(nb_trucks):
+            kind = rng.choice(MISSION_TYPES)
+            f.write(f'  <mission id="trk{i + 1}" type="{kind}">\n')
+            for letter in kind:
+                if letter in "LU":
+                    name, edge = rng.choice((("Crane1", "c1"), ("Crane2", "c2")))
+                    kind_name = "Load" if letter == "L" else "Unload"
+                elif letter == "P":
+                    (name, edge), kind_name = rng.choice((("Parking1", "p1"), ("Parking2", "p2"))), "Park"
+                else:
+                    name, edge, kind_name = "out0", "out0", "Go"
+                f.write(f'    <action type="{kind_name}" target="{name}" edge="{edge}" status="0"/>\n')
+            f.write("  </mission>\n")
+        f.write("</missions>\n")
+
+
+def run(nb_trucks, steps, mode):
+    import Starter
+    work_dir = tempfile.mkdtemp(prefix="bench_mock_")
+    cwd = os.getcwd()
+    try:
+        write_case(work_dir, nb_trucks)
+        os.chdir(work_dir)
+        begin = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            summary = Starter.run_simulation(MAP_NAME, mode, simulation_end_seconds=steps, sumo_binary="sumo",
+                                             seed=42, monitor=False, backend="mock")
+        elapsed = time.perf_counter() - begin
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return (summary["steps"] if summary else 0), elapsed, summary
+
+
+if __name__ == "__main__":
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 600
+    mode = sys.argv[2] if len(sys.argv) > 2 else "Mode111"
+    sizes = [int(n) for n in sys.argv[3:]] or [100, 1000, 10000]
+
+    print(f"{'trucks':>7} {'steps':>7} {'time [s]':>9} {'steps/s':>8} {'ms/step':>8}")
+    for nb_trucks in sizes:
+        done, elapsed, summary = run(nb_trucks, steps, mode)
+        rate = done / elapsed if elapsed else 0
+        print(f"{nb_trucks:>7} {done:>7} {elapsed:>9.2f} {rate:>8.1f} {1000 * elapsed / max(done, 1):>8.2f}")
@@ -0,0 +1,69 @@
+"""
+Counts TraCI round-trips per step: per-vehicle getters vs. subscriptions.
+
+Usage (from the repository root, SUMO_HOME set):
+    python benchmarks/bench_subscriptions.py [mapName] [steps]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if 'SUMO_HOME' in os.environ:
+    sys.path.append(os.path.join(os.environ['SUMO_HOME'], 'tools'))
+
+import traci
+import traci.connection
+import sumolib
+from subscriptions import VehicleSubscriptions
+
+_round_trips = [0]
+_send_exact = traci.connection.Connection._sendExact
+
+
+def _counting_send_exact(self):
+    _round_trips[0] += 1
+    return _send_exact(self)
+
+
+traci.connection.Connection._sendExact = _counting_send_exact
+
+
+def poll_states():
+    """The pre-subscription access pattern of Starter.run_simulation."""
+    for veh_id in traci.vehicle.getIDList():
+        if "trk" in veh_id:
+            traci.vehicle.getRoadID(veh_id)
+            traci.vehicle.getSpeed(veh_id)
+            traci.vehicle.getAccumulatedWaitingTime(veh_id)
+            traci.vehicle.getDistance(veh_id)
+            traci.vehicle.getSpeedFactor(veh_id)
+            traci.vehicle.getCO2Emission(veh_id)
+            traci.vehicle.getNOxEmission(veh_id)
+            traci.vehicle.isStopped(veh_id)
+        traci.vehicle.getSpeed(veh_id)
+
+
+def run(map_name, steps, use_subscriptions):
+    config = f"cases/{map_name}/network.sumocfg"
+    traci.start([sumolib.checkBinary("sumo"), "-c", config, "--no-step-log"])
+    subscriptions = VehicleSubscriptions() if use_subscriptions else None
+    if subscriptions: subscriptions.start()
+    _round_trips[0] = 0
+    begin = time.perf_counter()
+    for _ in range(steps):
+        traci.simulationStep()
+        if subscriptions: subscriptions.update()
+        else: poll_states()
+    elapsed = time.perf_counter() - begin
+    trips = _round_trips[0]
+    traci.close()
+    return trips, elapsed
+
+
+if __name__ == "__main__":
+    map_name = sys.argv[1] if len(sys.argv) > 1 else "Nantes"
+    steps = int(sys.argv[2]) if len(sys.argv) > 2 else 3600
+    for label, use_subscriptions in (("getters", False), ("subscriptions", True)):
+        trips, elapsed = run(map_name, steps, use_subscriptions)
+        print(f"{label:>13}: {trips} round-trips ({trips / steps:.1f}/step), {elapsed:.2f}s, {steps / elapsed:.0f} steps/s")
@@ -0,0 +1,192 @@
+"""
+Vectorized generation of the route and mission files of large instances.
+
+Creator draws every value of an instance with rng.random(), in block order:
+departs, routes, mission types, then one target per Load/Unload/Park/Go action.
+This module draws the same blocks as numpy arrays from a RandomState put in the
+state of random.Random(seed), so a seed gives the very same files as the
+element-by-element generator, and renders the trucks and missions to text in
+chunks instead of building one ElementTree element per vehicle and action.
+
+    context = Creator.loadMapContext("Nantes")
+    bulk_generation.create("Nantes", 100000, "Truck", "cases/Nantes/instances/big", seed=7, context=context)
+
+Creator.create uses it for seeded instances.
+"""
+import os
+import random
+from collections import namedtuple
+from xml.sax.saxutils import quoteattr
+
+import numpy as np
+
+import xml_stream
+
+KINDS = "LUPG" # Load, Unload, Park, Go, in Creator.createAction order
+ACTION_TYPES = ("Load", "Unload", "Park", "Go")
+CHUNK_TRUCKS = 10000 # trucks rendered per write
+
+InstanceDraws = namedtuple("InstanceDraws", ("departs", "routes", "templates", "action_counts", "kinds", "targets"))
+
+
+def random_state(seed):
+    """numpy RandomState whose random_sample() continues the random() sequence of random.Random(seed)."""
+    _, state, _ = random.Random(seed).getstate()
+    rs = np.random.RandomState()
+    rs.set_state(("MT19937", np.array(state[:-1], dtype=np.uint32), state[-1]))
+    return rs
+
+
+def _pick(u, sizes):
+    """int(u * n) of Creator.draw, element-wise."""
+    return (u * sizes).astype(np.intp)
+
+
+def draw_instance(meta, nb_trucks, rs):
+    """
+    Draws all the random values of an instance in Creator's order.
+    Args:
+        meta (map_metadata.MapMetadata): Routes, missions, stops, parkings and outputs of the map.
+        nb_trucks (int): Number of trucks.
+        rs (numpy.random.RandomState): See random_state().
+    Returns:
+        InstanceDraws: Sorted departs, route and mission type index per truck, number of actions per truck,
+        then kind (index in KINDS) and target index of every action, in truck then action order.
+    """
+    departs = np.sort(_pick(rs.random_sample(nb_trucks), nb_trucks * 120 + 1))
+    if nb_trucks and not (meta.routes and meta.missions):
+        raise ValueError("The map metadata has no routes or no mission types")
+    routes = _pick(rs.random_sample(nb_trucks), len(meta.routes))
+    templates = _pick(rs.random_sample(nb_trucks), len(meta.missions))
+
+    # Action kinds of every mission type, padded with -1 (characters without an action draw nothing)
+    codes = [[KINDS.index(c) for c in mission if c in KINDS] for mission in meta.missions]
+    table = np.full((len(codes), max((len(c) for c in codes), default=0)), -1, dtype=np.intp)
+    for i, c in enumerate(codes):
+        table[i, :len(c)] = c
+    kinds = table[templates]
+    valid = kinds >= 0
+    kinds = kinds[valid] # row-major: truck then action order
+    pool_sizes = np.array([len(meta.stops), len(meta.stops), len(meta.parkings), len(meta.outputs)])
+    sizes = pool_sizes[kinds]
+    if (sizes == 0).any():
+        raise ValueError("The map metadata has no target for an action of its mission types")
+    targets = _pick(rs.random_sample(len(kinds)), sizes)
+    return InstanceDraws(departs, routes, templates, valid.sum(axis=1), kinds, targets)
+
+
+def _action_pools(meta, separator):
+    """Per kind: rendered <action/> elements and edges, indexed by target."""
+    rendered, edges = [], []
+    for kind, action_type in zip(KINDS, ACTION_TYPES):
+        if kind == "G":
+            pool = [(output, output) for output in meta.outputs]
+        else:
+            pool = meta.parkings if kind == "P" else meta.stops
+        rendered.append([f'{separator}<action type="{action_type}" target={quoteattr(name)} edge={quoteattr(edge)}'
+                         f' status="0"/>' for name, edge in pool])
+        edges.append([edge for _, edge in pool])
+    return rendered, edges
+
+
+def write_routes(file_path, vehicle_type, draws, meta, background, indent="  "):
+    """
+    Writes MyRoutes.rou.xml like Creator.injectionTraffic: vType, then background vehicles and trucks
+    merged by depart (background first on equal departs).
+    Returns:
+        list: First edge of the route of each truck (None for an empty route).
+    """
+    nl = "\n" + indent if indent else ""
+    nl2 = "\n" + indent * 2 if indent else ""
+    route_tails = [f'">{nl2}<route edges={quoteattr(" ".join(edges))}/>{nl}</vehicle>' for edges in meta.routes]
+    head = f'{nl}<vehicle id="trk%d" color="255,0,0" type={quoteattr(vehicle_type)} depart="%d.00'
+    departs = draws.departs.tolist()
+    routes = draws.routes.tolist()
+
+    def write_trucks(writer, start, stop):
+        for chunk in range(start, stop, CHUNK_TRUCKS):
+            end = min(chunk + CHUNK_TRUCKS, stop)
+            writer.raw("".join([head % (i + 1, departs[i]) + route_tails[routes[i]] for i in range(chunk, end)]),
+                       end - chunk)
+
+    # Trucks departing strictly before each background vehicle
+    positions = np.searchsorted(draws.departs, [float(veh.get("depart")) for veh in background], side="left")
+    with xml_stream.XMLStreamWriter(file_path, "routes", indent=indent) as writer:
+        xml_stream.write_vtype(writer, vehicle_type)
+        written = 0
+        for veh, position in zip(background, positions.tolist()):
+            write_trucks(writer, written, position)
+            written = max(written, position)
+            writer.write(veh)
+        write_trucks(writer, written, len(departs))
+    return [meta.routes[r][0] if meta.routes[r] else None for r in routes]
+
+
+def write_missions(file_path, draws, meta, truck_starts, route_table=None, indent="  "):
+    """
+    Writes missions.mis.xml like Creator.createMissions.
+    Returns:
+        list: (truck id, from edge, to edge) of the legs route_table cannot drive, empty without a table.
+    """
+    nl = "\n" + indent if indent else ""
+    rendered, edges = _action_pools(meta, "\n" + indent * 2 if indent else "")
+    types = [quoteattr(mission) for mission in meta.missions]
+    templates = draws.templates.tolist()
+    counts = draws.action_counts.tolist()
+    offsets = np.concatenate(([0], np.cumsum(draws.action_counts))).tolist()
+    kinds = draws.kinds.tolist()
+    targets = draws.targets.tolist()
+    reachable = route_table.paths if route_table is not None else None
+    unreachable = []
+
+    with xml_stream.XMLStreamWriter(file_path, "Missions", indent=indent) as writer:
+        for chunk in range(0, len(templates), CHUNK_TRUCKS):
+            end = min(chunk + CHUNK_TRUCKS, len(templates))
+            parts = []
+            for i in range(chunk, end):
+                parts.append(f'{nl}<mission id="trk{i + 1}" type={types[templates[i]]}')
+                if not counts[i]:
+                    parts.append("/>")
+                    continue
+                parts.append(">")
+                previous = truck_starts[i]
+                for a in range(offsets[i], offsets[i + 1]):
+                    kind, target = kinds[a], targets[a]
+                    parts.append(rendered[kind][target])
+                    if reachable is not None:
+                        edge = edges[kind][target]
+                        if previous is not None and (previous, edge) not in reachable:
+                            unreachable.append(("trk" + str(i + 1), previous, edge))
+                        previous = edge
+                parts.append(f"{nl}</mission>")
+            writer.raw("".join(parts), end - chunk)
+    return unreachable
+
+
+def create(map_name, nb_trucks, vehicle_type, out_dir=None, seed=None, context=None):
+    """
+    Same files and console output as Creator.create(map_name, nb_trucks, vehicle_type, out_dir, seed).
+    Args:
+        seed: Seed of the instance, None for a random one (the global random module is not used).
+        context (dict): Creator.loadMapContext(map_name), to reuse already parsed map files.
+    """
+    import Creator
+    context = context or Creator.loadMapContext(map_name)
+    meta = context["meta"]
+    background = context["background"]
+    route_table = context.get("routeTable")
+    out_dir = out_dir or os.path.join("cases", map_name)
+    os.makedirs(out_dir, exist_ok=True)
+
+    draws = draw_instance(meta, nb_trucks, random_state(seed))
+
+    routes_path = os.path.join(out_dir, "MyRoutes.rou.xml")
+    truck_starts = write_routes(routes_path, vehicle_type, draws, meta, background)
+    print(f"MyRoutes.rou.xml: {len(background)} background vehicles, {nb_trucks} trucks -> {routes_path}")
+
+    print(f"Creating {nb_trucks} missions")
+    unreachable = write_missions(os.path.join(out_dir, "missions.mis.xml"), draws, meta, truck_starts, route_table)
+    if route_table is not None:
+        print(f"{len(unreachable)} unreachable mission legs")
+        for truck_id, from_edge, to_edge in unreachable[:10]:
+            print(f"  {truck_id}: no route from {from_edge} to {to_edge}")
@@ -0,0 +1,109 @@
+"""
+Periodic checkpoints of a run: SUMO's saved state plus the Python-side run state.
+
+Layout, under the checkpoint directory (default <results>/checkpoints):
+    step_0003000/sumo_state.xml   written by SUMO (traci.simulation.saveState)
+    step_0003000/run_state.pkl    missions, accumulators, truck sets, report offsets
+
+The run state is copied on the main thread and pickled by a background thread;
+run_state.pkl is written last (atomically), so a checkpoint is complete once it exists.
+"""
+import os
+import pickle
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from sim_backend import traci
+
+SUMO_STATE_FILE = "sumo_state.xml"
+RUN_STATE_FILE = "run_state.pkl"
+CHECKPOINT_VERSION = 2
+
+
+def checkpoint_name(step):
+    return f"step_{step:07d}"
+
+
+def list_checkpoints(directory):
+    """Complete checkpoints of a directory as (step, path), oldest first."""
+    found = []
+    if not os.path.isdir(directory):
+        return found
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.startswith("step_") and os.path.exists(os.path.join(path, RUN_STATE_FILE)):
+            try:
+                found.append((int(name[5:]), path))
+            except ValueError:
+                pass
+    return sorted(found)
+
+
+def latest(directory):
+    """Path of the most recent complete checkpoint, or None."""
+    checkpoints = list_checkpoints(directory)
+    return checkpoints[-1][1] if checkpoints else None
+
+
+def load_run_state(path):
+    with open(os.path.join(path, RUN_STATE_FILE), "rb") as f:
+        state = pickle.load(f)
+    if state.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version {state.get('version')} in {path}")
+    return state
+
+
+def restore_sumo_state(path):
+    """Loads the SUMO state of a checkpoint into the running simulation."""
+    traci.simulation.loadState(os.path.abspath(os.path.join(path, SUMO_STATE_FILE)))
+
+
+class Checkpointer:
+    """
+    Saves a checkpoint every `every` steps and keeps the `keep` most recent ones.
+
+    Usage:
+        checkpointer = Checkpointer(directory, every=3000)
+        if checkpointer.due(step):
+            checkpointer.save(step, run_state)   # run_state: dict of copies, pickled off-thread
+        checkpointer.close()                     # waits for the last write
+    """
+
+    def __init__(self, directory, every, keep=2):
+        self.directory = directory
+        self.every = every
+        self.keep = keep
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint")
+        self._pending = None
+
+    def due(self, step):
+        return bool(self.every) and step > 0 and step % self.every == 0
+
+    def save(self, step, run_state):
+        path = os.path.join(self.directory, checkpoint_name(step))
+        os.makedirs(path, exist_ok=True)
+        traci.simulation.saveState(os.path.abspath(os.path.join(path, SUMO_STATE_FILE)))
+        self.wait() # at most one write in flight
+        state = dict(run_state, version=CHECKPOINT_VERSION, step=step)
+        self._pending = self._executor.submit(self._write, path, state)
+
+    def _write(self, path, state):
+        tmp_path = os.path.join(path, RUN_STATE_FILE + ".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, os.path.join(path, RUN_STATE_FILE))
+        print(f"Checkpoint saved: {path}")
+        for _, old_path in list_checkpoints(self.directory)[:-self.keep]:
+            shutil.rmtree(old_path, ignore_errors=True)
+
+    def wait(self):
+        if self._pending is not None:
+            try:
+                self._pending.result()
+            except (OSError, pickle.PicklingError) as e:
+                print(f"ERROR writing checkpoint: {e}")
+            self._pending = None
+
+    def close(self):
+        self.wait()
+        self._executor.shutdown(wait=True)
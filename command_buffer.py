@@ -0,0 +1,153 @@
+"""
+Per-step buffer of the TraCI write commands of the control loop.
+
+The mission logic decides speed factors, stops and teleports truck by truck; each
+write used to be sent at once, one blocking round-trip each. CommandBuffer
+queues them during the step and run_simulation sends them right before the next
+simulationStep() (and once more when the run ends), in call order (so per vehicle too):
+
+    commands = CommandBuffer()
+    commands.set_speed_factor(veh_id, 0.5)    # queued
+    commands.flush()                          # before traci.simulationStep()
+
+Writes that would not change anything are never sent: a setSpeedFactor equal to
+the last value sent for the vehicle, or superseded by a later one in the same
+step. Nothing is pipelined: the TraCI client sends one command per message and
+waits for its answer, so the queued commands are still sent one by one. What is
+saved is the suppressed round-trips, counted per step in saved_last_flush (and in
+the profile, see StepProfiler).
+
+A command that needs SUMO's answer at once (e.g. RouteCache.change_target reads
+the new route back) must first call flush_vehicle() for that vehicle.
+CommandBuffer(immediate=True) sends every command when it is queued, for callers
+outside the step loop.
+"""
+import sim_logging
+from sim_backend import traci
+
+log = sim_logging.get_logger("commands")
+
+# Setters whose effect only depends on their last value
+SUPPRESSIBLE = ("setSpeedFactor",)
+
+
+class _Command:
+    __slots__ = ("veh_id", "name", "args", "kwargs", "on_error", "cancelled")
+
+    def __init__(self, veh_id, name, args, kwargs, on_error):
+        self.veh_id = veh_id
+        self.name = name
+        self.args = args
+        self.kwargs = kwargs
+        self.on_error = on_error
+        self.cancelled = False
+
+
+class CommandBuffer:
+
+    def __init__(self, immediate=False):
+        self.immediate = immediate
+        self._queue = []
+        self._pending = {} # (vehicle, setter) -> queued _Command of a SUPPRESSIBLE setter
+        self._sent_values = {} # (vehicle, setter) -> args last sent
+        self.sent = 0
+        self.saved = 0
+        self.saved_last_flush = 0
+        self._saved_since_flush = 0
+
+    def queue(self, veh_id, name, *args, on_error=None, **kwargs):
+        """
+        Queues traci.vehicle.<name>(veh_id, *args, **kwargs).
+        Args:
+            on_error (callable): Called with the TraCIException if the command fails when flushed.
+        """
+        if self.immediate:
+            self._send(_Command(veh_id, name, args, kwargs, on_error))
+            return
+        if name in SUPPRESSIBLE:
+            key = (veh_id, name)
+            pending = self._pending.get(key)
+            unchanged = self._sent_values.get(key) == args
+            if pending is not None:
+                # Superseded in the same step: only the last value is sent, if it changes anything
+                self._saved_since_flush += 1
+                pending.args = args
+                pending.cancelled = unchanged
+                if unchanged:
+                    del self._pending[key]
+                    self._saved_since_flush += 1
+                return
+            if unchanged:
+                self._saved_since_flush += 1
+                return
+            command = self._pending[key] = _Command(veh_id, name, args, kwargs, on_error)
+        else:
+            command = _Command(veh_id, name, args, kwargs, on_error)
+        self._queue.append(command)
+
+    def set_speed_factor(self, veh_id, factor):
+        self.queue(veh_id, "setSpeedFactor", factor)
+
+    def set_parking_area_stop(self, veh_id, stop_id, duration, on_error=None):
+        self.queue(veh_id, "setParkingAreaStop", stop_id, duration=duration, on_error=on_error)
+
+    def replace_stop(self, veh_id, duration=0, flags=0):
+        self.queue(veh_id, "replaceStop", duration=duration, flags=flags)
+
+    def move_to(self, veh_id, lane_id, pos):
+        self.queue(veh_id, "moveTo", lane_id, pos)
+
+    def _send(self, command):
+        if command.cancelled:
+            return
+        key = (command.veh_id, command.name)
+        if self._pending.get(key) is command:
+            del self._pending[key]
+        try:
+            getattr(traci.vehicle, command.name)(command.veh_id, *command.args, **command.kwargs)
+        except traci.TraCIException as e:
+            log.warning("Warning: TraCI error in %s for %s: %s", command.name, command.veh_id, e)
+            if command.on_error is not None:
+                command.on_error(e)
+            return
+        self.sent += 1
+        if command.name in SUPPRESSIBLE and not self.immediate:
+            self._sent_values[key] = command.args
+
+    def flush_vehicle(self, veh_id):
+        """Sends the queued commands of one vehicle now, keeping the others queued."""
+        if not any(command.veh_id == veh_id for command in self._queue):
+            return
+        remaining = []
+        for command in self._queue:
+            if command.veh_id == veh_id:
+                self._send(command)
+            else:
+                remaining.append(command)
+        self._queue = remaining
+
+    def flush(self):
+        """
+        Sends every queued command, in call order (call right before traci.simulationStep()).
+        Returns:
+            int: Round-trips saved since the previous flush.
+        """
+        queue, self._queue = self._queue, []
+        for command in queue:
+            self._send(command)
+        self._pending.clear()
+        self.saved_last_flush = self._saved_since_flush
+        self.saved += self._saved_since_flush
+        self._saved_since_flush = 0
+        return self.saved_last_flush
+
+    def forget(self, veh_ids):
+        """Drops the last values sent to vehicles that left the simulation."""
+        if not self._sent_values:
+            return
+        for veh_id in veh_ids:
+            for name in SUPPRESSIBLE:
+                self._sent_values.pop((veh_id, name), None)
+
+    def summary(self):
+        return f"TraCI write commands: {self.sent} sent, {self.saved} suppressed"
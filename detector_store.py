@@ -0,0 +1,246 @@
+"""
+Columnar store of the e1 detector (induction loop) output.
+
+SUMO writes the intervals of every e1Detector of a map into the XML files named
+by their file attribute (cases/Nantes: detector_aggregated_output.xml for all
+735 detectors). ingest() streams such a file with iterparse, clearing elements
+as it goes, and appends the intervals in chunks to one binary file per column:
+
+    <store>/meta.json        row count, column dtypes, source file
+    <store>/detectors.json   detector IDs; the "detector" column holds their index
+    <store>/<column>.bin     raw little-endian values, one per interval row
+
+so memory stays constant whatever the size of the XML. DetectorStore opens the
+columns as numpy memmaps for per-detector time series and detector x interval
+matrices. run_simulation ingests the detector files written during the run
+(named with its SUMO --output-prefix) into '<mode>_detectors' next to the reports.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import xml.etree.ElementTree as ET
+from array import array
+
+import numpy as np
+
+STORE_VERSION = 1
+CHUNK_ROWS = 1 << 16
+# column -> (array typecode, numpy dtype, SUMO attribute)
+COLUMNS = {
+    "detector": ("I", "<u4", "id"),
+    "begin": ("d", "<f8", "begin"),
+    "end": ("d", "<f8", "end"),
+    "nVehContrib": ("I", "<u4", "nVehContrib"),
+    "flow": ("f", "<f4", "flow"),
+    "occupancy": ("f", "<f4", "occupancy"),
+    "speed": ("f", "<f4", "speed"),
+    "harmonicMeanSpeed": ("f", "<f4", "harmonicMeanSpeed"),
+    "length": ("f", "<f4", "length"),
+    "nVehEntered": ("I", "<u4", "nVehEntered"),
+}
+NUMERIC_COLUMNS = tuple(name for name in COLUMNS if name != "detector")
+NAN = float("nan")
+
+
+def detector_files(additional_file_paths, output_prefix=""):
+    """
+    Output files of the e1Detectors declared in additional files, resolved like SUMO: relative to the
+    file, with the --output-prefix of the run put in front of the file name.
+    """
+    files = []
+    for file_path in additional_file_paths:
+        try:
+            for _, el in ET.iterparse(file_path, events=("end",)):
+                if el.tag in ("e1Detector", "inductionLoop") and el.get("file"):
+                    directory, name = os.path.split(el.get("file"))
+                    output = os.path.normpath(os.path.join(os.path.dirname(file_path), directory, output_prefix + name))
+                    if output not in files:
+                        files.append(output)
+                el.clear()
+        except (OSError, ET.ParseError) as e:
+            print(f"Warning: could not read detectors from {file_path}: {e}")
+    return files
+
+
+class _ColumnWriter:
+    """Buffers up to CHUNK_ROWS rows per column and appends them to the column files."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.rows = 0
+        self._buffers = {name: array(typecode) for name, (typecode, _, _) in COLUMNS.items()}
+        self._files = {name: open(os.path.join(directory, f"{name}.bin"), "wb") for name in COLUMNS}
+        self._fields = [(self._buffers[name], COLUMNS[name][2], COLUMNS[name][0] == "I") for name in NUMERIC_COLUMNS]
+
+    def append(self, detector, attrs):
+        """One <interval> row: detector index and the element's attributes."""
+        self._buffers["detector"].append(detector)
+        for buffer, attribute, is_int in self._fields:
+            raw = attrs.get(attribute)
+            if is_int:
+                buffer.append(int(float(raw)) if raw else 0)
+            else:
+                buffer.append(float(raw) if raw else NAN)
+        self.rows += 1
+        if len(self._buffers["detector"]) >= CHUNK_ROWS:
+            self.flush()
+
+    def flush(self):
+        for name, buffer in self._buffers.items():
+            if sys.byteorder == "big": # array.tofile writes native byte order; the store is little-endian
+                buffer.byteswap()
+            buffer.tofile(self._files[name])
+            del buffer[:]
+
+    def close(self):
+        self.flush()
+        for f in self._files.values():
+            f.close()
+
+
+def ingest(xml_path, store_dir):
+    """
+    Converts an e1 detector output file into a store folder (replaced if it exists).
+    Returns:
+        int: Number of interval rows.
+    """
+    tmp_dir = f"{store_dir}.tmp{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    detectors = {}
+    writer = _ColumnWriter(tmp_dir)
+    try:
+        context = ET.iterparse(xml_path, events=("start", "end"))
+        _, root = next(context)
+        for event, el in context:
+            if event != "end" or el.tag != "interval":
+                continue
+            attrs = el.attrib
+            det_id = attrs.get("id")
+            index = detectors.get(det_id)
+            if index is None:
+                index = detectors[det_id] = len(detectors)
+            writer.append(index, attrs)
+            root.clear() # drop the processed intervals
+    except Exception:
+        writer.close()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    writer.close()
+
+    with open(os.path.join(tmp_dir, "detectors.json"), "w", encoding="utf-8") as f:
+        json.dump(list(detectors), f)
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": STORE_VERSION, "rows": writer.rows, "source": os.path.abspath(xml_path),
+                   "columns": {name: dtype for name, (_, dtype, _) in COLUMNS.items()}}, f, indent=1)
+    shutil.rmtree(store_dir, ignore_errors=True)
+    os.replace(tmp_dir, store_dir)
+    return writer.rows
+
+
+class DetectorStore:
+    """
+    Read access to a store folder written by ingest().
+
+        store = DetectorStore("cases/Nantes/results/Mode111/Mode111_detectors")
+        begins, flow = store.series("det_Fosse_P1", "flow")
+        detectors, begins, matrix = store.matrix("occupancy")
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != STORE_VERSION:
+            raise ValueError(f"Unsupported detector store version in {store_dir}")
+        with open(os.path.join(store_dir, "detectors.json"), encoding="utf-8") as f:
+            self.detectors = json.load(f)
+        self.detector_index = {det_id: i for i, det_id in enumerate(self.detectors)}
+        self.rows = self.meta["rows"]
+        self._columns = {}
+
+    def column(self, name):
+        """Memory-mapped column (numpy array of `rows` values)."""
+        if name not in self._columns:
+            dtype = np.dtype(self.meta["columns"][name])
+            if self.rows == 0:
+                self._columns[name] = np.zeros(0, dtype=dtype)
+            else:
+                self._columns[name] = np.memmap(os.path.join(self.store_dir, f"{name}.bin"), dtype=dtype,
+                                                mode="r", shape=(self.rows,))
+        return self._columns[name]
+
+    def rows_of(self, detector_id):
+        index = self.detector_index.get(detector_id)
+        if index is None:
+            raise KeyError(f"Unknown detector '{detector_id}'")
+        return np.flatnonzero(self.column("detector") == index)
+
+    def series(self, detector_id, column="flow"):
+        """Interval begin times and values of one detector, in time order."""
+        rows = self.rows_of(detector_id)
+        begins = np.asarray(self.column("begin")[rows])
+        order = np.argsort(begins, kind="stable")
+        return begins[order], np.asarray(self.column(column)[rows])[order]
+
+    def intervals(self):
+        return np.unique(self.column("begin"))
+
+    def matrix(self, column="flow"):
+        """
+        Returns:
+            tuple: (detector IDs, interval begins, detector x interval array, NaN where no interval was written)
+        """
+        begins = self.intervals()
+        matrix = np.full((len(self.detectors), len(begins)), np.nan)
+        step = CHUNK_ROWS
+        for start in range(0, self.rows, step):
+            stop = min(start + step, self.rows)
+            cols = np.searchsorted(begins, self.column("begin")[start:stop])
+            matrix[self.column("detector")[start:stop], cols] = self.column(column)[start:stop]
+        return list(self.detectors), begins, matrix
+
+
+def ingest_run(additional_file_paths, folder, mode, output_prefix="", since=None):
+    """
+    Ingests the detector files of a run into '<folder>/<mode>_detectors' (one sub-store per file when
+    there are several). Only the files named with the run's output_prefix are read, so runs of the same
+    map in parallel do not pick up each other's output; files not modified since `since` (a timestamp)
+    are left out as stale.
+    Returns:
+        list: Written store folders.
+    """
+    written = []
+    files = [f for f in detector_files(additional_file_paths, output_prefix)
+             if os.path.exists(f) and (since is None or os.path.getmtime(f) >= since)]
+    for file_path in files:
+        name = f"{mode}_detectors"
+        if len(files) > 1:
+            name += "_" + os.path.splitext(os.path.basename(file_path))[0][len(output_prefix):]
+        store_dir = os.path.join(folder, name)
+        rows = ingest(file_path, store_dir)
+        print(f"Saved detector store: {store_dir} ({rows} intervals)")
+        written.append(store_dir)
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="e1 detector output -> columnar store")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest_parser = commands.add_parser("ingest", help="Convert a detector output XML file")
+    ingest_parser.add_argument("xml")
+    ingest_parser.add_argument("store")
+    series_parser = commands.add_parser("series", help="Print the time series of a detector")
+    series_parser.add_argument("store")
+    series_parser.add_argument("detector")
+    series_parser.add_argument("--column", default="flow", choices=NUMERIC_COLUMNS)
+    args = parser.parse_args()
+
+    if args.command == "ingest":
+        print(f"{ingest(args.xml, args.store)} intervals written to {args.store}")
+    else:
+        begins, values = DetectorStore(args.store).series(args.detector, args.column)
+        for begin, value in zip(begins, values):
+            print(f"{begin:.2f};{value}")
@@ -0,0 +1,145 @@
+"""
+Lifecycle of the trucks of a run: entered, still in the network, exited.
+
+run_simulation used to keep inTrucks/outTrucks lists, test `vehID not in
+inTrucks` for every truck of every step and scan all the trucks ever seen for
+exits, so a step cost grew with the trucks served. FleetTracker is driven by the
+departed/arrived lists SUMO returns each step (see VehicleSubscriptions) and
+keeps one byte per truck index:
+
+    fleet = FleetTracker(nbTrucks)
+    fleet.update(subscriptions.departed, subscriptions.arrived, step)
+    fleet.entered_count, fleet.exited_count, fleet.complete()   # O(1)
+
+Depart and arrival times (simulation seconds) are kept per truck; the trucks
+that left are removed from the active set.
+"""
+from array import array
+
+import sim_logging
+
+log = sim_logging.get_logger("fleet")
+
+OUTSIDE, ACTIVE, EXITED = 0, 1, 2
+NAN = float("nan")
+
+
+class FleetTracker:
+
+    def __init__(self, nb_trucks, truck_prefix="trk"):
+        """
+        Args:
+            nb_trucks (int): Trucks of the mission file, trk1..trkN.
+            truck_prefix (str): Substring identifying trucks (as VehicleSubscriptions).
+        """
+        self.nb_trucks = nb_trucks
+        self.truck_prefix = truck_prefix
+        self.status = bytearray(nb_trucks) # OUTSIDE / ACTIVE / EXITED per truck index
+        self.depart_times = array("d", [NAN]) * nb_trucks
+        self.arrive_times = array("d", [NAN]) * nb_trucks
+        self.extra = {} # trucks outside trk1..trkN (counted, not timed) -> status
+        self.active = set()
+        self.entered_count = 0
+        self.exited_count = 0
+        self.exited_in_range = 0
+
+    def index(self, veh_id):
+        """trkN -> N-1, -1 if out of range (same parsing as run_simulation)."""
+        try:
+            index = int(veh_id[len(self.truck_prefix):]) - 1
+        except ValueError:
+            return -1
+        return index if 0 <= index < self.nb_trucks else -1
+
+    def _status(self, veh_id, index):
+        return self.status[index] if index != -1 else self.extra.get(veh_id, OUTSIDE)
+
+    def _set_status(self, veh_id, index, status):
+        if index != -1:
+            self.status[index] = status
+        else:
+            self.extra[veh_id] = status
+
+    def enter(self, veh_id, time):
+        index = self.index(veh_id)
+        if self._status(veh_id, index) != OUTSIDE:
+            return
+        self._set_status(veh_id, index, ACTIVE)
+        if index != -1:
+            self.depart_times[index] = time
+        self.active.add(veh_id)
+        self.entered_count += 1
+
+    def exit(self, veh_id, time):
+        index = self.index(veh_id)
+        status = self._status(veh_id, index)
+        if status == EXITED:
+            return
+        if status == OUTSIDE: # departed and arrived between two updates
+            self.enter(veh_id, time)
+        self._set_status(veh_id, index, EXITED)
+        if index != -1:
+            self.arrive_times[index] = time
+            self.exited_in_range += 1
+        self.active.discard(veh_id)
+        self.exited_count += 1
+        log.info("Truck %s exited simulation.", veh_id)
+
+    def start(self, veh_ids, time=0):
+        """Trucks already in the network (e.g. after loading a state)."""
+        for veh_id in veh_ids:
+            if self.truck_prefix in veh_id:
+                self.enter(veh_id, time)
+
+    def update(self, departed, arrived, time):
+        """Call once per step with the departed and arrived vehicle IDs of the step."""
+        prefix = self.truck_prefix
+        for veh_id in departed:
+            if prefix in veh_id:
+                self.enter(veh_id, time)
+        for veh_id in arrived:
+            if prefix in veh_id:
+                self.exit(veh_id, time)
+
+    def complete(self):
+        """Every truck of the mission file has left the network."""
+        return self.nb_trucks > 0 and self.exited_in_range == self.nb_trucks
+
+    def trip_time(self, veh_id):
+        """Seconds between depart and arrival, NaN if unknown or still driving."""
+        index = self.index(veh_id)
+        return self.arrive_times[index] - self.depart_times[index] if index != -1 else NAN
+
+    def summary(self):
+        trips = [a - d for d, a in zip(self.depart_times, self.arrive_times) if a == a and d == d]
+        mean = sum(trips) / len(trips) if trips else 0.0
+        return (f"Fleet: {self.entered_count} trucks entered, {self.exited_count} exited, {len(self.active)} in the "
+                f"network, mean trip {mean:.0f} s")
+
+    def state(self):
+        """Copy saved in checkpoints."""
+        return {"nb_trucks": self.nb_trucks, "status": bytes(self.status), "depart_times": self.depart_times.tobytes(),
+                "arrive_times": self.arrive_times.tobytes(), "extra": dict(self.extra)}
+
+    def load_state(self, state):
+        if state["nb_trucks"] != self.nb_trucks:
+            raise ValueError(f"Checkpoint fleet has {state['nb_trucks']} trucks, mission file {self.nb_trucks}")
+        self.__init__(self.nb_trucks, self.truck_prefix)
+        self.status[:] = state["status"]
+        self.depart_times = array("d", state["depart_times"])
+        self.arrive_times = array("d", state["arrive_times"])
+        self.extra = dict(state["extra"])
+        for index, status in enumerate(self.status):
+            self._count(f"{self.truck_prefix}{index + 1}", status, True)
+        for veh_id, status in self.extra.items():
+            self._count(veh_id, status, False)
+
+    def _count(self, veh_id, status, in_range):
+        if status == OUTSIDE:
+            return
+        self.entered_count += 1
+        if status == ACTIVE:
+            self.active.add(veh_id)
+        else:
+            self.exited_count += 1
+            self.exited_in_range += in_range
@@ -0,0 +1,95 @@
+"""
+Typed model of a map's metaData.xml, parsed in a single pass and cached per map.
+
+Creator, Starter and myPyLib share the same MapMetadata instance; the cache entry
+is dropped when the file's modification time or size changes, so repeated
+create/launch cycles in one GUI session never re-parse an unchanged file.
+"""
+import os
+import threading
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+
+Parking = namedtuple("Parking", ("name", "edge"))
+Stop = namedtuple("Stop", ("name", "edge"))
+
+_cache = {}  # metadata file path -> ((mtime_ns, size), MapMetadata)
+_cache_lock = threading.Lock()
+
+
+def metadata_file(map_name, base_dir="cases"):
+    return os.path.join(base_dir, map_name, "metaData.xml")
+
+
+class MapMetadata:
+    """
+    Inputs, outputs, mission templates, parkings, stops and predefined routes of a map.
+
+    inputs, outputs, missions: tuples of str
+    parkings, stops: tuples of Parking / Stop (name, edge)
+    routes: tuples of edge IDs, already split
+    """
+
+    def __init__(self, inputs=(), outputs=(), missions=(), parkings=(), stops=(), routes=()):
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.missions = tuple(missions)
+        self.parkings = tuple(parkings)
+        self.stops = tuple(stops)
+        self.routes = tuple(routes)
+        self.parking_by_name = {p.name: p for p in self.parkings}
+
+    @classmethod
+    def from_root(cls, meta_root):
+        inputs, outputs, missions, parkings, stops, routes = [], [], [], [], [], []
+        for section in meta_root:
+            for item in section:
+                if section.tag == "inputs":
+                    inputs.append(item.get("value"))
+                elif section.tag == "outputs":
+                    outputs.append(item.get("value"))
+                elif section.tag == "missions":
+                    missions.append(item.get("value"))
+                elif section.tag == "parkings":
+                    parkings.append(Parking(item.get("value"), item.get("edge")))
+                elif section.tag == "stops":
+                    stops.append(Stop(item.get("value"), item.get("edge")))
+                elif section.tag == "routes":
+                    routes.append(tuple((item.get("edges") or "").split()))
+        return cls(inputs, outputs, missions, parkings, stops, routes)
+
+    @classmethod
+    def from_file(cls, file_path):
+        return cls.from_root(ET.parse(file_path).getroot())
+
+    def alternative_parkings(self, target):
+        """Parkings other than target, in metaData.xml order."""
+        return [p for p in self.parkings if p.name != target]
+
+    def summary(self):
+        return (f"{len(self.inputs)} inputs, {len(self.outputs)} outputs, {len(self.missions)} missions, "
+                f"{len(self.parkings)} parkings, {len(self.stops)} stops, {len(self.routes)} routes")
+
+
+def load(map_name, base_dir="cases"):
+    """
+    Returns the cached MapMetadata of a map, re-parsing only when metaData.xml changed.
+    Raises FileNotFoundError / ET.ParseError like ET.parse.
+    """
+    file_path = metadata_file(map_name, base_dir)
+    stat = os.stat(file_path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _cache_lock:
+        entry = _cache.get(file_path)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+    metadata = MapMetadata.from_file(file_path)
+    print(f"Parsed {file_path}: {metadata.summary()}")
+    with _cache_lock:
+        _cache[file_path] = (signature, metadata)
+    return metadata
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
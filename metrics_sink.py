@@ -0,0 +1,148 @@
+"""Streaming CSV writer for the per-interval simulation reports."""
+import csv
+import os
+import shutil
+
+TRUCK_REPORT_HEADER = ["step", "time", "inTrucks[#]", "Total distance[km/T.U]", "Average Speed[km/h/truck]",
+                       "parked[#]", "Parkings[%]", "Total CO2[g/T.U]", "Total NOx[g/T.U]", "TWT [T.U]",
+                       "inPort[#]", "Current Trucks[#]"]
+
+# series name -> file suffix (same files as the former in-memory reports)
+SERIES_FILES = {
+    "distances": "_DistancesRep.csv",
+    "speeds": "_SpeedsRep.csv",
+    "speedFactors": "_SpeedFactorsRep.csv",
+    "co2s": "_co2sRep.csv",
+    "noxs": "_noxsRep.csv",
+}
+
+
+def format_values(values, divisor):
+    """Same cell formatting as myPyLib.listToLine: str(int(value)/divisor)."""
+    return [str(int(value) / divisor) for value in values]
+
+
+class MetricsSink:
+    """
+    Appends every reporting interval to disk as it is produced, so memory stays
+    bounded and a crash keeps everything written so far.
+
+    The truck report is streamed to '<mode>_Truck Report.part.csv'; close() exports
+    it as '<mode>_Truck Report.csv' with the usual "Simulation started at" first line.
+    The per-truck series files are written in place.
+    """
+
+    def __init__(self, folder, mode, nb_trucks, truck_prefix="trk"):
+        self.folder = folder
+        self.mode = mode
+        self.nb_trucks = nb_trucks
+        self.truck_prefix = truck_prefix
+        self._files = {}
+        self._writers = {}
+        self.report_path = os.path.join(folder, f"{mode}_Truck Report.csv")
+        self.partial_report_path = os.path.join(folder, f"{mode}_Truck Report.part.csv")
+
+    def _open(self, name, file_path, header, offset=None):
+        if offset is None:
+            f = open(file_path, "w", newline="", encoding="utf-8")
+        else:
+            # Resuming: drop the rows written after the checkpoint and append from there
+            f = open(file_path, "r+", newline="", encoding="utf-8")
+            f.seek(offset)
+            f.truncate()
+        self._files[name] = f
+        self._writers[name] = csv.writer(f, delimiter=";", lineterminator="\n")
+        if offset is None:
+            self._writerow(name, header)
+
+    def _writerow(self, name, row):
+        if row == [""]:  # no trucks: csv would write '""' for a lone empty cell
+            self._files[name].write("\n")
+        else:
+            self._writers[name].writerow(row)
+
+    def open(self, offsets=None):
+        """
+        Args:
+            offsets (dict): File positions saved by offsets(), to resume from a checkpoint.
+        """
+        offsets = offsets or {}
+        os.makedirs(self.folder, exist_ok=True)
+        if offsets.get("report") is not None and not os.path.exists(self.partial_report_path):
+            self._restore_partial_report()
+        self._open("report", self.partial_report_path, TRUCK_REPORT_HEADER, offsets.get("report"))
+        truck_header = [f"{self.truck_prefix}{i + 1}" for i in range(self.nb_trucks)] + [""]
+        for name, suffix in SERIES_FILES.items():
+            self._open(name, os.path.join(self.folder, f"{self.mode}{suffix}"), truck_header, offsets.get(name))
+        return self
+
+    def offsets(self):
+        """Current position of every stream (after flush()), saved in checkpoints."""
+        return {name: f.tell() for name, f in self._files.items()}
+
+    def write_report_line(self, fields):
+        self._writerow("report", fields)
+
+    def write_series(self, name, values, divisor=1):
+        # Trailing empty cell keeps the historical "v1;v2;...;" line layout
+        self._writerow(name, format_values(values, divisor) + [""])
+
+    def write_interval(self, step, interval, accumulators, in_trucks, parked_count, capacity_percent, in_port,
+                       current_trucks):
+        """
+        Writes the report line and the series of one reporting interval from a TruckAccumulators.
+        Returns:
+            list: The report line fields.
+        """
+        fields = [step, f"{step / interval:.1f}", in_trucks, f"{accumulators.total('distances'):.3f}",
+                  f"{accumulators.mean_step_speed():.2f}", parked_count, f"{capacity_percent:.1f}",
+                  f"{accumulators.total('co2s'):.3f}", f"{accumulators.total('noxs'):.3f}", accumulators.waiting,
+                  in_port, current_trucks]
+        self.write_report_line(fields)
+        self.write_series("distances", accumulators["distances"], 1)
+        self.write_series("speeds", accumulators["speeds"], interval)
+        self.write_series("speedFactors", accumulators["speedFactors"], interval)
+        self.write_series("co2s", accumulators["co2s"], 1)
+        self.write_series("noxs", accumulators["noxs"], 1)
+        self.flush()
+        return fields
+
+    def flush(self):
+        for f in self._files.values():
+            f.flush()
+
+    def close(self, begin=None, end=None):
+        """Closes the streams and exports the truck report. Returns the written file paths."""
+        for f in self._files.values():
+            f.close()
+        written = [os.path.join(self.folder, f"{self.mode}{suffix}") for suffix in SERIES_FILES.values()]
+        if "report" in self._files:
+            self.export_truck_report(begin, end)
+            written.insert(0, self.report_path)
+        self._files.clear()
+        self._writers.clear()
+        return written
+
+    def export_truck_report(self, begin=None, end=None):
+        """Writes '<mode>_Truck Report.csv' from the streamed rows, chunk by chunk."""
+        with open(self.report_path, "w", encoding="utf-8") as f_out:
+            if begin is not None and end is not None:
+                f_out.write(f"Simulation started at {begin.strftime('%H:%M:%S')} ended at {end.strftime('%H:%M:%S')}\n")
+            with open(self.partial_report_path, "r", encoding="utf-8") as f_in:
+                shutil.copyfileobj(f_in, f_out)
+        os.remove(self.partial_report_path)
+
+    def _restore_partial_report(self):
+        """Resuming a run that ended normally: turns the exported report back into the streamed one."""
+        with open(self.report_path, "r", encoding="utf-8") as f_in, \
+                open(self.partial_report_path, "w", encoding="utf-8", newline="") as f_out:
+            first_line = f_in.readline()
+            if not first_line.startswith("Simulation started at"):
+                f_out.write(first_line)
+            shutil.copyfileobj(f_in, f_out)
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,154 @@
+"""
+Event-driven dispatch of the truck mission state machine.
+
+Instead of running the mission logic for every truck on every step, the engine
+keeps small watch indexes built from each truck's pending action and only hands
+a truck to the mission handler (Starter.updateTruckMission) when one of its
+events fires:
+
+  * departed                 -> pending action is assigned
+  * stop started / stop ended -> Load/Unload/Park status 1 -> 2 -> 3
+  * on the Go edge / arrived -> Go status 1 -> 3
+  * parking occupancy change -> speed factor (mode[6]) and alternative parking (mode[5] == "1")
+  * halted near the parking  -> alternative parking (mode[5] == "0")
+  * status changed           -> handled again on the next step (next action is assigned,
+                                new target checked)
+
+The decision inputs of the handler (stop state, target/alternative occupancy,
+pending action) only change on those events, so the mission behaviour is the
+same as polling while the per-step cost scales with the number of events.
+"""
+from collections import defaultdict
+
+import traci.constants as tc
+
+import sim_logging
+
+log = sim_logging.get_logger("mission")
+
+PARK_WAITING_SPEED = 0.1 # m/s, same threshold as Starter.isParkWaiting
+
+
+class MissionEngine:
+
+    def __init__(self, missions, parkings, mode, handler, truck_prefix="trk"):
+        """
+        Args:
+            missions (MissionStore): Mission store of the run.
+            parkings (ParkingRegistry): Parking capacities and occupancy.
+            mode (str): Launch mode string, e.g. "Mode111".
+            handler (callable): handler(vehID, state) runs the mission logic of one truck.
+            truck_prefix (str): Substring identifying trucks among all vehicles.
+        """
+        self.missions = missions
+        self.parkings = parkings
+        self.handler = handler
+        self.truck_prefix = truck_prefix
+        self.park_waiting = len(mode) > 5 and mode[5] == "0"
+        self.due = set() # trucks to handle on the next step
+        self.go_edges = {} # vehID -> edge ending its Go action (status 1)
+        self.by_target = defaultdict(set) # target -> trucks with a status 1 Load/Unload/Park action on it
+        self.targets = {} # vehID -> key in by_target
+        self.park_watch = set() # mode[5] == "0": Park trucks driving to their parking
+        self.handled = 0 # handler calls since the start, for profiling
+
+    def is_truck(self, veh_id):
+        return self.truck_prefix in veh_id
+
+    def start(self, veh_ids):
+        """Registers the trucks already in the network when the run starts."""
+        self.due.update(v for v in veh_ids if self.is_truck(v))
+
+    def _unwatch(self, veh_id):
+        self.go_edges.pop(veh_id, None)
+        self.park_watch.discard(veh_id)
+        target = self.targets.pop(veh_id, None)
+        if target is not None:
+            self.by_target[target].discard(veh_id)
+
+    def _watch(self, veh_id):
+        """Rebuilds the watch entries of a truck from its pending action."""
+        self._unwatch(veh_id)
+        action = self.missions.pending_action(veh_id)
+        if action is None:
+            return
+        status = action.get("status", "0")
+        if status == "0":
+            self.due.add(veh_id) # assigned on the next step, as when polling
+        elif status == "1":
+            if action.get("type") == "Go":
+                self.go_edges[veh_id] = action.get("edge")
+            else:
+                target = action.get("target")
+                self.by_target[target].add(veh_id)
+                self.targets[veh_id] = target
+                if self.park_waiting and action.get("type") == "Park":
+                    self.park_watch.add(veh_id)
+
+    def _status(self, veh_id):
+        action = self.missions.pending_action(veh_id)
+        return None if action is None else (action, action.get("status", "0"))
+
+    def _handle(self, veh_id, state):
+        before = self._status(veh_id)
+        self.handler(veh_id, state)
+        self.handled += 1
+        self._watch(veh_id)
+        after = self._status(veh_id)
+        if after is not None and after != before and after[1] == "1":
+            # Newly assigned: the target may already be full (mode[5]/mode[6])
+            self.due.add(veh_id)
+
+    def step(self, vehicle_states, departed=(), arrived=(), stop_events=(), parking_changed=()):
+        """
+        Runs the mission handler for the trucks with an event this step.
+        Args:
+            vehicle_states (dict): Subscription results of the step (vehID -> variables).
+            departed, arrived (iterable): Vehicle IDs that entered / left the network.
+            stop_events (iterable): Vehicle IDs that started or ended a stop.
+            parking_changed (iterable): Parking areas whose occupancy changed.
+        Returns:
+            int: Number of trucks handled.
+        """
+        touched, self.due = self.due, set()
+        touched.update(v for v in departed if self.is_truck(v))
+        touched.update(v for v in stop_events if self.is_truck(v))
+
+        for veh_id, edge in self.go_edges.items():
+            state = vehicle_states.get(veh_id)
+            if state is not None and state.get(tc.VAR_ROAD_ID) == edge:
+                touched.add(veh_id)
+
+        for veh_id in self.park_watch:
+            state = vehicle_states.get(veh_id)
+            if state is not None and state.get(tc.VAR_SPEED, 0.0) < PARK_WAITING_SPEED:
+                touched.add(veh_id)
+
+        if parking_changed:
+            for target in parking_changed:
+                touched.update(self.by_target.get(target, ()))
+            # An alternative may have been freed: recheck trucks heading to a full parking
+            for target, veh_ids in self.by_target.items():
+                if veh_ids and self.parkings.is_full(target):
+                    touched.update(veh_ids)
+
+        for veh_id in arrived:
+            if not self.is_truck(veh_id):
+                continue
+            touched.discard(veh_id)
+            action = self.missions.pending_action(veh_id)
+            if veh_id in self.go_edges and action is not None:
+                # Left the network at the end of its route
+                action.set("status", "3")
+                log.info("%s: Arrived at end of route for Go. Status -> '3'.", veh_id)
+            self._unwatch(veh_id)
+
+        count = 0
+        for veh_id in sorted(touched): # stable command order between runs
+            state = vehicle_states.get(veh_id)
+            if state is None:
+                self.due.add(veh_id) # no subscription result yet: handled once it has one
+                continue
+            self._handle(veh_id, state)
+            count += 1
+        return count
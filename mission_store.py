@@ -0,0 +1,136 @@
+"""Indexed in-memory mission state, built once from missions.mis.xml."""
+import xml.etree.ElementTree as ET
+
+ACTION_ATTRIBUTES = ("type", "target", "edge", "status")
+
+
+class MissionAction:
+    """
+    One mission step. Exposes get()/set() like an ET.Element so the
+    simulation loop can use it in place of the parsed <action> node.
+    """
+    __slots__ = ACTION_ATTRIBUTES
+
+    def __init__(self, type=None, target=None, edge=None, status="0"):
+        self.type = type
+        self.target = target
+        self.edge = edge
+        self.status = status
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None) if key in ACTION_ATTRIBUTES else None
+        return default if value is None else value
+
+    def set(self, key, value):
+        setattr(self, key, value)
+
+    def __repr__(self):
+        return f"MissionAction(type={self.type!r}, target={self.target!r}, edge={self.edge!r}, status={self.status!r})"
+
+
+class Mission:
+    """Ordered actions of one vehicle plus a cursor on the first pending action."""
+    __slots__ = ("veh_id", "type", "actions", "cursor")
+
+    def __init__(self, veh_id, mission_type, actions):
+        self.veh_id = veh_id
+        self.type = mission_type
+        self.actions = actions
+        self.cursor = 0
+
+    def pending(self):
+        """Returns the first action whose status is not '3', or None when all are done."""
+        actions = self.actions
+        while self.cursor < len(actions) and actions[self.cursor].status == "3":
+            self.cursor += 1
+        return actions[self.cursor] if self.cursor < len(actions) else None
+
+
+class MissionStore:
+    """
+    Maps vehicle ID -> Mission. Lookups are O(1) instead of an XPath scan of the tree.
+    When several <mission> elements share an ID, the first one is used and the others are ignored.
+    """
+
+    def __init__(self):
+        self.missions = {}
+
+    @classmethod
+    def from_root(cls, mission_root):
+        store = cls()
+        for mission_el in mission_root.iter("mission"):
+            actions = [MissionAction(action_el.get("type"), action_el.get("target"),
+                                     action_el.get("edge"), action_el.get("status", "0"))
+                       for action_el in mission_el.findall("action")]
+            veh_id = mission_el.get("id")
+            if veh_id in store.missions:
+                continue # duplicate ID: the first mission is kept, as the former XPath lookup did
+            store.missions[veh_id] = Mission(veh_id, mission_el.get("type"), actions)
+        return store
+
+    @classmethod
+    def from_file(cls, mission_file_path):
+        return cls.from_root(ET.parse(mission_file_path).getroot())
+
+    def __len__(self):
+        return len(self.missions)
+
+    def __contains__(self, veh_id):
+        return veh_id in self.missions
+
+    def get_mission(self, veh_id):
+        return self.missions.get(veh_id)
+
+    def pending_action(self, veh_id):
+        mission = self.missions.get(veh_id)
+        return mission.pending() if mission is not None else None
+
+    def replace_pending_action(self, veh_id, new_action):
+        """
+        Overwrites the pending action with the type/target/edge of new_action
+        (a MissionAction or ET.Element) and resets its status to '0'.
+        Returns the replaced target, or None if no pending action exists.
+        """
+        action = self.pending_action(veh_id)
+        if action is None:
+            return None
+        old_target = action.target
+        action.target = new_action.get("target")
+        action.edge = new_action.get("edge")
+        action.type = new_action.get("type")
+        action.status = "0"
+        return old_target
+
+    def snapshot(self):
+        """Copy of every action (type, target, edge, status) per vehicle, for checkpoints."""
+        return {veh_id: [(a.type, a.target, a.edge, a.status) for a in mission.actions]
+                for veh_id, mission in self.missions.items()}
+
+    def restore(self, snapshot):
+        """Restores the actions saved by snapshot(); cursors are recomputed on the next lookup."""
+        for veh_id, actions in snapshot.items():
+            mission = self.missions.get(veh_id)
+            if mission is not None:
+                mission.actions = [MissionAction(*action) for action in actions]
+                mission.cursor = 0
+
+    def to_root(self):
+        """Rebuilds a <Missions> tree with the current action statuses."""
+        root = ET.Element("Missions")
+        for mission in self.missions.values():
+            mission_el = ET.SubElement(root, "mission", id=mission.veh_id)
+            if mission.type is not None:
+                mission_el.set("type", mission.type)
+            for action in mission.actions:
+                action_el = ET.SubElement(mission_el, "action")
+                for key in ACTION_ATTRIBUTES:
+                    value = getattr(action, key)
+                    if value is not None:
+                        action_el.set(key, value)
+        return root
+
+    def write(self, file_path):
+        """Writes the mission states back to XML; meant to be called once, at the end of a run."""
+        tree = ET.ElementTree(self.to_root())
+        with open(file_path, "w", encoding="utf-8") as f_out:
+            tree.write(f_out, encoding="unicode")
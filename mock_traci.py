@@ -0,0 +1,426 @@
+"""
+In-process stand-in for SUMO, selected with the "mock" backend (see sim_backend.py).
+
+It implements the part of the vehicle, parkingarea, edge, lane and simulation
+domains that Starter.run_simulation uses, including subscriptions, so the control
+loop can be benchmarked and regression-tested on any machine without SUMO:
+
+    sim_backend.use_backend("mock")
+    Starter.run_simulation("MockPort", "Mode111", sumo_binary="sumo", monitor=False)
+
+The mock reads the routes file (-r or the route-files of the .sumocfg) and the
+parking areas of the additional files. Every edge is EDGE_LENGTH long; vehicles
+drive their route at MAX_SPEED * speedFactor (capped by edge.setMaxSpeed), stop
+at mid-edge for setParkingAreaStop() stops, wait in front of a full parking area,
+and leave the network at the end of their route. Stop, parking, depart and arrive
+events are reported like SUMO's simulation variables.
+"""
+import os
+import pickle
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+
+import traci.constants as tc
+
+import parking_registry # attributes used at call time: parking_registry imports this module through sim_backend
+
+EDGE_LENGTH = 200.0 # m
+MAX_SPEED = 13.89 # m/s
+STOP_POS = EDGE_LENGTH / 2
+STOPSTATE_PARKING_AREA = 1 | 2 | 128 # stopped + parking + parkingArea, as reported by SUMO
+
+
+class TraCIException(Exception):
+    pass
+
+
+class FatalTraCIError(Exception):
+    pass
+
+
+Stage = namedtuple("Stage", ("edges", "travelTime", "length", "cost"))
+
+
+class _Vehicle:
+    __slots__ = ("id", "depart", "route", "route_index", "pos", "speed", "speed_factor", "distance",
+                 "waiting", "stop", "parked_at", "stopped_until")
+
+    def __init__(self, veh_id, depart, route):
+        self.id = veh_id
+        self.depart = depart
+        self.route = list(route)
+        self.route_index = 0
+        self.pos = 0.0
+        self.speed = 0.0
+        self.speed_factor = 1.0
+        self.distance = 0.0
+        self.waiting = 0.0
+        self.stop = None # (parking area, edge, duration)
+        self.parked_at = None
+        self.stopped_until = 0.0
+
+    @property
+    def edge(self):
+        return self.route[self.route_index]
+
+    def stop_state(self):
+        return STOPSTATE_PARKING_AREA if self.parked_at is not None else 0
+
+
+_VEHICLE_VARS = {
+    tc.VAR_ROAD_ID: lambda v: v.edge,
+    tc.VAR_LANE_ID: lambda v: v.edge + "_0",
+    tc.VAR_LANEPOSITION: lambda v: v.pos,
+    tc.VAR_SPEED: lambda v: v.speed,
+    tc.VAR_ACCUMULATED_WAITING_TIME: lambda v: v.waiting,
+    tc.VAR_DISTANCE: lambda v: v.distance,
+    tc.VAR_SPEED_FACTOR: lambda v: v.speed_factor,
+    tc.VAR_CO2EMISSION: lambda v: 500.0 + 2000.0 * v.speed / MAX_SPEED, # mg/s
+    tc.VAR_NOXEMISSION: lambda v: 5.0 + 20.0 * v.speed / MAX_SPEED,
+    tc.VAR_STOPSTATE: lambda v: v.stop_state(),
+    tc.VAR_ROUTE_INDEX: lambda v: v.route_index,
+}
+
+
+class _World:
+    """Simulation state; pickled as a whole by simulation.saveState()."""
+
+    def __init__(self, routes_files=(), additional=()):
+        self.time = 0.0
+        self.pending = [] # not yet departed, sorted by depart
+        self.next_pending = 0
+        self.vehicles = {}
+        self.parkings = {} # id -> [edge, capacity, set of vehicle IDs]
+        self.edge_speeds = {}
+        self.events = {}
+        for file_path in routes_files:
+            self._load_routes(file_path)
+        self.pending.sort(key=lambda v: v.depart)
+        for file_path in additional:
+            self._load_parkings(file_path)
+
+    def _load_routes(self, file_path):
+        routes = {}
+        for _, el in ET.iterparse(file_path, events=("end",)):
+            if el.tag == "route" and el.get("id"):
+                routes[el.get("id")] = el.get("edges", "").split()
+            elif el.tag == "vehicle":
+                route_el = el.find("route")
+                edges = route_el.get("edges", "").split() if route_el is not None else routes.get(el.get("route"), [])
+                if edges:
+                    self.pending.append(_Vehicle(el.get("id"), float(el.get("depart", "0")), edges))
+                el.clear()
+
+    def _load_parkings(self, file_path):
+        try:
+            for parking_el in ET.parse(file_path).getroot().iter("parkingArea"):
+                edge = parking_el.get("lane", "").rsplit("_", 1)[0]
+                self.parkings[parking_el.get("id")] = [edge, parking_registry.parking_capacity(parking_el), set()]
+        except (OSError, ET.ParseError) as e:
+            print(f"Warning (mock): could not read parking areas from {file_path}: {e}")
+
+    def step(self):
+        events = self.events = {tc.VAR_DEPARTED_VEHICLES_IDS: [], tc.VAR_ARRIVED_VEHICLES_IDS: [],
+                                tc.VAR_STOP_STARTING_VEHICLES_IDS: [], tc.VAR_STOP_ENDING_VEHICLES_IDS: [],
+                                tc.VAR_PARKING_STARTING_VEHICLES_IDS: [], tc.VAR_PARKING_ENDING_VEHICLES_IDS: []}
+        while self.next_pending < len(self.pending) and self.pending[self.next_pending].depart <= self.time:
+            veh = self.pending[self.next_pending]
+            self.next_pending += 1
+            self.vehicles[veh.id] = veh
+            events[tc.VAR_DEPARTED_VEHICLES_IDS].append(veh.id)
+        self.time += 1.0
+        for veh in list(self.vehicles.values()):
+            self._move(veh, events)
+
+    def _move(self, veh, events):
+        if veh.parked_at is not None:
+            if self.time < veh.stopped_until:
+                veh.speed = 0.0
+                return
+            self.parkings[veh.parked_at][2].discard(veh.id)
+            veh.parked_at, veh.stop = None, None
+            events[tc.VAR_STOP_ENDING_VEHICLES_IDS].append(veh.id)
+            events[tc.VAR_PARKING_ENDING_VEHICLES_IDS].append(veh.id)
+
+        v = min(MAX_SPEED * veh.speed_factor, self.edge_speeds.get(veh.edge, MAX_SPEED))
+        if veh.stop is not None and veh.stop[1] == veh.edge and veh.pos + v >= STOP_POS:
+            parking = self.parkings.get(veh.stop[0])
+            if parking is None or len(parking[2]) < parking[1]:
+                v = max(0.0, STOP_POS - veh.pos)
+                veh.parked_at = veh.stop[0] if parking is not None else None
+                if parking is not None:
+                    parking[2].add(veh.id)
+                    veh.stopped_until = self.time + veh.stop[2]
+                    events[tc.VAR_STOP_STARTING_VEHICLES_IDS].append(veh.id)
+                    events[tc.VAR_PARKING_STARTING_VEHICLES_IDS].append(veh.id)
+                else:
+                    veh.stop = None # unknown parking area: drive on
+            else:
+                v = max(0.0, min(v, STOP_POS - 1.0 - veh.pos)) # wait in front of the full parking
+
+        veh.speed = v
+        veh.pos += v
+        veh.distance += v
+        if v < 0.1:
+            veh.waiting += 1.0
+        while veh.pos >= EDGE_LENGTH:
+            if veh.route_index + 1 >= len(veh.route):
+                del self.vehicles[veh.id]
+                events[tc.VAR_ARRIVED_VEHICLES_IDS].append(veh.id)
+                return
+            veh.route_index += 1
+            veh.pos -= EDGE_LENGTH
+
+    def get(self, veh_id):
+        veh = self.vehicles.get(veh_id)
+        if veh is None:
+            raise TraCIException(f"Vehicle '{veh_id}' is not known.")
+        return veh
+
+
+_world = _World()
+_vehicle_subscriptions = {}
+_parking_subscriptions = {}
+_simulation_subscription = ()
+
+
+class _Domain:
+    """Subscription helpers shared by the mock domains."""
+
+    def __init__(self, subscriptions, values):
+        self._subscriptions = subscriptions
+        self._values = values
+
+    def subscribe(self, object_id, varIDs=(), begin=None, end=None):
+        self._subscriptions[object_id] = tuple(varIDs)
+
+    def unsubscribe(self, object_id):
+        self._subscriptions.pop(object_id, None)
+
+    def getSubscriptionResults(self, object_id):
+        results = self.getAllSubscriptionResults()
+        return results.get(object_id, {})
+
+    def getAllSubscriptionResults(self):
+        results = {}
+        for object_id, variables in list(self._subscriptions.items()):
+            result = self._values(object_id, variables)
+            if result is None:
+                del self._subscriptions[object_id] # vehicle left: SUMO drops the subscription
+            else:
+                results[object_id] = result
+        return results
+
+
+def _vehicle_values(veh_id, variables):
+    veh = _world.vehicles.get(veh_id)
+    if veh is None:
+        return None
+    return {var: _VEHICLE_VARS[var](veh) for var in variables}
+
+
+def _parking_values(parking_id, variables):
+    parking = _world.parkings.get(parking_id)
+    return {var: len(parking[2]) for var in variables} if parking is not None else {}
+
+
+class _VehicleDomain(_Domain):
+
+    def __init__(self):
+        _Domain.__init__(self, _vehicle_subscriptions, _vehicle_values)
+
+    def subscribe(self, object_id, varIDs=(), begin=None, end=None):
+        _world.get(object_id)
+        _Domain.subscribe(self, object_id, varIDs, begin, end)
+
+    def getIDList(self):
+        return tuple(_world.vehicles)
+
+    def getIDCount(self):
+        return len(_world.vehicles)
+
+    def getSpeed(self, vehID):
+        return _world.get(vehID).speed
+
+    def getRoadID(self, vehID):
+        return _world.get(vehID).edge
+
+    def getLaneID(self, vehID):
+        return _world.get(vehID).edge + "_0"
+
+    def getLanePosition(self, vehID):
+        return _world.get(vehID).pos
+
+    def getRoute(self, vehID):
+        return tuple(_world.get(vehID).route)
+
+    def getRouteIndex(self, vehID):
+        return _world.get(vehID).route_index
+
+    def getSpeedFactor(self, vehID):
+        return _world.get(vehID).speed_factor
+
+    def getStopState(self, vehID):
+        return _world.get(vehID).stop_state()
+
+    def isStopped(self, vehID):
+        return _world.get(vehID).parked_at is not None
+
+    def getDistance(self, vehID):
+        return _world.get(vehID).distance
+
+    def getAccumulatedWaitingTime(self, vehID):
+        return _world.get(vehID).waiting
+
+    def setSpeedFactor(self, vehID, factor):
+        _world.get(vehID).speed_factor = factor
+
+    def changeTarget(self, vehID, edgeID):
+        veh = _world.get(vehID)
+        veh.route = veh.route[:veh.route_index + 1] + ([edgeID] if veh.edge != edgeID else [])
+
+    def setRoute(self, vehID, edgeList):
+        veh = _world.get(vehID)
+        edges = list(edgeList)
+        if not edges or edges[0] != veh.edge:
+            raise TraCIException(f"Route replacement for '{vehID}' must start on its current edge '{veh.edge}'.")
+        veh.route = veh.route[:veh.route_index] + edges
+
+    def setParkingAreaStop(self, vehID, stopID, duration=2**31 - 1, until=-1, flags=1):
+        veh = _world.get(vehID)
+        parking = _world.parkings.get(stopID)
+        edge = parking[0] if parking is not None else veh.route[-1]
+        veh.stop = (stopID, edge, duration)
+
+    def replaceStop(self, vehID, *args, **kwargs):
+        veh = _world.get(vehID)
+        if veh.parked_at is None:
+            veh.stop = None
+
+    def moveTo(self, vehID, laneID, pos, reason=0):
+        veh = _world.get(vehID)
+        veh.pos = min(pos, EDGE_LENGTH - 0.01)
+
+
+class _ParkingAreaDomain(_Domain):
+
+    def __init__(self):
+        _Domain.__init__(self, _parking_subscriptions, _parking_values)
+
+    def getIDList(self):
+        return tuple(_world.parkings)
+
+    def getVehicleCount(self, stopID):
+        if stopID not in _world.parkings:
+            raise TraCIException(f"Parking area '{stopID}' is not known.")
+        return len(_world.parkings[stopID][2])
+
+    def getVehicleIDs(self, stopID):
+        return tuple(sorted(_world.parkings[stopID][2])) if stopID in _world.parkings else ()
+
+
+class _EdgeDomain(_Domain):
+
+    def __init__(self):
+        _Domain.__init__(self, {}, lambda object_id, variables: {})
+
+    def setMaxSpeed(self, edgeID, speed):
+        _world.edge_speeds[edgeID] = speed
+
+    def getTraveltime(self, edgeID):
+        return EDGE_LENGTH / _world.edge_speeds.get(edgeID, MAX_SPEED)
+
+
+class _LaneDomain(_Domain):
+
+    def __init__(self):
+        _Domain.__init__(self, {}, lambda object_id, variables: {})
+
+    def getLength(self, laneID):
+        return EDGE_LENGTH
+
+
+class _SimulationDomain:
+
+    def subscribe(self, varIDs=(), begin=None, end=None):
+        global _simulation_subscription
+        _simulation_subscription = tuple(varIDs)
+
+    def getSubscriptionResults(self):
+        return {var: tuple(_world.events.get(var, ())) for var in _simulation_subscription}
+
+    def getTime(self):
+        return _world.time
+
+    def getMinExpectedNumber(self):
+        return len(_world.vehicles) + len(_world.pending) - _world.next_pending
+
+    def getDepartedIDList(self):
+        return tuple(_world.events.get(tc.VAR_DEPARTED_VEHICLES_IDS, ()))
+
+    def getArrivedIDList(self):
+        return tuple(_world.events.get(tc.VAR_ARRIVED_VEHICLES_IDS, ()))
+
+    def findRoute(self, fromEdge, toEdge, vType="", depart=-1.0, routingMode=0):
+        edges = (fromEdge,) if fromEdge == toEdge else (fromEdge, toEdge)
+        length = EDGE_LENGTH * len(edges)
+        return Stage(edges, length / MAX_SPEED, length, length / MAX_SPEED)
+
+    def saveState(self, fileName):
+        with open(fileName, "wb") as f:
+            pickle.dump(_world, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def loadState(self, fileName):
+        global _world
+        with open(fileName, "rb") as f:
+            _world = pickle.load(f)
+        _vehicle_subscriptions.clear()
+        _parking_subscriptions.clear()
+
+
+vehicle = _VehicleDomain()
+parkingarea = _ParkingAreaDomain()
+edge = _EdgeDomain()
+lane = _LaneDomain()
+simulation = _SimulationDomain()
+
+
+def _option(cmd, *names):
+    for i, arg in enumerate(cmd[:-1]):
+        if arg in names:
+            return cmd[i + 1]
+    return None
+
+
+def start(cmd, port=None, label="default"):
+    """Loads the routes and parking areas named by a SUMO command line (-c/-r/-a)."""
+    global _world, _simulation_subscription
+    config_file = _option(cmd, "-c", "--configuration-file")
+    routes = _option(cmd, "-r", "--route-files")
+    additional = _option(cmd, "-a", "--additional-files")
+    config_dir = os.path.dirname(config_file) if config_file else ""
+    if config_file and not routes:
+        element = ET.parse(config_file).getroot().find(".//route-files")
+        if element is not None:
+            routes = ",".join(os.path.join(config_dir, name.strip()) for name in element.get("value", "").split(","))
+    additional_paths = additional.split(",") if additional else (parking_registry.additional_files(config_file) if config_file else [])
+    _world = _World([r for r in (routes or "").split(",") if r], additional_paths)
+    _vehicle_subscriptions.clear()
+    _parking_subscriptions.clear()
+    _simulation_subscription = ()
+    print(f"Mock SUMO: {len(_world.pending)} vehicles, {len(_world.parkings)} parking areas")
+    return (0, "mock")
+
+
+def simulationStep(step=0.0):
+    _world.step()
+    while step and _world.time < step:
+        _world.step()
+
+
+def close(wait=True):
+    pass
+
+
+def getVersion():
+    return (0, "mock")
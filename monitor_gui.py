@@ -1,31 +1,109 @@
 """A GUI for monitoring simulation data in real-time using Tkinter."""
 import tkinter as tk
 from tkinter import ttk
-import queue
 import time  # For basic throttling if needed
 import threading
 
+COLUMNS = ("truck_id", "action_type", "action_target",
+           "mission_status", "current_edge", "speed", "wait_time")
+
+
+class SnapshotChannel:
+    """
+    Latest-value channel between the simulation thread and the monitor.
+
+    publish() replaces any snapshot the GUI has not taken yet, so the producer
+    never blocks and memory never grows when the monitor is slower than the
+    simulation. take() returns the newest snapshot (or None) and empties the slot.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._closed = False
+        self.published = 0
+        self.dropped = 0  # snapshots replaced before the GUI took them
+
+    def publish(self, snapshot):
+        with self._lock:
+            if self._snapshot is not None:
+                self.dropped += 1
+            self._snapshot = snapshot
+            self.published += 1
+
+    def take(self):
+        with self._lock:
+            snapshot, self._snapshot = self._snapshot, None
+            return snapshot
+
+    def close(self):
+        """Signals the end of the simulation (replaces the former "SHUTDOWN" message)."""
+        with self._lock:
+            self._closed = True
+
+    @property
+    def closed(self):
+        return self._closed
+
+
+def row_values(truck_info):
+    """Treeview row for one truck, in COLUMNS order."""
+    return (
+        truck_info.get("id"),
+        truck_info.get("action_type", "N/A"),
+        truck_info.get("action_target", "N/A"),
+        truck_info.get("mission_status", "N/A"),
+        truck_info.get("road_id", "N/A"),
+        f"{truck_info.get('speed', 0.0):.1f}",
+        f"{truck_info.get('wait_time', 0.0):.1f}"
+    )
+
+
+def diff_rows(rows, snapshot):
+    """
+    Compares a snapshot with the rows shown and brings rows (truck ID -> row values) up to date.
+    Returns:
+        tuple: (inserted [(truck ID, values)], changed cells [(truck ID, column, value)], removed truck IDs)
+    """
+    inserted, changed = [], []
+    seen = set()
+    for truck_info in snapshot:
+        truck_id = truck_info.get("id", None)
+        if not truck_id:
+            continue
+        seen.add(truck_id)
+        values = row_values(truck_info)
+        previous = rows.get(truck_id)
+        if previous is None:
+            inserted.append((truck_id, values))
+        elif previous != values:
+            changed.extend((truck_id, column, new) for column, old, new in zip(COLUMNS, previous, values) if old != new)
+        rows[truck_id] = values
+
+    # Trucks that are no longer in the simulation data
+    removed = [t for t in rows if t not in seen]
+    for truck_id in removed:
+        del rows[truck_id]
+    return inserted, changed, removed
+
 
 class MonitorWindow:
     """A GUI class to monitor the simulation data in real-time."""
-    def __init__(self, root, data_queue):
+    def __init__(self, root, channel):
         self.root = root
-        self.data_queue = data_queue
+        self.channel = channel
         self.root.title("Simulation Monitor")
         self.root.geometry("800x400")
 
         # --- Data Storage ---
-        self.truck_data = {}  # Store last known data keyed by truck ID
+        self.rows = {}  # Last values shown for each truck ID, used to apply only changed cells
 
         # --- Treeview Setup ---
         self.tree_frame = ttk.Frame(self.root, padding="10")
         self.tree_frame.pack(fill=tk.BOTH, expand=True)
 
-        # Define columns
-        columns = ("truck_id", "action_type", "action_target",
-                   "mission_status", "current_edge", "speed", "wait_time")
         self.tree = ttk.Treeview(
-            self.tree_frame, columns=columns, show="headings", height=15)
+            self.tree_frame, columns=COLUMNS, show="headings", height=15)
 
         # Define headings
         self.tree.heading("truck_id", text="Truck ID")
@@ -59,88 +137,44 @@ class MonitorWindow:
         self.check_queue()  # Start the process
 
     def check_queue(self):
-        """Checks the queue for new data and updates the Treeview."""
+        """Takes the newest snapshot (if any) and applies it to the Treeview."""
         try:
-            while not self.data_queue.empty():
-                # Process all available data bundles since last check
-                update_bundle = self.data_queue.get_nowait()
-
-                # Check if it's a special signal (e.g., shutdown)
-                if update_bundle == "SHUTDOWN":
-                    print("Monitor GUI received shutdown signal.")
-                    # Optionally disable controls or show a message
-                    self.root.title("Simulation Monitor (Finished)")
-                    return  # Stop checking the queue
-
-                # Assuming update_bundle is a list of truck dictionaries
-                if isinstance(update_bundle, list):
-                    self.update_treeview(update_bundle)
-                else:
-                    print(
-                        f"Monitor Warning: Received unexpected data type in queue: {type(update_bundle)}")
-
-        except queue.Empty:
-            # Queue is empty, nothing to do right now
-            pass
+            snapshot = self.channel.take()
+            if snapshot is not None:
+                self.update_treeview(snapshot)
+            elif self.channel.closed:
+                print("Monitor GUI received shutdown signal.")
+                self.root.title("Simulation Monitor (Finished)")
+                return  # Stop checking the channel
         except Exception as e:
             # Log unexpected errors
-            print(f"Error processing monitor queue: {e}")
+            print(f"Error processing monitor snapshot: {e}")
 
         # Reschedule the check
         self.root.after(self.update_interval_ms, self.check_queue)
 
     def update_treeview(self, current_trucks_data):
-        """Updates the Treeview with the latest data."""
-        # Keep track of trucks currently in the treeview
-        current_tree_ids = set(self.tree.get_children())
-        updated_this_cycle = set()
-
-        for truck_info in current_trucks_data:
-            truck_id = truck_info.get("id", None)
-            if not truck_id:
-                continue
-
-            updated_this_cycle.add(truck_id)
-            values_tuple = (
-                truck_id,
-                truck_info.get("action_type", "N/A"),
-                truck_info.get("action_target", "N/A"),
-                truck_info.get("mission_status", "N/A"),
-                truck_info.get("road_id", "N/A"),
-                f"{truck_info.get('speed', 0.0):.1f}",
-                f"{truck_info.get('wait_time', 0.0):.1f}"
-            )
-
-            if truck_id in current_tree_ids:
-                # Update existing item
-                self.tree.item(truck_id, values=values_tuple)
-            else:
-                # Insert new item
-                self.tree.insert("", tk.END, iid=truck_id, values=values_tuple)
-
-            # Store data for potential future use (e.g., highlighting changes)
-            self.truck_data[truck_id] = truck_info
-
-        # Remove trucks from treeview that are no longer in the simulation data
-        ids_to_remove = current_tree_ids - updated_this_cycle
-        for item_id in ids_to_remove:
-            self.tree.delete(item_id)
-            if item_id in self.truck_data:
-                del self.truck_data[item_id]  # Clean up stored data
-
-
-
-def start_monitor_gui(data_queue):
-    """Starts the GUI for monitoring simulation data."""
+        """Applies a snapshot as a diff: only new rows, removed rows and changed cells touch the Treeview."""
+        inserted, changed, removed = diff_rows(self.rows, current_trucks_data)
+        for truck_id, values in inserted:
+            self.tree.insert("", tk.END, iid=truck_id, values=values)
+        for truck_id, column, value in changed:
+            self.tree.set(truck_id, column, value)
+        for truck_id in removed:
+            self.tree.delete(truck_id)
+
+
+def start_monitor_gui(channel):
+    """Starts the GUI for monitoring simulation data published on a SnapshotChannel."""
     root = tk.Tk()
-    app = MonitorWindow(root, data_queue)
+    app = MonitorWindow(root, channel)
     root.mainloop()
 
 
 # --- Example Usage (for testing monitor_gui.py directly) ---
 if __name__ == "__main__":
-    # Create a dummy queue for testing
-    test_queue = queue.Queue()
+    # Create a channel for testing
+    test_channel = SnapshotChannel()
 
     # Function to simulate data coming from Starter.py
     def simulate_data_sender(q):
@@ -173,21 +207,21 @@ if __name__ == "__main__":
             if step % 10 == 0 and num_trucks_this_step > 2:
                 sim_data.pop(1)  # Remove second truck
 
-            q.put(sim_data)
+            q.publish(sim_data)
             print(f"Sim: Sent data for step {step}")
             time.sleep(1.5)  # Simulate time between steps
 
             if step > 25:  # Simulate end
-                q.put("SHUTDOWN")
+                q.close()
                 print("Sim: Sent SHUTDOWN")
                 break
 
     # Start the simulator thread
     sim_thread = threading.Thread(
-        target=simulate_data_sender, args=(test_queue,), daemon=True)
+        target=simulate_data_sender, args=(test_channel,), daemon=True)
     sim_thread.start()
 
     # Start the GUI
-    start_monitor_gui(test_queue)
+    start_monitor_gui(test_channel)
 
 # --- END OF FILE monitor_gui.py ---
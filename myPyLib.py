@@ -4,9 +4,9 @@ Created on 21 juin 2021
 @author: wbouazza
 '''
 import random
-import traci
 import xml.etree.ElementTree as ET
-from Lib.pickle import NONE
+from sim_backend import traci
+import map_metadata
 import pandas as pd
 
 
@@ -57,73 +57,41 @@ def randomElement(tab):
 
 
 def readMeta(mapName, nbTrucks):
-    inputs = []
-    outputs = []
-    missions = []
-    parkings = []
-    stops = []
-    routes = []
-
-    metaTree = ET.parse('Cases/'+mapName+'/metaData.xml')
-    metaRoot = metaTree.getroot()
-
-    for element in metaRoot:
-        if element.tag == "inputs":
-            for input in element:
-                inputs.append(input.get("value"))
-    print("inputs="+str(inputs))
-
-    for element in metaRoot:
-        if element.tag == "outputs":
-            for output in element:
-                outputs.append(output.get("value"))
-    print("outputs="+str(outputs))
-
-    for element in metaRoot:
-        if element.tag == "missions":
-            for mission in element:
-                missions.append(mission.get("value"))
-    print("missions="+str(missions))
-
-    for element in metaRoot:
-        if element.tag == "parkings":
-            for parking in element:
-                dic = dict()
-                dic['name'] = parking.get("value")
-                dic['edge'] = parking.get("edge")
-                parkings.append(dic)
-                # parkings.append(parking.get("edge"))
-    print("parkings="+str(parkings))
-
-    for element in metaRoot:
-        if element.tag == "stops":
-            for stop in element:
-                dico = dict()
-                dico["name"] = stop.get("value")
-                dico["edge"] = stop.get("edge")
-                stops.append(dico)
-    print("stops="+str(stops))
-
-    for element in metaRoot:
-        if element.tag == "routes":
-            for route in element:
-                routes.append(route.get("edges"))
-    print("routes="+str(routes))
-    return (inputs, outputs, missions, parkings, stops, routes)
-
-
-def getAlternative(metadataRoot, target):
-    action = ET.Element("action")
-    for element in metadataRoot:
-        if element.tag == "parkings":
-            for parking in element:
-                # print("searching for alternatives to "+ target+"...found: "+parking.get('value'))
-                if parking.get('value') != target:
-                    action.set("type", "Park")
-                    action.set("target", parking.get('value'))
-                    action.set("edge", parking.get('edge'))
-                    action.set("status", "1")
-                    return action
+    '''
+    Compatibility wrapper around map_metadata.load (parsed once, cached per map).
+    :return: (inputs, outputs, missions, parkings, stops, routes) with parkings/stops as
+             {'name', 'edge'} dicts and routes as space-separated edge strings
+    '''
+    meta = map_metadata.load(mapName)
+    parkings = [{'name': p.name, 'edge': p.edge} for p in meta.parkings]
+    stops = [{'name': s.name, 'edge': s.edge} for s in meta.stops]
+    routes = [" ".join(r) for r in meta.routes]
+    return (list(meta.inputs), list(meta.outputs), list(meta.missions), parkings, stops, routes)
+
+
+def getAlternative(metadata, target, index=None, parkings=None):
+    '''
+    :param metadata: map_metadata.MapMetadata of the map
+    :param index: parking_registry.AlternativeParkingIndex; alone, the nearest parking is chosen by distance
+                  only; with parkings (ParkingRegistry), the nearest parking that is not full is chosen
+    :return: a Park action on the chosen (default: first other) parking, or "no alternatives"
+    '''
+    if index is not None and parkings is not None:
+        parking = index.nearest_free(target, parkings)
+        candidates = (parking,) if parking is not None else ()
+    elif index is not None:
+        candidates = index.alternatives(target)
+    elif metadata is None:
+        return "no alternatives"
+    else:
+        candidates = metadata.alternative_parkings(target)
+    for parking in candidates:
+        action = ET.Element("action")
+        action.set("type", "Park")
+        action.set("target", parking.name)
+        action.set("edge", parking.edge)
+        action.set("status", "1")
+        return action
 
     return "no alternatives"
 
@@ -249,17 +217,11 @@ def initList(size, value):  # list of veh "flow" not duplicated
 
 
 def getHeader(nbTrucks, prefix):  # list of veh "flow" not duplicated
-    result = ""
-    for i in range(nbTrucks):
-        result = result+prefix+str(i+1)+";"
-    return result
+    return "".join(prefix+str(i+1)+";" for i in range(nbTrucks))
 
 
 def listToLine(list, divisor):
-    line = ""
-    for item in list:
-        line = line+str(int(item)/divisor)+";"
-    return line
+    return "".join(str(int(item)/divisor)+";" for item in list)
 
 
 def ChangeParkingIfFull(veh):
@@ -0,0 +1,194 @@
+"""
+Compact road graph cached on disk, with shortest paths between a map's points of interest.
+
+Parsing MyNetwork.net.xml with sumolib takes seconds on large maps, so the graph
+(edge IDs, travel times, successors) is pickled once under cases/<map>/.cache/,
+keyed by the SHA-1 of the net file (hashed again only when its mtime or size
+changes) and the vehicle class. Successors follow the lane connections the
+vehicle class may use, as SUMO's routing does. A RouteTable holds the reachability, cost and
+edge list between every pair of metadata edges (inputs, outputs, stops, parkings),
+so route checks are dictionary lookups.
+"""
+import hashlib
+import heapq
+import os
+import pickle
+import threading
+
+CACHE_DIR_NAME = ".cache"
+CACHE_VERSION = 2
+TRUCK_VCLASS = "trailer" # vClass of the Truck vType (xml_stream.write_vtype)
+
+_digests = {} # absolute net file path -> ((mtime_ns, size), SHA-1)
+_digests_lock = threading.Lock()
+
+
+def file_hash(file_path):
+    sha1 = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def net_digest(file_path):
+    """SHA-1 of a net file, only computed again when its mtime or size changed."""
+    file_path = os.path.abspath(file_path)
+    stat = os.stat(file_path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _digests_lock:
+        entry = _digests.get(file_path)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+    digest = file_hash(file_path)
+    with _digests_lock:
+        _digests[file_path] = (signature, digest)
+    return digest
+
+
+def cache_dir(map_name):
+    return os.path.join("cases", map_name, CACHE_DIR_NAME)
+
+
+def net_file(map_name):
+    return os.path.join("cases", map_name, "MyNetwork.net.xml")
+
+
+def _load_pickle(path):
+    try:
+        with open(path, "rb") as f:
+            cached = pickle.load(f)
+        if cached.get("version") == CACHE_VERSION:
+            return cached["data"]
+    except (OSError, pickle.UnpicklingError, EOFError, KeyError, AttributeError):
+        pass
+    return None
+
+
+def _save_pickle(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump({"version": CACHE_VERSION, "data": data}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+class CompactNetwork:
+    """Edges as integer indices: travel time per edge and successor lists."""
+
+    def __init__(self, edge_ids, travel_times, successors):
+        self.edge_ids = edge_ids
+        self.index = {edge_id: i for i, edge_id in enumerate(edge_ids)}
+        self.travel_times = travel_times
+        self.successors = successors
+
+    def __getstate__(self):
+        return (self.edge_ids, self.travel_times, self.successors)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    @classmethod
+    def from_sumolib(cls, net_file_path, vclass=None):
+        import sumolib
+        print(f"Parsing {net_file_path} (building network cache)...")
+        net = sumolib.net.readNet(net_file_path)
+        edges = [e for e in net.getEdges() if vclass is None or e.allows(vclass)]
+        edge_ids = [e.getID() for e in edges]
+        index = {edge_id: i for i, edge_id in enumerate(edge_ids)}
+        travel_times = [e.getLength() / max(e.getSpeed(), 0.1) for e in edges]
+        successors = []
+        for e in edges:
+            # Connections from a lane the class may use to a lane it may use (lane.allows(None) is True)
+            reachable = {c.getTo().getID() for lane in e.getLanes() if lane.allows(vclass)
+                         for c in lane.getOutgoing() if c.getToLane().allows(vclass)}
+            successors.append(tuple(sorted(index[s] for s in reachable if s in index)))
+        return cls(edge_ids, travel_times, successors)
+
+    def shortest_paths_from(self, source_edge, targets):
+        """
+        Dijkstra from source_edge, stopping once every target edge is settled.
+        Returns {target: (cost, edge tuple)} for the reachable targets.
+        """
+        source = self.index.get(source_edge)
+        if source is None:
+            return {}
+        wanted = {self.index[t] for t in targets if t in self.index}
+        dist = {source: 0.0}
+        previous = {}
+        heap = [(0.0, source)]
+        settled = set()
+        while heap and wanted - settled:
+            cost, node = heapq.heappop(heap)
+            if node in settled:
+                continue
+            settled.add(node)
+            for succ in self.successors[node]:
+                new_cost = cost + self.travel_times[succ]
+                if new_cost < dist.get(succ, float("inf")):
+                    dist[succ] = new_cost
+                    previous[succ] = node
+                    heapq.heappush(heap, (new_cost, succ))
+
+        results = {}
+        for target in wanted & settled:
+            path = [target]
+            while path[-1] != source:
+                path.append(previous[path[-1]])
+            results[self.edge_ids[target]] = (dist[target], tuple(self.edge_ids[i] for i in reversed(path)))
+        return results
+
+
+class RouteTable:
+    """All-pairs cost and edge list between a fixed set of edges."""
+
+    def __init__(self, paths):
+        self.paths = paths # (from_edge, to_edge) -> (cost, edge tuple)
+
+    def reachable(self, from_edge, to_edge):
+        return (from_edge, to_edge) in self.paths
+
+    def cost(self, from_edge, to_edge):
+        entry = self.paths.get((from_edge, to_edge))
+        return entry[0] if entry else float("inf")
+
+    def path(self, from_edge, to_edge):
+        entry = self.paths.get((from_edge, to_edge))
+        return entry[1] if entry else None
+
+    @classmethod
+    def build(cls, network, points):
+        paths = {}
+        for source in points:
+            for target, entry in network.shortest_paths_from(source, points).items():
+                paths[(source, target)] = entry
+        return cls(paths)
+
+
+def load_network(map_name, vclass=None):
+    """Returns the CompactNetwork of a map, from the cache when the net file is unchanged."""
+    path = net_file(map_name)
+    digest = net_digest(path)
+    cache_path = os.path.join(cache_dir(map_name), f"net_{digest[:16]}_{vclass or 'all'}.pkl")
+    network = _load_pickle(cache_path)
+    if network is None:
+        network = CompactNetwork.from_sumolib(path, vclass)
+        _save_pickle(cache_path, network)
+    return network, digest
+
+
+def load_route_table(map_name, points, vclass=None):
+    """
+    Returns the RouteTable between the given edges, cached per (net hash, points, vclass).
+    The network itself is only loaded when the table has to be (re)built.
+    """
+    points = sorted(set(p for p in points if p))
+    digest = net_digest(net_file(map_name))
+    points_key = hashlib.sha1("\n".join(points).encode("utf-8")).hexdigest()[:12]
+    cache_path = os.path.join(cache_dir(map_name), f"routes_{digest[:16]}_{points_key}_{vclass or 'all'}.pkl")
+    table = _load_pickle(cache_path)
+    if table is None:
+        network, _ = load_network(map_name, vclass)
+        table = RouteTable.build(network, points)
+        _save_pickle(cache_path, table)
+    return table
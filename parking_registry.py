@@ -0,0 +1,160 @@
+"""Parking area capacities (read once from the additional files) and per-step occupancy."""
+import glob
+import os
+import xml.etree.ElementTree as ET
+
+import net_cache
+from sim_backend import traci
+import traci.constants as tc
+
+
+def additional_files(config_file_path):
+    """Lists the additional files of a .sumocfg, or the *.add.xml of its folder if none are declared."""
+    config_dir = os.path.dirname(config_file_path)
+    try:
+        config_root = ET.parse(config_file_path).getroot()
+        element = config_root.find(".//additional-files")
+        if element is not None and element.get("value"):
+            return [os.path.join(config_dir, name.strip())
+                    for name in element.get("value").replace(" ", ",").split(",") if name.strip()]
+    except (FileNotFoundError, ET.ParseError) as e:
+        print(f"Warning: could not read additional files from {config_file_path}: {e}")
+    return sorted(glob.glob(os.path.join(config_dir, "*.add.xml")))
+
+
+def parking_capacity(parking_el):
+    """
+    Capacity as SUMO computes it: roadsideCapacity plus the <space> children.
+    A <param key="parkingArea.capacity"> or capacity attribute takes precedence.
+    """
+    for param in parking_el.findall("param"):
+        if param.get("key") == "parkingArea.capacity":
+            return int(param.get("value"))
+    if parking_el.get("capacity"):
+        return int(parking_el.get("capacity"))
+    return int(parking_el.get("roadsideCapacity", "0")) + len(parking_el.findall("space"))
+
+
+class ParkingRegistry:
+    """
+    Capacity and occupancy of every parking area of a map.
+
+    Capacities never change during a run and are loaded once from the additional
+    files. Occupancies are refreshed once per step from a parkingarea subscription,
+    so isFull() and the reporting block are dictionary lookups.
+    """
+
+    def __init__(self, capacities):
+        self.capacities = dict(capacities)
+        self.occupancy = dict.fromkeys(self.capacities, 0)
+        self.changed = [] # parking areas whose occupancy changed at the last refresh()
+        self._subscribed = False
+
+    @classmethod
+    def from_additional_files(cls, file_paths):
+        capacities = {}
+        for file_path in file_paths:
+            try:
+                for parking_el in ET.parse(file_path).getroot().iter("parkingArea"):
+                    capacities[parking_el.get("id")] = parking_capacity(parking_el)
+            except (FileNotFoundError, ET.ParseError, ValueError) as e:
+                print(f"Warning: could not read parking areas from {file_path}: {e}")
+        print(f"Parking registry: {capacities}")
+        return cls(capacities)
+
+    @classmethod
+    def from_config(cls, config_file_path):
+        return cls.from_additional_files(additional_files(config_file_path))
+
+    def start(self):
+        """Subscribes to the vehicle count of every parking area (call after traci.start)."""
+        try:
+            for parking_id in self.capacities:
+                traci.parkingarea.subscribe(parking_id, (tc.VAR_STOP_STARTING_VEHICLES_NUMBER,))
+            self._subscribed = True
+        except traci.TraCIException as e:
+            print(f"Warning: parking area subscription failed ({e}), polling vehicle counts instead.")
+        self.refresh()
+
+    def refresh(self):
+        """
+        Updates the occupancy of all parking areas; call once per step.
+        Returns the list of parking areas whose occupancy changed (also kept in self.changed).
+        """
+        counts = {}
+        if self._subscribed:
+            for parking_id, result in traci.parkingarea.getAllSubscriptionResults().items():
+                counts[parking_id] = result.get(tc.VAR_STOP_STARTING_VEHICLES_NUMBER, 0)
+        else:
+            for parking_id in self.capacities:
+                try:
+                    counts[parking_id] = traci.parkingarea.getVehicleCount(parking_id)
+                except traci.TraCIException:
+                    pass
+        self.changed = [p for p, count in counts.items() if self.occupancy.get(p) != count]
+        self.occupancy.update(counts)
+        return self.changed
+
+    def __contains__(self, parking_id):
+        return parking_id in self.capacities
+
+    def capacity(self, parking_id):
+        return self.capacities.get(parking_id, 0)
+
+    def count(self, parking_id):
+        return self.occupancy.get(parking_id, 0)
+
+    def free_places(self, parking_id):
+        return self.capacity(parking_id) - self.count(parking_id)
+
+    def is_full(self, parking_id):
+        """False for unknown parking areas (capacity unknown, as before)."""
+        capacity = self.capacities.get(parking_id)
+        return capacity is not None and self.occupancy[parking_id] >= capacity
+
+
+class AlternativeParkingIndex:
+    """
+    For every parking of a map, the other parkings ranked by network travel cost
+    from its edge (net_cache route table), computed once before the run. Parkings
+    that cannot be reached from it are left out. Without a route table the
+    metaData.xml order is kept.
+
+    nearest_free() walks that list against the occupancy cached by a
+    ParkingRegistry, so choosing an alternative makes no TraCI call.
+    """
+
+    def __init__(self, parkings, route_table=None):
+        self.parkings = tuple(parkings)
+        self.ranked = {}
+        for target in parkings:
+            others = [p for p in parkings if p.name != target.name]
+            if route_table is not None:
+                costs = {p.name: route_table.cost(target.edge, p.edge) for p in others}
+                others = sorted((p for p in others if costs[p.name] != float("inf")), key=lambda p: costs[p.name])
+            self.ranked[target.name] = tuple(others)
+
+    @classmethod
+    def from_metadata(cls, map_name, metadata):
+        """Index of the metadata parkings; falls back to metaData.xml order if the network cannot be loaded."""
+        route_table = None
+        try:
+            route_table = net_cache.load_route_table(map_name, [p.edge for p in metadata.parkings],
+                                                      net_cache.TRUCK_VCLASS)
+        except (OSError, ImportError) as e:
+            print(f"Warning: no route table for {map_name} ({e}), alternative parkings in metaData.xml order")
+        return cls(metadata.parkings, route_table)
+
+    def alternatives(self, target):
+        """Other parkings, nearest first. An unknown target gets every parking, in metaData.xml order."""
+        return self.ranked.get(target, self.parkings)
+
+    def nearest_free(self, target, registry):
+        """
+        Nearest alternative to target that is not full in registry (parkings it does not know count as
+        not full, as in is_full), or None.
+        """
+        for parking in self.alternatives(target):
+            if not registry.is_full(parking.name):
+                return parking
+        return None
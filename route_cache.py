@@ -0,0 +1,97 @@
+"""
+Routes of the mission actions, reused between trucks.
+
+traci.vehicle.changeTarget makes SUMO search a shortest path for every action of
+every truck, although the trucks only travel between a few edges (route starts,
+stops, parkings, outputs). RouteCache keeps the edge list SUMO returned for each
+(current edge, target edge) pair and applies it to the next truck with setRoute,
+which involves no routing:
+
+    routes = RouteCache()
+    routes.set_time(step)                                             # once per step
+    routes.change_target(veh_id, road_id, target_edge, speed_factor)  # instead of changeTarget
+
+Entries are learned from SUMO's first answer, so they follow its routing (vehicle
+class, current edge speeds), and are only reused while that answer still holds:
+- a truck slowed down by mode[6] (setSpeedFactor 0.5) gets the routes learned at
+  its own speed factor, rounded to SPEED_FACTOR_STEP so that the random factors
+  drawn at departure (speedDev) still share the routes;
+- invalidate() drops every entry when edge travel times change (initMode's
+  setMaxSpeed, or setEffort / adaptTraveltime);
+- an entry older than max_age simulated seconds is routed again, so the cache
+  follows SUMO's travel times when they change on their own;
+- a cached route SUMO refuses is dropped and re-routed.
+"""
+from sim_backend import traci
+
+DEFAULT_MAX_AGE = 900.0 # s
+SPEED_FACTOR_STEP = 0.1
+
+
+class RouteCache:
+
+    def __init__(self, max_age=DEFAULT_MAX_AGE):
+        """
+        Args:
+            max_age (float): Simulated seconds an entry is reused for, None to keep it until invalidate().
+        """
+        self.max_age = max_age
+        self.routes = {} # (from edge, to edge, speed factor step) -> (tuple of edges starting on from edge, time learned)
+        self.time = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _cacheable(edge):
+        return bool(edge) and not edge.startswith(":") # internal (junction) edges cannot start a route
+
+    def set_time(self, time):
+        """Current simulation time (s), to age the entries."""
+        self.time = time
+
+    def change_target(self, veh_id, from_edge, to_edge, speed_factor=1.0):
+        """
+        Routes a vehicle from its current edge to to_edge, like traci.vehicle.changeTarget.
+        Args:
+            veh_id (str): Vehicle ID.
+            from_edge (str): Current edge of the vehicle (subscribed road ID), None if unknown.
+            to_edge (str): Target edge.
+            speed_factor (float): Current speed factor of the vehicle (subscribed).
+        Raises:
+            traci.TraCIException: As changeTarget, e.g. when to_edge cannot be reached.
+        """
+        key = (from_edge, to_edge, round(speed_factor / SPEED_FACTOR_STEP))
+        entry = self.routes.get(key) if self._cacheable(from_edge) else None
+        if entry is not None:
+            edges, learned = entry
+            if self.max_age is not None and self.time - learned > self.max_age:
+                del self.routes[key]
+                self.expired += 1
+            else:
+                try:
+                    traci.vehicle.setRoute(veh_id, edges)
+                    self.hits += 1
+                    return
+                except traci.TraCIException:
+                    del self.routes[key] # not valid for this vehicle (class, position): route it again
+        self.misses += 1
+        traci.vehicle.changeTarget(veh_id, to_edge)
+        if self._cacheable(from_edge):
+            route = traci.vehicle.getRoute(veh_id)
+            index = traci.vehicle.getRouteIndex(veh_id)
+            if 0 <= index < len(route) and route[index] == from_edge and route[-1] == to_edge:
+                self.routes[key] = (tuple(route[index:]), self.time)
+
+    def invalidate(self):
+        """Forgets every route, to call when edge travel times change (setMaxSpeed, setEffort, adaptTraveltime)."""
+        if self.routes:
+            self.invalidations += 1
+        self.routes.clear()
+
+    def summary(self):
+        total = self.hits + self.misses
+        rate = 100.0 * self.hits / total if total else 0.0
+        return (f"Route cache: {self.hits} hits, {self.misses} misses ({rate:.1f}% reused), "
+                f"{len(self.routes)} routes, {self.expired} expired, {self.invalidations} invalidations")
@@ -0,0 +1,127 @@
+"""
+Selects the SUMO control backend used by Starter, Launcher and myPyLib.
+
+    traci   - socket connection to a separate SUMO process (needed for sumo-gui)
+    libsumo - SUMO runs inside the Python process, no socket round-trips
+    mock    - mock_traci.py, a SUMO stand-in for benchmarking the control loop
+
+Modules import the backend with `from sim_backend import traci` and keep calling
+traci.vehicle.getSpeed(...) etc. The backend is chosen with the LS2N_SUMO_BACKEND
+environment variable or use_backend() before the simulation starts.
+
+The public attributes of the backend are bound on the proxy itself, so
+traci.vehicle is a plain attribute lookup; while the step profiler counts calls
+(count_calls()) they are replaced by counting wrappers, built once per attribute.
+"""
+import importlib
+import os
+
+BACKENDS = ("traci", "libsumo", "mock")
+MODULES = {"mock": "mock_traci"}
+DEFAULT_BACKEND = os.environ.get("LS2N_SUMO_BACKEND", "traci")
+
+_active = None
+_active_name = None
+_traci_module = None
+_call_counter = None
+
+
+def use_backend(name):
+    """Activates a backend by name ('traci', 'libsumo' or 'mock') and returns its module."""
+    global _active, _active_name, _traci_module
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown SUMO backend '{name}', expected one of {BACKENDS}")
+    if _traci_module is None:
+        _traci_module = importlib.import_module("traci")
+    _active = importlib.import_module(MODULES.get(name, name))
+    _active_name = name
+    _bind()
+    print(f"SUMO backend: {name}")
+    return _active
+
+
+def backend_name():
+    return _active_name
+
+
+class CallCounter:
+    """Number of backend calls made through the proxy while installed with count_calls()."""
+    __slots__ = ("calls",)
+
+    def __init__(self):
+        self.calls = 0
+
+
+def count_calls(counter):
+    """Counts every traci.<domain>.<function>() call in counter.calls; None stops counting."""
+    global _call_counter
+    _call_counter = counter
+    _bind()
+
+
+def _bind():
+    """Binds the public attributes of the backend on the proxy, or leaves them to __getattr__ while counting."""
+    bound = vars(traci)
+    bound.clear()
+    if _call_counter is not None:
+        return
+    for module in (_traci_module, _active):
+        for attr, value in vars(module).items():
+            if not attr.startswith("_") and not hasattr(_BackendProxy, attr):
+                bound[attr] = value
+
+
+def _counted(value, counter):
+    if hasattr(value, "subscribe") and hasattr(value, "getSubscriptionResults"):
+        return _CountingDomain(value, counter) # traci.vehicle, libsumo.vehicle, ...
+    if callable(value) and not isinstance(value, type):
+        def call(*args, **kwargs):
+            counter.calls += 1
+            return value(*args, **kwargs)
+        return call
+    return value # exceptions, StepListener, constants
+
+
+class _CountingDomain:
+    """Wraps a domain (traci.vehicle, libsumo.vehicle...) so its functions are counted."""
+
+    def __init__(self, domain, counter):
+        self._domain = domain
+        self._counter = counter
+
+    def __getattr__(self, attr):
+        # Built on first access only: the wrapper is cached as an attribute of the domain
+        value = _counted(getattr(self._domain, attr), self._counter)
+        setattr(self, attr, value)
+        return value
+
+
+class _BackendProxy:
+    """Forwards attribute access to the active backend module (see _bind())."""
+
+    def __getattr__(self, attr):
+        try:
+            value = getattr(_active, attr)
+        except AttributeError:
+            # Helpers only defined by the traci package (StepListener, FatalTraCIError...)
+            value = getattr(_traci_module, attr)
+        if _call_counter is None or attr.startswith("_"):
+            return value
+        value = _counted(value, _call_counter)
+        setattr(self, attr, value) # counted wrappers are built once, dropped by the next _bind()
+        return value
+
+    def start(self, cmd, port=None, label="default"):
+        """traci.start() for both backends; libsumo has no port/label and no GUI."""
+        if _active_name == "libsumo":
+            if os.path.basename(cmd[0]).startswith("sumo-gui"):
+                print("Warning: libsumo cannot drive sumo-gui, running headless.")
+            return _active.start(cmd)
+        return _active.start(cmd, port=port, label=label)
+
+    def __repr__(self):
+        return f"<SUMO backend proxy: {_active_name}>"
+
+
+traci = _BackendProxy()
+use_backend(DEFAULT_BACKEND)
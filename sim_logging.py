@@ -0,0 +1,209 @@
+"""
+Asynchronous, rate-limited logging for the simulation step loop.
+
+The step loop logs through category loggers instead of print():
+
+    log = sim_logging.get_logger("mission")
+    log.info("%s: Assigning Action: Type=%s", vehID, actionType)
+
+Records are put on a queue by the simulation thread and written by a
+QueueListener thread, so the loop never waits on the console (or on the Tk
+process of Main.py). Each category can be limited to a number of records per
+second; the records dropped meanwhile are counted and reported on the next one
+that passes. Errors are never dropped; a warning is written again with the same
+arguments at most once per WARNING_REPEAT_SECONDS (e.g. the unknown capacity of
+a parking, checked for every truck heading there), the repeats being counted
+the same way.
+
+    LS2N_LOG_LEVEL=DEBUG    more detail (default INFO)
+    add_handler(handler)    extra outputs, e.g. GuiLogHandler for the Main window
+"""
+import atexit
+import collections
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+ROOT_LOGGER = "ls2n"
+DEFAULT_LEVEL = os.environ.get("LS2N_LOG_LEVEL", "INFO")
+
+# category -> records per second (also the burst size); categories not listed are not limited
+DEFAULT_RATE_LIMITS = {
+    "mission": 200,
+    "speed": 20,
+    "teleport": 20,
+    "alert": 5,
+}
+
+WARNING_REPEAT_SECONDS = 10.0
+MAX_WARNING_KEYS = 10000 # older warning keys are forgotten beyond this
+
+_lock = threading.Lock()
+_queue = None
+_queue_handler = None
+_listener = None
+_fanout = None
+
+
+def get_logger(category):
+    """Logger of a category ("mission", "speed", "teleport", "alert", "fleet", "report"...)."""
+    return logging.getLogger(f"{ROOT_LOGGER}.{category}")
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per category; below WARNING, records over the limit are dropped and counted.
+    Warnings repeated with the same message and arguments are dropped and counted for
+    WARNING_REPEAT_SECONDS after the last one written.
+    """
+
+    def __init__(self, limits):
+        logging.Filter.__init__(self)
+        self.limits = dict(limits)
+        self._buckets = {} # category -> [tokens, last refill time]
+        self._warned = {} # (logger, message, args) -> time last written
+        self.suppressed = collections.Counter() # category or warning key -> records dropped since the last written
+
+    def filter(self, record):
+        category = record.name[len(ROOT_LOGGER) + 1:]
+        if record.levelno >= logging.ERROR:
+            return self._release(category, record)
+        if record.levelno >= logging.WARNING:
+            return self._filter_warning(record)
+        rate = self.limits.get(category)
+        if rate is None:
+            return self._release(category, record)
+        now = time.monotonic()
+        bucket = self._buckets.get(category)
+        if bucket is None:
+            bucket = self._buckets[category] = [float(rate), now]
+        bucket[0] = min(float(rate), bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        if bucket[0] < 1.0:
+            self.suppressed[category] += 1
+            return False
+        bucket[0] -= 1.0
+        return self._release(category, record)
+
+    def _filter_warning(self, record):
+        key = (record.name, record.msg, record.args)
+        try:
+            last = self._warned.get(key)
+        except TypeError: # unhashable arguments
+            return self._release(None, record)
+        now = time.monotonic()
+        if last is not None and now - last < WARNING_REPEAT_SECONDS:
+            self.suppressed[key] += 1
+            return False
+        if len(self._warned) >= MAX_WARNING_KEYS:
+            self._warned = {k: t for k, t in self._warned.items() if now - t < WARNING_REPEAT_SECONDS}
+        self._warned[key] = now
+        return self._release(key, record)
+
+    def _release(self, key, record):
+        record.suppressed = self.suppressed.pop(key, 0)
+        return True
+
+
+class _Formatter(logging.Formatter):
+    """Plain messages, as print() wrote them, plus the number of records dropped before this one."""
+
+    def format(self, record):
+        message = logging.Formatter.format(self, record)
+        suppressed = getattr(record, "suppressed", 0)
+        return f"{message} [{suppressed} similar messages suppressed]" if suppressed else message
+
+
+class _Fanout(logging.Handler):
+    """Single handler of the listener thread; forwards to the handlers added at any time."""
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.handlers = []
+
+    def handle(self, record):
+        for handler in list(self.handlers):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        return True
+
+    def emit(self, record):
+        self.handle(record)
+
+
+class GuiLogHandler(logging.Handler):
+    """
+    Keeps the latest formatted records for a Tk widget. The listener thread only
+    appends; the GUI thread calls drain() from window.after(), as Tk is not thread-safe.
+    """
+
+    def __init__(self, maxlen=2000):
+        logging.Handler.__init__(self)
+        self.lines = collections.deque(maxlen=maxlen)
+        self.setFormatter(_Formatter())
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+    def drain(self):
+        lines = []
+        while self.lines:
+            lines.append(self.lines.popleft())
+        return lines
+
+
+def setup(level=DEFAULT_LEVEL, rate_limits=DEFAULT_RATE_LIMITS, stream=None):
+    """Starts the queue and its listener thread (once per process) and returns the root logger."""
+    global _queue, _queue_handler, _listener, _fanout
+    root = logging.getLogger(ROOT_LOGGER)
+    with _lock:
+        root.setLevel(level)
+        if _listener is not None:
+            return root
+        _queue = queue.Queue(-1)
+        _queue_handler = logging.handlers.QueueHandler(_queue)
+        _queue_handler.addFilter(RateLimitFilter(rate_limits))
+        root.addHandler(_queue_handler)
+        root.propagate = False
+
+        console = logging.StreamHandler(stream or sys.stdout)
+        console.setFormatter(_Formatter())
+        _fanout = _Fanout()
+        _fanout.handlers.append(console)
+        _listener = logging.handlers.QueueListener(_queue, _fanout)
+        _listener.start()
+        atexit.register(shutdown)
+    return root
+
+
+def add_handler(handler):
+    """Adds an output to the listener thread, e.g. a GuiLogHandler."""
+    setup()
+    if handler.formatter is None:
+        handler.setFormatter(_Formatter())
+    _fanout.handlers.append(handler)
+
+
+def remove_handler(handler):
+    if _fanout is not None and handler in _fanout.handlers:
+        _fanout.handlers.remove(handler)
+
+
+def flush():
+    """Waits until every queued record has been written (e.g. before plain print() output)."""
+    if _queue is not None:
+        _queue.join()
+
+
+def shutdown():
+    """Writes the remaining records and stops the listener thread."""
+    global _queue, _queue_handler, _listener
+    with _lock:
+        if _listener is not None:
+            logging.getLogger(ROOT_LOGGER).removeHandler(_queue_handler)
+            _listener.stop()
+            _queue, _queue_handler, _listener = None, None, None
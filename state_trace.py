@@ -0,0 +1,286 @@
+"""
+Record and replay of the per-step truck state of a run.
+
+run_simulation(..., record_trace=True) appends every step to '<mode>_Trace.bin'
+next to the CSV reports. replay() feeds a trace back through TruckAccumulators,
+MetricsSink and the monitor window without SUMO, to re-derive the reports, try
+new KPIs or demo the monitor faster than real time:
+
+    python state_trace.py "cases/Nantes/results/Mode111/Mode111_Trace.bin" --speed 100 --monitor
+
+File layout (little-endian, append-only, readable up to the last complete record):
+    MAGIC, u32 header length, JSON header (map, mode, nb_trucks, interval, capacities, report_parkings)
+    b"S" u16 length, utf-8 bytes      string table entry, numbered in order of appearance
+    b"P" u32 parking, u32 count       parking occupancy, only when it changed
+    b"T" u32 step, u32 trucks, u32 inTrucks, u32 inPort, then one TRUCK record per truck:
+        u32 id, u32 road, f8 speed (m/s), f8 waiting, f8 distance, f8 speedFactor, f8 CO2, f8 NOx,
+        u8 stopped, u32 action type, u32 action target, u32 action status
+    (id, road, action type, target and status are string table numbers)
+"""
+import argparse
+import json
+import os
+import struct
+import threading
+import time
+from collections import namedtuple
+
+from metrics_sink import MetricsSink
+from truck_accumulators import TruckAccumulators, StepBatch
+
+MAGIC = b"LS2NTRC1"
+TRACE_VERSION = 2
+HEADER_LENGTH = struct.Struct("<I")
+STRING = struct.Struct("<H")
+PARKING = struct.Struct("<II")
+STEP = struct.Struct("<IIII")
+TRUCK = struct.Struct("<IIddddddBIII")
+
+TruckState = namedtuple("TruckState", ("id", "road", "speed", "waiting", "distance", "speed_factor", "co2", "nox",
+                                       "stopped", "action_type", "action_target", "action_status"))
+TraceStep = namedtuple("TraceStep", ("step", "in_trucks", "in_port", "occupancy", "trucks"))
+
+
+def trace_file(folder, mode):
+    return os.path.join(folder, f"{mode}_Trace.bin")
+
+
+class TraceWriter:
+    """
+    Usage in the step loop:
+        recorder.truck(vehID, road_id, speed_ms, ...)   # for each truck of the step
+        recorder.end_step(step, fleet.entered_count, len(inPort), parkings.occupancy)
+    """
+
+    def __init__(self, file_path, header):
+        self.file_path = file_path
+        self.header = header
+        self._file = None
+        self._strings = {}
+        self._occupancy = {}
+        self._trucks = bytearray()
+        self._count = 0
+
+    def open(self, offset=None):
+        """
+        Args:
+            offset (int): File position saved by offset(), to resume from a checkpoint.
+        """
+        if offset is None:
+            self._file = open(self.file_path, "wb", buffering=1 << 20)
+            header = json.dumps(dict(self.header, version=TRACE_VERSION)).encode("utf-8")
+            self._file.write(MAGIC + HEADER_LENGTH.pack(len(header)) + header)
+        else:
+            # Resuming: the string table written before the checkpoint stays valid
+            strings = TraceReader(self.file_path).read_strings(end=offset)
+            self._strings = {s: i for i, s in enumerate(strings)}
+            self._file = open(self.file_path, "r+b", buffering=1 << 20)
+            self._file.seek(offset)
+            self._file.truncate()
+        return self
+
+    def _string(self, value):
+        index = self._strings.get(value)
+        if index is None:
+            index = self._strings[value] = len(self._strings)
+            data = value.encode("utf-8")
+            self._file.write(b"S" + STRING.pack(len(data)) + data)
+        return index
+
+    def truck(self, veh_id, road, speed, waiting, distance, speed_factor, co2, nox, stopped, action):
+        """action: the dict of get_mission_action_info() (type, target, status)."""
+        string = self._string
+        self._trucks += TRUCK.pack(string(veh_id), string(road), speed, waiting, distance, speed_factor, co2, nox,
+                                   1 if stopped else 0, string(action["type"]), string(action["target"]),
+                                   string(action["status"]))
+        self._count += 1
+
+    def end_step(self, step, in_trucks, in_port, occupancy):
+        write = self._file.write
+        for parking_id, count in occupancy.items():
+            if self._occupancy.get(parking_id) != count:
+                write(b"P" + PARKING.pack(self._string(parking_id), count))
+                self._occupancy[parking_id] = count
+        write(b"T" + STEP.pack(step, self._count, in_trucks, in_port))
+        write(self._trucks)
+        self._trucks.clear()
+        self._count = 0
+
+    def flush(self):
+        self._file.flush()
+
+    def offset(self):
+        """Current end of the trace (after flush()), saved in checkpoints."""
+        return self._file.tell()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class TraceReader:
+    """Iterates the TraceStep records of a trace file; a truncated last step is ignored."""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.strings = []
+        with open(file_path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{file_path} is not a trace file")
+            (length,) = HEADER_LENGTH.unpack(f.read(HEADER_LENGTH.size))
+            self.header = json.loads(f.read(length).decode("utf-8"))
+            if self.header.get("version") != TRACE_VERSION:
+                raise ValueError(f"{file_path} has trace version {self.header.get('version')}, "
+                                 f"this reader needs {TRACE_VERSION}")
+            self._data_start = f.tell()
+
+    def steps(self, end=None):
+        """
+        Streams the steps of the trace, reading one record at a time.
+        Args:
+            end (int): File position to stop at, e.g. a checkpoint offset; defaults to the end of the file.
+        """
+        return self._records(end, trucks=True)
+
+    def read_strings(self, end=None):
+        """String table written before `end`, skipping over the truck records."""
+        for _ in self._records(end, trucks=False):
+            pass
+        return self.strings
+
+    def _records(self, end, trucks):
+        strings = self.strings = []
+        occupancy = {}
+        with open(self.file_path, "rb", buffering=1 << 20) as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell() if end is None else min(end, f.tell())
+            f.seek(self._data_start)
+            pos = self._data_start
+            while pos < size:
+                tag = f.read(1)
+                pos += 1
+                if tag == b"S":
+                    if pos + STRING.size > size:
+                        break
+                    (length,) = STRING.unpack(f.read(STRING.size))
+                    pos += STRING.size + length
+                    if pos > size:
+                        break
+                    strings.append(f.read(length).decode("utf-8"))
+                elif tag == b"P":
+                    if pos + PARKING.size > size:
+                        break
+                    parking, count = PARKING.unpack(f.read(PARKING.size))
+                    pos += PARKING.size
+                    occupancy[strings[parking]] = count
+                elif tag == b"T":
+                    if pos + STEP.size > size:
+                        break
+                    step, count, in_trucks, in_port = STEP.unpack(f.read(STEP.size))
+                    pos += STEP.size + count * TRUCK.size
+                    if pos > size:
+                        break
+                    if not trucks:
+                        f.seek(count * TRUCK.size, os.SEEK_CUR)
+                        continue
+                    states = [TruckState(strings[veh_id], strings[road], speed, waiting, distance, speed_factor,
+                                         co2, nox, bool(stopped), strings[action_type], strings[action_target],
+                                         strings[status])
+                              for (veh_id, road, speed, waiting, distance, speed_factor, co2, nox, stopped,
+                                   action_type, action_target, status) in TRUCK.iter_unpack(f.read(count * TRUCK.size))]
+                    yield TraceStep(step, in_trucks, in_port, dict(occupancy), states)
+                else:
+                    raise ValueError(f"Corrupted trace {self.file_path} at byte {pos - 1}")
+
+
+def truck_index(veh_id, nb_trucks, truck_prefix="trk"):
+    """trkN -> N-1 as in run_simulation, -1 if out of range."""
+    try:
+        index = int(veh_id[len(truck_prefix):]) - 1
+    except ValueError:
+        return -1
+    return index if 0 <= index < nb_trucks else -1
+
+
+def replay(trace_path, results_dir=None, mode=None, speed=None, monitor=False):
+    """
+    Rebuilds the CSV reports of a recorded run and optionally shows it in the monitor.
+    Args:
+        trace_path (str): '<mode>_Trace.bin' written by run_simulation(record_trace=True).
+        results_dir (str): Output folder, defaults to a 'replay' folder next to the trace.
+        mode (str): Prefix of the report files, defaults to the recorded mode.
+        speed (float): Simulated seconds per wall-clock second (1 step = 1 s), None for as fast as possible.
+        monitor (bool): Publish every step to the monitor window.
+    Returns:
+        int: Number of steps replayed.
+    """
+    import monitor_gui
+    reader = TraceReader(trace_path)
+    header = reader.header
+    mode = mode or header["mode"]
+    results_dir = results_dir or os.path.join(os.path.dirname(trace_path), "replay")
+    nb_trucks = header["nb_trucks"]
+    interval = header["interval"]
+    capacities = header["capacities"]
+    report_parkings = header["report_parkings"]
+    total_capacity = sum(capacities.get(p, 0) for p in report_parkings)
+
+    channel, gui_thread = None, None
+    if monitor:
+        channel = monitor_gui.SnapshotChannel()
+        gui_thread = threading.Thread(target=monitor_gui.start_monitor_gui, args=(channel,), daemon=True)
+        gui_thread.start()
+
+    accumulators = TruckAccumulators(nb_trucks)
+    metrics = MetricsSink(results_dir, mode, nb_trucks).open()
+    steps = 0
+    first_step = None
+    clock_start = time.monotonic()
+    try:
+        for record in reader.steps():
+            batch = StepBatch()
+            for truck in record.trucks:
+                index = truck_index(truck.id, nb_trucks)
+                if index != -1:
+                    batch.append(index, truck.distance, truck.speed, truck.speed_factor, truck.co2, truck.nox)
+            accumulators.add(batch)
+
+            if channel is not None:
+                channel.publish([{"id": t.id, "action_type": t.action_type, "action_target": t.action_target,
+                                  "mission_status": t.action_status, "road_id": t.road,
+                                  "speed": t.speed * 3.6, "wait_time": t.waiting} for t in record.trucks])
+
+            step = record.step
+            if step % interval == 0 or step == 1:
+                parked_count = sum(record.occupancy.get(p, 0) for p in report_parkings)
+                capacity_percent = (parked_count * 100.0 / total_capacity) if total_capacity > 0 else 0.0
+                metrics.write_interval(step, interval, accumulators, record.in_trucks, parked_count,
+                                       capacity_percent, record.in_port, len(record.trucks))
+                accumulators.reset()
+
+            steps += 1
+            if speed:
+                first_step = step if first_step is None else first_step
+                delay = clock_start + (step - first_step) / speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+    finally:
+        for file_path in metrics.close():
+            print(f"Saved: {file_path}")
+        if channel is not None:
+            channel.close()
+            gui_thread.join(timeout=2.0)
+    print(f"Replayed {steps} steps of {trace_path}")
+    return steps
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded trace without SUMO")
+    parser.add_argument("trace")
+    parser.add_argument("--results-dir", default=None)
+    parser.add_argument("--mode", default=None, help="Report file prefix, defaults to the recorded mode")
+    parser.add_argument("--speed", type=float, default=None, help="Replay speed factor, e.g. 100")
+    parser.add_argument("--monitor", action="store_true", help="Show the replay in the monitor window")
+    args = parser.parse_args()
+    replay(args.trace, args.results_dir, args.mode, args.speed, args.monitor)
@@ -0,0 +1,165 @@
+"""
+Per-phase timing of the control loop in Starter.run_simulation.
+
+Each phase of a step (simulationStep, state fetch, truck loop, mission logic,
+teleport fallback, monitor feed, reporting block, checkpoint, buffered write
+commands) is timed with time.perf_counter_ns() into a log-scale histogram, and
+the TraCI calls made through the backend proxy are counted per step, as well as
+the round-trips saved by the CommandBuffer. Every `log_every` steps the
+p50/p95/p99 of each phase are printed and appended to '<mode>_Profile.csv' next
+to the CSV reports, then the histograms start over.
+
+When profiling is off, run_simulation uses NullProfiler, whose methods do nothing.
+"""
+import csv
+import os
+import time
+
+import sim_backend
+
+PHASES = ("commands", "step", "fetch", "trucks", "missions", "teleport", "monitor", "report", "checkpoint")
+PROFILE_HEADER = ["step", "phase", "samples", "total_ms", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+SUB_BUCKETS = 8 # per power of two: about 9% resolution
+
+
+def bucket_of(value):
+    """Log-scale bucket of a non-negative integer (nanoseconds or call count)."""
+    if value < SUB_BUCKETS:
+        return value
+    exponent = value.bit_length() - 4 # keep the top 4 bits (leading 1 + 3 bits of mantissa)
+    return (exponent + 1) * SUB_BUCKETS + ((value >> exponent) - SUB_BUCKETS)
+
+
+def bucket_upper_bound(bucket):
+    if bucket < SUB_BUCKETS:
+        return bucket
+    exponent = bucket // SUB_BUCKETS - 1
+    return ((bucket % SUB_BUCKETS + SUB_BUCKETS + 1) << exponent) - 1
+
+
+class LogHistogram:
+    """Counts per log-scale bucket; percentiles are bucket upper bounds."""
+    __slots__ = ("counts", "samples", "total", "maximum")
+
+    def __init__(self):
+        self.counts = {}
+        self.samples = 0
+        self.total = 0
+        self.maximum = 0
+
+    def add(self, value):
+        bucket = bucket_of(value)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.samples += 1
+        self.total += value
+        if value > self.maximum:
+            self.maximum = value
+
+    def percentile(self, fraction):
+        if not self.samples:
+            return 0
+        rank = fraction * self.samples
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(bucket_upper_bound(bucket), self.maximum)
+        return self.maximum
+
+
+class StepProfiler:
+    """
+    Usage in the step loop:
+        t = profiler.now()
+        traci.simulationStep()
+        t = profiler.lap("step", t)      # records the phase, returns the new start time
+        ...
+        profiler.end_step(step, saved)   # TraCI calls and saved round-trips of the step, periodic log line
+    """
+
+    def __init__(self, folder, mode, log_every=600):
+        self.log_every = log_every
+        self.file_path = os.path.join(folder, f"{mode}_Profile.csv")
+        self.histograms = {phase: LogHistogram() for phase in PHASES}
+        self.call_histogram = LogHistogram()
+        self.saved_histogram = LogHistogram()
+        self.counter = sim_backend.CallCounter()
+        self._calls_at_step_start = 0
+        self._file = None
+        self._writer = None
+        self.now = time.perf_counter_ns
+
+    def open(self):
+        self._file = open(self.file_path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file, delimiter=";", lineterminator="\n")
+        self._writer.writerow(PROFILE_HEADER)
+        sim_backend.count_calls(self.counter)
+        return self
+
+    def lap(self, phase, start):
+        now = time.perf_counter_ns()
+        self.histograms[phase].add(now - start)
+        return now
+
+    def end_step(self, step, saved=0):
+        self.call_histogram.add(self.counter.calls - self._calls_at_step_start)
+        self.saved_histogram.add(saved)
+        self._calls_at_step_start = self.counter.calls
+        if step % self.log_every == 0:
+            self.flush(step)
+
+    def flush(self, step):
+        """Prints and writes the percentiles of the current window, then starts a new one."""
+        parts = []
+        for phase, histogram in self.histograms.items():
+            if not histogram.samples:
+                continue
+            row = [step, phase, histogram.samples, f"{histogram.total / 1e6:.3f}",
+                   f"{histogram.total / histogram.samples / 1e6:.4f}"]
+            row += [f"{histogram.percentile(p) / 1e6:.4f}" for p in (0.5, 0.95, 0.99)]
+            row.append(f"{histogram.maximum / 1e6:.4f}")
+            self._writer.writerow(row)
+            parts.append(f"{phase} p50={row[5]} p95={row[6]} p99={row[7]}")
+        calls = self.call_histogram
+        if calls.samples:
+            self._writer.writerow([step, "traci_calls", calls.samples, calls.total, f"{calls.total / calls.samples:.1f}",
+                                   calls.percentile(0.5), calls.percentile(0.95), calls.percentile(0.99), calls.maximum])
+            parts.append(f"traci calls/step p50={calls.percentile(0.5)} p99={calls.percentile(0.99)}")
+        saved = self.saved_histogram
+        if saved.total:
+            self._writer.writerow([step, "traci_saved", saved.samples, saved.total, f"{saved.total / saved.samples:.1f}",
+                                   saved.percentile(0.5), saved.percentile(0.95), saved.percentile(0.99), saved.maximum])
+            parts.append(f"saved round-trips/step mean={saved.total / saved.samples:.1f} max={saved.maximum}")
+        self._file.flush()
+        print(f"[profile] step {step} (ms): " + " | ".join(parts))
+        self.histograms = {phase: LogHistogram() for phase in PHASES}
+        self.call_histogram = LogHistogram()
+        self.saved_histogram = LogHistogram()
+
+    def close(self, step=None):
+        sim_backend.count_calls(None)
+        if self._file is not None:
+            if step is not None and self.call_histogram.samples:
+                self.flush(step)
+            self._file.close()
+            self._file = None
+            print(f"Saved: {self.file_path}")
+
+
+class NullProfiler:
+    """Profiling disabled: every hook is a no-op."""
+
+    def open(self):
+        return self
+
+    def now(self):
+        return 0
+
+    def lap(self, phase, start):
+        return 0
+
+    def end_step(self, step, saved=0):
+        pass
+
+    def close(self, step=None):
+        pass
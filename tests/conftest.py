@@ -0,0 +1,40 @@
+"""
+Shared fixtures. The tests run on the mock backend (mock_traci.py), so no SUMO
+installation is needed, only the traci package (for its constants):
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ["LS2N_SUMO_BACKEND"] = "mock" # before the first import of sim_backend
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import pytest
+
+import bench_mock
+
+
+@pytest.fixture
+def mock_case(tmp_path, monkeypatch):
+    """Returns a function writing the synthetic MockPort map (bench_mock.py) with n trucks into a temporary working folder."""
+    monkeypatch.chdir(tmp_path)
+
+    def write(nb_trucks, seed=42):
+        bench_mock.write_case(str(tmp_path), nb_trucks, seed)
+        return os.path.join(str(tmp_path), "cases", bench_mock.MAP_NAME)
+    return write
+
+
+@pytest.fixture
+def mock_sumo(mock_case):
+    """Starts the mock backend on a MockPort map; returns the traci proxy."""
+    from sim_backend import traci
+
+    def start(nb_trucks=10, seed=42):
+        case_dir = mock_case(nb_trucks, seed)
+        traci.start(["sumo", "-c", os.path.join(case_dir, "network.sumocfg")])
+        return traci
+    return start
@@ -0,0 +1,72 @@
+import csv
+import os
+
+import BatchRunner
+import bench_mock
+import Starter
+from sim_backend import traci
+
+
+def started_commands(monkeypatch):
+    commands = []
+    start = traci.start
+
+    def record(cmd, *args, **kwargs):
+        commands.append(cmd)
+        return start(cmd, *args, **kwargs)
+    monkeypatch.setattr(traci, "start", record)
+    return commands
+
+
+def test_output_prefix_only_when_asked(mock_case, monkeypatch):
+    mock_case(5)
+    commands = started_commands(monkeypatch)
+    Starter.run_simulation(bench_mock.MAP_NAME, "Mode111", simulation_end_seconds=100, monitor=False)
+    Starter.run_simulation(bench_mock.MAP_NAME, "Mode111", simulation_end_seconds=100, monitor=False,
+                           output_prefix="Mode111_seed1_")
+    assert "--output-prefix" not in commands[0]
+    assert commands[1][commands[1].index("--output-prefix") + 1] == "Mode111_seed1_"
+
+
+def test_cells_cover_the_matrix():
+    cells = BatchRunner.build_cells(["Nantes"], ["Mode000", "Mode111"], [1, 2], [100], 3600, "sumo", "traci")
+    assert len(cells) == 4
+    assert {key: cells[0][key] for key in ("map", "mode", "seed", "trucks", "end", "sumo_binary", "backend")} == \
+        {"map": "Nantes", "mode": "Mode000", "seed": 1, "trucks": 100, "end": 3600, "sumo_binary": "sumo", "backend": "traci"}
+    assert len(BatchRunner.ALL_MODES) == 8
+
+
+def test_each_cell_has_its_own_results_dir():
+    assert BatchRunner.cell_results_dir("Nantes", "Mode111", 1, 100) == \
+        os.path.join("cases", "Nantes", "results", "Mode111", "seed1_trk100")
+    assert BatchRunner.cell_results_dir("Nantes", "Mode111", 1, None) == \
+        os.path.join("cases", "Nantes", "results", "Mode111", "seed1")
+    assert BatchRunner.instance_dir("Nantes", 1, 100) == os.path.join("cases", "Nantes", "instances", "seed1_trk100")
+
+
+def test_write_summary_per_map(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    row = dict(dict.fromkeys(BatchRunner.SUMMARY_FIELDS, ""), map="Nantes", mode="Mode111", seed=1, trucks=100,
+               status="ok", wall_time_s=1.5, steps=3600, exited=100, results_dir="r")
+    BatchRunner.write_summary([row, dict(row, mode="Mode000", status="error"), dict(row, map="Paris")])
+    with open(os.path.join("cases", "Nantes", "results", "batch_summary.csv"), encoding="utf-8") as f:
+        rows = list(csv.DictReader(f, delimiter=";"))
+    assert [(r["mode"], r["status"]) for r in rows] == [("Mode111", "ok"), ("Mode000", "error")]
+    assert list(rows[0]) == BatchRunner.SUMMARY_FIELDS
+    assert os.path.exists(os.path.join("cases", "Paris", "results", "batch_summary.csv"))
+
+
+def test_run_cell(mock_case, monkeypatch):
+    mock_case(10)
+    commands = started_commands(monkeypatch)
+    cell = BatchRunner.build_cells([bench_mock.MAP_NAME], ["Mode111"], [1], [None], 3000, "sumo", "mock")[0]
+    row = BatchRunner.run_cell(cell)
+    assert (row["status"], row["exited"]) == ("ok", 10)
+    assert row["results_dir"] == os.path.join("cases", bench_mock.MAP_NAME, "results", "Mode111", "seed1")
+    assert os.path.exists(os.path.join(row["results_dir"], "Mode111_Truck Report.csv"))
+    assert "Mode111_seed1_" in commands[0] # own outputs next to the other cells of the map
+
+    BatchRunner.write_summary([row, dict(row, mode="Mode000", status="error")])
+    with open(os.path.join("cases", bench_mock.MAP_NAME, "results", "batch_summary.csv"), encoding="utf-8") as f:
+        rows = list(csv.DictReader(f, delimiter=";"))
+    assert [(r["mode"], r["status"], r["exited"]) for r in rows] == [("Mode111", "ok", "10"), ("Mode000", "error", "10")]
@@ -0,0 +1,74 @@
+import contextlib
+import filecmp
+import io
+import os
+import random
+
+import pytest
+
+import bench_generation
+import bench_mock
+import bulk_generation
+import Creator
+from net_cache import CompactNetwork, RouteTable
+
+FILES = ("MyRoutes.rou.xml", "missions.mis.xml")
+
+
+@pytest.fixture
+def context(mock_case):
+    case_dir = mock_case(0)
+    bench_generation.write_background(os.path.dirname(os.path.dirname(case_dir)))
+    with contextlib.redirect_stdout(io.StringIO()):
+        context = Creator.loadMapContext(bench_mock.MAP_NAME)
+    context["routeTable"] = None # MockPort has no network file
+    return context
+
+
+def create(nb_trucks, out_dir, context, seed, bulk):
+    """Returns the unreachable-leg lines Creator printed."""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        Creator.create(bench_mock.MAP_NAME, nb_trucks, "Truck", out_dir, seed=seed, context=context, bulk=bulk)
+    return [line for line in output.getvalue().splitlines() if "unreachable" in line or "no route" in line]
+
+
+def one_way_table():
+    """MockPort's edges as a one-way chain: a leg back to an earlier edge (c2 -> p1...) is unreachable."""
+    edges = list(bench_mock.EDGES)
+    network = CompactNetwork(edges, [10.0] * len(edges), [(i + 1,) for i in range(len(edges) - 1)] + [()])
+    return RouteTable.build(network, edges)
+
+
+def same_files(left, right):
+    return all(filecmp.cmp(os.path.join(left, name), os.path.join(right, name), shallow=False) for name in FILES)
+
+
+def test_random_state_follows_the_random_module():
+    rs = bulk_generation.random_state(11)
+    rng = random.Random(11)
+    assert list(rs.random_sample(5)) == [rng.random() for _ in range(5)]
+
+
+@pytest.mark.parametrize("nb_trucks", [1, 37, 500])
+@pytest.mark.parametrize("seed", [1, 7])
+def test_bulk_writes_the_same_files_as_creator(context, nb_trucks, seed):
+    create(nb_trucks, "reference", context, seed, bulk=False)
+    create(nb_trucks, "bulk", context, seed, bulk=True)
+    assert same_files("reference", "bulk")
+
+
+def test_bulk_reports_the_same_unreachable_legs(context):
+    context["routeTable"] = one_way_table()
+    reference = create(300, "reference", context, 5, bulk=False)
+    assert reference[0] != "0 unreachable mission legs" and len(reference) == 11
+    assert create(300, "bulk", context, 5, bulk=True) == reference
+    assert same_files("reference", "bulk")
+
+
+def test_seed_gives_the_instance(context):
+    create(100, "first", context, 3, bulk=None)
+    create(100, "again", context, 3, bulk=None)
+    create(100, "other", context, 4, bulk=None)
+    assert same_files("first", "again")
+    assert not same_files("first", "other")
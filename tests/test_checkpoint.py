@@ -0,0 +1,92 @@
+import os
+import pickle
+
+import pytest
+
+import bench_mock
+import checkpoint
+import Starter
+from sim_backend import traci
+
+MODE = "Mode111"
+END = 3000
+
+
+class Crash(BaseException):
+    """Stands for the process being killed: not caught by the step loop."""
+
+
+def run(base_dir, monkeypatch, nb_trucks=30, **kwargs):
+    monkeypatch.chdir(base_dir)
+    if not os.path.isdir(os.path.join(base_dir, "cases")):
+        bench_mock.write_case(str(base_dir), nb_trucks)
+    return Starter.run_simulation(bench_mock.MAP_NAME, MODE, simulation_end_seconds=END, monitor=False, **kwargs)
+
+
+def results(base_dir):
+    return os.path.join(str(base_dir), "cases", bench_mock.MAP_NAME, "results", MODE)
+
+
+def reports(base_dir):
+    """Report files of a run, without the wall-clock line of the truck report."""
+    folder = results(base_dir)
+    contents = {}
+    for name in sorted(os.listdir(folder)):
+        if name.endswith(".csv") and "Profile" not in name:
+            with open(os.path.join(folder, name), encoding="utf-8") as f:
+                lines = f.readlines()
+            contents[name] = lines[1:] if name.endswith("Truck Report.csv") else lines
+    return contents
+
+
+def test_resume_after_a_crash_gives_the_same_reports(tmp_path, monkeypatch):
+    os.makedirs(tmp_path / "reference")
+    os.makedirs(tmp_path / "crashed")
+    reference = run(tmp_path / "reference", monkeypatch)
+
+    step_function = traci.simulationStep
+    steps = [0]
+
+    def crashing_step(*args):
+        steps[0] += 1
+        if steps[0] == 800:
+            raise Crash()
+        return step_function(*args)
+
+    monkeypatch.setattr(traci, "simulationStep", crashing_step)
+    with pytest.raises(Crash):
+        run(tmp_path / "crashed", monkeypatch, checkpoint_every=250)
+    monkeypatch.undo()
+
+    checkpoint_dir = os.path.join(results(tmp_path / "crashed"), "checkpoints")
+    assert [step for step, _ in checkpoint.list_checkpoints(checkpoint_dir)] == [500, 750]
+    resumed = run(tmp_path / "crashed", monkeypatch, checkpoint_every=250, resume=True)
+
+    assert resumed == reference
+    assert reports(tmp_path / "crashed") == reports(tmp_path / "reference")
+
+
+def test_checkpointer_keeps_the_latest(tmp_path, mock_sumo):
+    mock_sumo(5)
+    checkpointer = checkpoint.Checkpointer(str(tmp_path / "checkpoints"), every=10, keep=2)
+    for step in range(1, 41):
+        traci.simulationStep()
+        if checkpointer.due(step):
+            checkpointer.save(step, {"value": step})
+    checkpointer.close()
+    assert [step for step, _ in checkpoint.list_checkpoints(str(tmp_path / "checkpoints"))] == [30, 40]
+    state = checkpoint.load_run_state(checkpoint.latest(str(tmp_path / "checkpoints")))
+    assert (state["step"], state["value"]) == (40, 40)
+
+
+def test_incomplete_and_foreign_checkpoints_are_ignored(tmp_path):
+    directory = tmp_path / "checkpoints"
+    os.makedirs(directory / checkpoint.checkpoint_name(100)) # run_state.pkl not written yet
+    assert checkpoint.latest(str(directory)) is None
+    path = directory / checkpoint.checkpoint_name(50)
+    os.makedirs(path)
+    with open(path / checkpoint.RUN_STATE_FILE, "wb") as f:
+        pickle.dump({"version": checkpoint.CHECKPOINT_VERSION - 1, "step": 50}, f)
+    assert checkpoint.latest(str(directory)) == str(path)
+    with pytest.raises(ValueError):
+        checkpoint.load_run_state(str(path))
@@ -0,0 +1,135 @@
+import sim_backend
+from command_buffer import CommandBuffer
+from mission_store import MissionAction
+
+
+def started(mock_sumo):
+    traci = mock_sumo(10)
+    traci.simulationStep()
+    assert "trk1" in traci.vehicle.getIDList()
+    return traci
+
+
+def test_unchanged_speed_factor_is_not_sent(mock_sumo):
+    traci = started(mock_sumo)
+    commands = CommandBuffer()
+    commands.set_speed_factor("trk1", 0.5)
+    assert commands.flush() == 0
+    commands.set_speed_factor("trk1", 0.5)
+    assert commands.flush() == 1
+    assert (commands.sent, commands.saved) == (1, 1)
+    assert traci.vehicle.getSpeedFactor("trk1") == 0.5
+
+
+def test_only_the_last_speed_factor_of_a_step_is_sent(mock_sumo):
+    traci = started(mock_sumo)
+    counter = sim_backend.CallCounter()
+    commands = CommandBuffer()
+    commands.set_speed_factor("trk1", 0.5)
+    commands.set_speed_factor("trk1", 0.7)
+    sim_backend.count_calls(counter)
+    try:
+        commands.flush()
+    finally:
+        sim_backend.count_calls(None)
+    assert counter.calls == 1
+    assert traci.vehicle.getSpeedFactor("trk1") == 0.7
+
+
+def test_change_undone_in_the_same_step_is_dropped(mock_sumo):
+    traci = started(mock_sumo)
+    commands = CommandBuffer()
+    commands.set_speed_factor("trk1", 0.5)
+    commands.flush()
+    commands.set_speed_factor("trk1", 1.0)
+    commands.set_speed_factor("trk1", 0.5)
+    assert commands.flush() == 2
+    assert commands.sent == 1
+    assert traci.vehicle.getSpeedFactor("trk1") == 0.5
+
+
+def test_commands_are_only_sent_on_flush(mock_sumo):
+    traci = started(mock_sumo)
+    commands = CommandBuffer()
+    commands.set_speed_factor("trk1", 0.5)
+    assert traci.vehicle.getSpeedFactor("trk1") == 1.0
+    commands.flush()
+    assert traci.vehicle.getSpeedFactor("trk1") == 0.5
+
+
+def test_flush_vehicle_keeps_the_other_vehicles_queued(mock_sumo):
+    traci = started(mock_sumo)
+    while "trk2" not in traci.vehicle.getIDList():
+        traci.simulationStep()
+    commands = CommandBuffer()
+    commands.set_speed_factor("trk1", 0.5)
+    commands.set_speed_factor("trk2", 0.5)
+    commands.flush_vehicle("trk2")
+    assert traci.vehicle.getSpeedFactor("trk2") == 0.5
+    assert traci.vehicle.getSpeedFactor("trk1") == 1.0
+    commands.flush()
+    assert traci.vehicle.getSpeedFactor("trk1") == 0.5
+
+
+def test_error_resets_the_action_status(mock_sumo):
+    started(mock_sumo)
+    commands = CommandBuffer()
+    action = MissionAction("Park", "Parking1", "p1", status="1")
+    commands.set_parking_area_stop("trk99", "Parking1", 600, on_error=lambda e: action.set("status", "0"))
+    assert action.status == "1"
+    commands.flush()
+    assert action.status == "0"
+    assert commands.sent == 0
+
+
+def test_failed_speed_factor_is_sent_again(mock_sumo):
+    started(mock_sumo)
+    commands = CommandBuffer()
+    commands.set_speed_factor("trk99", 0.5)
+    commands.flush()
+    commands.set_speed_factor("trk99", 0.5)
+    assert commands.flush() == 0 # not suppressed: the first one never reached SUMO
+
+
+def test_forget_drops_the_last_values_sent(mock_sumo):
+    started(mock_sumo)
+    commands = CommandBuffer()
+    commands.set_speed_factor("trk1", 0.5)
+    commands.flush()
+    commands.forget(["trk1"])
+    commands.set_speed_factor("trk1", 0.5)
+    assert commands.flush() == 0
+    assert commands.sent == 2
+
+
+def test_immediate_buffer_sends_at_once(mock_sumo):
+    traci = started(mock_sumo)
+    commands = CommandBuffer(immediate=True)
+    commands.set_speed_factor("trk1", 0.5)
+    assert traci.vehicle.getSpeedFactor("trk1") == 0.5
+    commands.set_speed_factor("trk1", 0.5)
+    assert commands.sent == 2
+
+
+def test_run_sends_the_writes_of_its_last_step(mock_case, monkeypatch):
+    import bench_mock
+    import Starter
+    buffers = []
+
+    class RecordingBuffer(CommandBuffer):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            buffers.append(self)
+            self.times = []
+
+        def queue(self, *args, **kwargs):
+            super().queue(*args, **kwargs)
+            self.times.append(Starter.traci.simulation.getTime())
+
+    monkeypatch.setattr(Starter, "CommandBuffer", RecordingBuffer)
+    mock_case(10)
+    Starter.run_simulation(bench_mock.MAP_NAME, "Mode111", simulation_end_seconds=7, monitor=False)
+    commands, = buffers
+    assert commands.times == [1.0, 7.0] # trk2 departs at 6 s, its stop is queued on the last step
+    assert commands._queue == []
+    assert commands.sent == 2
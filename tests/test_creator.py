@@ -0,0 +1,27 @@
+import contextlib
+import filecmp
+import io
+import os
+
+import bench_generation
+import bench_mock
+import Creator
+
+FILES = ("MyRoutes.rou.xml", "missions.mis.xml")
+SPECS = [(1, 40), (2, 40), (1, 120)]
+
+
+def test_parallel_instances_match_sequential_ones(mock_case):
+    case_dir = mock_case(0)
+    bench_generation.write_background(os.path.dirname(os.path.dirname(case_dir)))
+    with contextlib.redirect_stdout(io.StringIO()):
+        folders = Creator.createInstances(bench_mock.MAP_NAME, SPECS, workers=2)
+        context = Creator.loadMapContext(bench_mock.MAP_NAME)
+        for seed, nb_trucks in SPECS:
+            Creator.create(bench_mock.MAP_NAME, nb_trucks, "Truck", os.path.join("reference", f"{seed}_{nb_trucks}"),
+                           seed=seed, context=context)
+    assert folders == [Creator.instanceDir(bench_mock.MAP_NAME, seed, n) for seed, n in SPECS]
+    for folder, (seed, nb_trucks) in zip(folders, SPECS):
+        reference = os.path.join("reference", f"{seed}_{nb_trucks}")
+        assert sorted(os.listdir(folder)) == sorted(FILES)
+        assert all(filecmp.cmp(os.path.join(folder, name), os.path.join(reference, name), shallow=False) for name in FILES)
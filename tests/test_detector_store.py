@@ -0,0 +1,73 @@
+import math
+import os
+import time
+
+import numpy as np
+import pytest
+
+import detector_store
+
+ADDITIONAL = """<additional>
+  <e1Detector id="det1" lane="a_0" pos="10" period="60" file="out/e1.xml"/>
+  <e1Detector id="det2" lane="b_0" pos="10" period="60" file="out/e1.xml"/>
+</additional>"""
+
+
+def intervals(rows):
+    lines = ['<detector>']
+    for det_id, begin, flow in rows:
+        lines.append(f'  <interval begin="{begin:.2f}" end="{begin + 60:.2f}" id="{det_id}" nVehContrib="{int(flow / 60)}" '
+                     f'flow="{flow:.2f}" occupancy="1.50" speed="{-1 if not flow else 10.0:.2f}" '
+                     f'harmonicMeanSpeed="-1.00" length="-1.00" nVehEntered="{int(flow / 60)}"/>')
+    lines.append('</detector>\n')
+    return "\n".join(lines)
+
+
+ROWS = [("det1", 0, 120.0), ("det2", 0, 60.0), ("det1", 60, 0.0), ("det1", 120, 180.0), ("det2", 120, 240.0)]
+
+
+@pytest.fixture
+def run_files(tmp_path):
+    add_path = tmp_path / "detectors.add.xml"
+    add_path.write_text(ADDITIONAL)
+    os.makedirs(tmp_path / "out")
+    return str(add_path)
+
+
+def test_ingest_and_read_back(tmp_path):
+    xml_path = tmp_path / "e1.xml"
+    xml_path.write_text(intervals(ROWS))
+    assert detector_store.ingest(str(xml_path), str(tmp_path / "store")) == 5
+    store = detector_store.DetectorStore(str(tmp_path / "store"))
+    assert store.detectors == ["det1", "det2"]
+    begins, flow = store.series("det1")
+    assert list(begins) == [0.0, 60.0, 120.0] and list(flow) == [120.0, 0.0, 180.0]
+    assert list(store.column("nVehContrib")[store.rows_of("det2")]) == [1, 4]
+    detectors, begins, matrix = store.matrix("flow")
+    assert list(begins) == [0.0, 60.0, 120.0]
+    assert np.array_equal(matrix[0], [120.0, 0.0, 180.0])
+    assert matrix[1, 0] == 60.0 and math.isnan(matrix[1, 1]) # det2 wrote no interval at 60
+    with pytest.raises(KeyError):
+        store.rows_of("det3")
+
+
+def test_detector_files_carry_the_output_prefix(run_files, tmp_path):
+    assert detector_store.detector_files([run_files]) == [str(tmp_path / "out" / "e1.xml")]
+    assert detector_store.detector_files([run_files], "Mode111_seed1_") == [str(tmp_path / "out" / "Mode111_seed1_e1.xml")]
+
+
+def test_ingest_run_only_reads_its_own_output(run_files, tmp_path):
+    (tmp_path / "out" / "Mode111_seed1_e1.xml").write_text(intervals(ROWS))
+    (tmp_path / "out" / "Mode111_seed2_e1.xml").write_text(intervals(ROWS[:1])) # parallel run of the same map
+    results = tmp_path / "results"
+    written = detector_store.ingest_run([run_files], str(results), "Mode111", "Mode111_seed1_")
+    assert written == [str(results / "Mode111_detectors")]
+    assert detector_store.DetectorStore(written[0]).rows == 5
+    assert detector_store.ingest_run([run_files], str(results), "Mode000", "Mode000_seed1_") == []
+
+
+def test_ingest_run_skips_stale_files(run_files, tmp_path):
+    output = tmp_path / "out" / "e1.xml"
+    output.write_text(intervals(ROWS))
+    os.utime(output, (time.time() - 3600, time.time() - 3600))
+    assert detector_store.ingest_run([run_files], str(tmp_path / "results"), "Mode111", since=time.time() - 60) == []
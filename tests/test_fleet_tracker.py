@@ -0,0 +1,47 @@
+import math
+
+from fleet_tracker import FleetTracker
+
+
+def test_lifecycle_from_departed_and_arrived():
+    fleet = FleetTracker(3)
+    fleet.update(["trk1", "car7", "trk2"], [], 10)
+    assert (fleet.entered_count, fleet.exited_count) == (2, 0)
+    assert fleet.active == {"trk1", "trk2"}
+    fleet.update([], ["trk1", "car7"], 50)
+    assert (fleet.entered_count, fleet.exited_count) == (2, 1)
+    assert fleet.trip_time("trk1") == 40
+    assert math.isnan(fleet.trip_time("trk2"))
+    assert not fleet.complete()
+    fleet.update(["trk3"], ["trk2", "trk3"], 60) # trk3 departed and arrived within the step
+    assert fleet.complete()
+    assert fleet.active == set()
+    assert (fleet.entered_count, fleet.exited_count) == (3, 3)
+
+
+def test_repeated_events_are_counted_once():
+    fleet = FleetTracker(2)
+    fleet.start(["trk1"], 0)
+    fleet.update(["trk1"], [], 1)
+    fleet.update([], ["trk1"], 5)
+    fleet.update([], ["trk1"], 6)
+    assert (fleet.entered_count, fleet.exited_count) == (1, 1)
+    assert fleet.trip_time("trk1") == 5
+
+
+def test_trucks_outside_the_mission_file_do_not_complete_the_run():
+    fleet = FleetTracker(1)
+    fleet.update(["trk5"], ["trk5"], 3)
+    assert (fleet.entered_count, fleet.exited_count) == (1, 1)
+    assert not fleet.complete()
+    assert math.isnan(fleet.trip_time("trk5"))
+
+
+def test_state_round_trip():
+    fleet = FleetTracker(3)
+    fleet.update(["trk1", "trk2", "trk9"], ["trk2"], 4)
+    restored = FleetTracker(3)
+    restored.load_state(fleet.state())
+    assert (restored.entered_count, restored.exited_count, restored.exited_in_range) == (3, 1, 1)
+    assert restored.active == {"trk1", "trk9"}
+    assert restored.summary() == fleet.summary()
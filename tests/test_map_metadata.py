@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+import map_metadata
+from map_metadata import Parking
+
+METADATA = """<metaData>
+  <inputs><input value="in0"/></inputs>
+  <outputs><output value="out0"/><output value="out1"/></outputs>
+  <missions><mission value="LUG"/></missions>
+  <parkings><parking value="Parking1" edge="p1"/><parking value="Parking2" edge="p2"/></parkings>
+  <stops><stop value="Crane1" edge="c1"/></stops>
+  <routes><route edges="in0 a b"/><route edges=""/></routes>
+</metaData>
+"""
+
+
+@pytest.fixture
+def meta_file(tmp_path):
+    os.makedirs(tmp_path / "Port")
+    path = tmp_path / "Port" / "metaData.xml"
+    path.write_text(METADATA)
+    yield str(path)
+    map_metadata.clear_cache()
+
+
+def test_single_pass_model(meta_file, tmp_path):
+    meta = map_metadata.load("Port", str(tmp_path))
+    assert meta.inputs == ("in0",) and meta.outputs == ("out0", "out1") and meta.missions == ("LUG",)
+    assert meta.parkings == (Parking("Parking1", "p1"), Parking("Parking2", "p2"))
+    assert meta.parking_by_name["Parking2"].edge == "p2"
+    assert meta.stops[0].name == "Crane1"
+    assert meta.routes == (("in0", "a", "b"), ())
+    assert meta.alternative_parkings("Parking1") == [Parking("Parking2", "p2")]
+
+
+def test_unchanged_file_is_not_parsed_again(meta_file, tmp_path, capsys):
+    meta = map_metadata.load("Port", str(tmp_path))
+    assert "Parsed" in capsys.readouterr().out
+    assert map_metadata.load("Port", str(tmp_path)) is meta
+    assert capsys.readouterr().out == ""
+
+
+def test_changed_file_is_parsed_again(meta_file, tmp_path):
+    meta = map_metadata.load("Port", str(tmp_path))
+    with open(meta_file, "w") as f:
+        f.write(METADATA.replace('<output value="out1"/>', "")) # size changes
+    changed = map_metadata.load("Port", str(tmp_path))
+    assert changed.outputs == ("out0",)
+
+    stat = os.stat(meta_file)
+    os.utime(meta_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000)) # mtime only
+    touched = map_metadata.load("Port", str(tmp_path))
+    assert touched is not changed and touched.outputs == ("out0",)
+    assert meta.outputs == ("out0", "out1") # instances handed out earlier are left as they were
+
+
+def test_clear_cache(meta_file, tmp_path):
+    meta = map_metadata.load("Port", str(tmp_path))
+    map_metadata.clear_cache()
+    assert map_metadata.load("Port", str(tmp_path)) is not meta
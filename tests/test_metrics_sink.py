@@ -0,0 +1,65 @@
+import os
+from datetime import datetime
+
+from metrics_sink import MetricsSink, TRUCK_REPORT_HEADER
+from truck_accumulators import StepBatch, TruckAccumulators
+
+MODE = "Mode111"
+INTERVAL = 60
+
+
+def write_intervals(sink, accumulators, steps):
+    for step in steps:
+        batch = StepBatch()
+        batch.append(0, 2500.0, 12.0, 1.0, 2000.0, 500.0)
+        batch.append(1, 1500.0, 6.0, 0.5, 1000.0, 250.0)
+        accumulators.add(batch)
+        sink.write_interval(step, INTERVAL, accumulators, 2, 1, 2.0, 0, 2)
+        accumulators.reset()
+
+
+def read(folder, name):
+    with open(os.path.join(folder, f"{MODE}{name}"), encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def test_reports_are_streamed_then_exported(tmp_path):
+    folder = str(tmp_path / "results")
+    sink = MetricsSink(folder, MODE, 2).open()
+    write_intervals(sink, TruckAccumulators(2), [60, 120])
+    assert os.path.exists(sink.partial_report_path)
+    assert len(read(folder, "_DistancesRep.csv")) == 3 # rows are on disk before close()
+    begin = datetime(2024, 1, 1, 8, 0, 0)
+    written = sink.close(begin, datetime(2024, 1, 1, 9, 0, 0))
+    assert written[0] == sink.report_path
+    assert not os.path.exists(sink.partial_report_path)
+    report = read(folder, "_Truck Report.csv")
+    assert report[0] == "Simulation started at 08:00:00 ended at 09:00:00"
+    assert report[1] == ";".join(TRUCK_REPORT_HEADER)
+    assert report[2].startswith("60;1.0;2;4.000;")
+    assert read(folder, "_DistancesRep.csv") == ["trk1;trk2;", "2.0;1.0;", "2.0;1.0;"]
+    assert read(folder, "_SpeedsRep.csv")[1] == f"{43 / INTERVAL};{21 / INTERVAL};" # int(km/h) / interval
+
+
+def test_resume_drops_the_rows_after_the_checkpoint(tmp_path):
+    folder = str(tmp_path / "results")
+    sink = MetricsSink(folder, MODE, 2).open()
+    write_intervals(sink, TruckAccumulators(2), [60])
+    offsets = sink.offsets()
+    write_intervals(sink, TruckAccumulators(2), [120, 180])
+    sink.close(datetime(2024, 1, 1, 8, 0, 0), datetime(2024, 1, 1, 9, 0, 0)) # the run went on and ended normally
+
+    resumed = MetricsSink(folder, MODE, 2).open(offsets)
+    write_intervals(resumed, TruckAccumulators(2), [120])
+    resumed.close()
+    report = read(folder, "_Truck Report.csv")
+    assert [line.split(";")[0] for line in report] == ["step", "60", "120"]
+    assert len(read(folder, "_co2sRep.csv")) == 3
+
+
+def test_no_trucks(tmp_path):
+    folder = str(tmp_path / "results")
+    with MetricsSink(folder, MODE, 0) as sink:
+        write_intervals(sink, TruckAccumulators(0), [])
+        sink.write_series("co2s", [])
+    assert read(folder, "_co2sRep.csv") == ["", ""]
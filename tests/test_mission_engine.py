@@ -0,0 +1,103 @@
+import os
+import xml.etree.ElementTree as ET
+
+import pytest
+import traci.constants as tc
+
+import bench_mock
+import Starter
+from mission_engine import MissionEngine
+from mission_store import MissionStore
+from parking_registry import ParkingRegistry
+
+MISSIONS = """<missions>
+  <mission id="trk1" type="LG">
+    <action type="Load" target="Crane1" edge="c1" status="0"/>
+    <action type="Go" target="out0" edge="out0" status="0"/>
+  </mission>
+</missions>"""
+
+
+class RecordingHandler:
+    """Assigns pending actions (status 0 -> 1) and records the calls."""
+
+    def __init__(self, missions):
+        self.missions = missions
+        self.calls = []
+
+    def __call__(self, veh_id, state):
+        self.calls.append(veh_id)
+        action = self.missions.pending_action(veh_id)
+        if action is not None and action.status == "0":
+            action.set("status", "1")
+
+
+def state(edge, speed=10.0):
+    return {tc.VAR_ROAD_ID: edge, tc.VAR_SPEED: speed}
+
+
+@pytest.fixture
+def engine():
+    missions = MissionStore.from_root(ET.fromstring(MISSIONS))
+    handler = RecordingHandler(missions)
+    return MissionEngine(missions, ParkingRegistry({"Crane1": 1}), "Mode111", handler), missions, handler
+
+
+def test_handler_only_runs_on_events(engine):
+    engine, missions, handler = engine
+    states = {"trk1": state("in0"), "car1": state("in0")}
+    engine.step(states, departed=["trk1", "car1"])
+    assert handler.calls == ["trk1"]
+    engine.step(states) # newly assigned: checked once more
+    engine.step(states)
+    engine.step(states)
+    assert handler.calls == ["trk1", "trk1"]
+    assert engine.targets == {"trk1": "Crane1"}
+
+    engine.parkings.occupancy["Crane1"] = 1
+    engine.step(states, parking_changed=["Crane1"]) # target occupancy changed
+    assert len(handler.calls) == 3
+
+    missions.pending_action("trk1").set("status", "3") # Load done by the handler on a stop event
+    engine.step(states, stop_events=["trk1"])
+    engine.step(states) # Go assigned, checked once more
+    assert engine.go_edges == {"trk1": "out0"}
+    calls = len(handler.calls)
+    engine.step({"trk1": state("out0")})
+    assert len(handler.calls) == calls + 1 # on the Go edge
+
+
+def test_arrival_completes_the_go_action(engine):
+    engine, missions, handler = engine
+    missions.pending_action("trk1").set("status", "3")
+    engine.step({"trk1": state("in0")}, departed=["trk1"])
+    assert missions.pending_action("trk1").status == "1"
+    engine.step({}, arrived=["trk1"])
+    assert missions.pending_action("trk1") is None
+    assert engine.go_edges == {}
+
+
+def test_truck_without_state_is_kept_due(engine):
+    engine, missions, handler = engine
+    assert engine.step({}, departed=["trk1"]) == 0 # subscribed this step, no results yet
+    assert engine.due == {"trk1"}
+    engine.step({"trk1": state("in0")})
+    assert handler.calls == ["trk1"]
+    assert missions.pending_action("trk1").status == "1"
+
+    engine.due.add("trk1")
+    engine.step({}) # still no results
+    engine.step({}, arrived=["trk1"])
+    assert engine.due == set()
+    assert handler.calls == ["trk1"]
+
+
+@pytest.mark.parametrize("mode", ["Mode111", "Mode101", "Mode110"])
+def test_every_mission_is_completed(mock_case, mode):
+    mock_case(60)
+    summary = Starter.run_simulation(bench_mock.MAP_NAME, mode, simulation_end_seconds=5000, monitor=False)
+    assert summary["exited"] == 60
+    final = MissionStore.from_file(os.path.join("cases", bench_mock.MAP_NAME, "results", mode,
+                                                "missions_final_state.mis.xml"))
+    assert len(final) == 60
+    assert all(final.pending_action(veh_id) is None for veh_id in final.missions)
@@ -0,0 +1,84 @@
+import xml.etree.ElementTree as ET
+
+from mission_store import MissionAction, MissionStore
+
+MISSIONS = """<missions>
+  <mission id="trk1" type="LUG">
+    <action type="Load" target="Crane1" edge="c1" status="0"/>
+    <action type="Unload" target="Crane2" edge="c2" status="0"/>
+    <action type="Go" target="out0" edge="out0" status="0"/>
+  </mission>
+  <mission id="trk2" type="PG">
+    <action type="Park" target="Parking1" edge="p1" status="3"/>
+    <action type="Go" target="out0" edge="out0" status="0"/>
+  </mission>
+  <mission id="trk1" type="G">
+    <action type="Go" target="out1" edge="out1" status="0"/>
+  </mission>
+</missions>"""
+
+
+def store():
+    return MissionStore.from_root(ET.fromstring(MISSIONS))
+
+
+def test_cursor_moves_past_completed_actions():
+    missions = store()
+    assert missions.pending_action("trk2").type == "Go" # first action already completed in the file
+    missions.pending_action("trk1").set("status", "3")
+    assert missions.pending_action("trk1").type == "Unload"
+    missions.pending_action("trk1").set("status", "3")
+    missions.pending_action("trk1").set("status", "3")
+    assert missions.pending_action("trk1") is None
+    assert missions.get_mission("trk1").cursor == 3
+
+
+def test_status_other_than_completed_keeps_the_cursor():
+    missions = store()
+    action = missions.pending_action("trk1")
+    action.set("status", "2")
+    assert missions.pending_action("trk1") is action
+
+
+def test_duplicate_id_keeps_the_first_mission():
+    missions = store()
+    assert len(missions) == 2
+    mission = missions.get_mission("trk1")
+    assert mission.type == "LUG"
+    assert [a.target for a in mission.actions] == ["Crane1", "Crane2", "out0"]
+
+
+def test_unknown_vehicle():
+    missions = store()
+    assert "trk9" not in missions
+    assert missions.pending_action("trk9") is None
+    assert missions.replace_pending_action("trk9", MissionAction("Park", "Parking2", "p2")) is None
+
+
+def test_replace_pending_action_resets_status():
+    missions = store()
+    missions.pending_action("trk1").set("status", "1")
+    old_target = missions.replace_pending_action("trk1", ET.Element("action", type="Park", target="Parking2", edge="p2"))
+    assert old_target == "Crane1"
+    action = missions.pending_action("trk1")
+    assert (action.type, action.target, action.edge, action.status) == ("Park", "Parking2", "p2", "0")
+
+
+def test_snapshot_restore_rewinds_the_cursor():
+    missions = store()
+    snapshot = missions.snapshot()
+    for _ in range(3):
+        missions.pending_action("trk1").set("status", "3")
+    assert missions.pending_action("trk1") is None
+    missions.restore(snapshot)
+    assert missions.pending_action("trk1").target == "Crane1"
+
+
+def test_write_round_trip(tmp_path):
+    missions = store()
+    missions.pending_action("trk1").set("status", "3")
+    path = tmp_path / "missions.mis.xml"
+    missions.write(str(path))
+    reloaded = MissionStore.from_file(str(path))
+    assert reloaded.snapshot() == missions.snapshot()
+    assert reloaded.pending_action("trk1").target == "Crane2"
@@ -0,0 +1,61 @@
+import pytest
+import traci.constants as tc
+
+import mock_traci
+
+
+def run_until(traci, predicate, limit=1000):
+    for _ in range(limit):
+        if predicate():
+            return
+        traci.simulationStep()
+    raise AssertionError("condition not reached")
+
+
+def test_vehicles_depart_drive_and_arrive(mock_sumo):
+    traci = mock_sumo(10)
+    traci.simulation.subscribe((tc.VAR_DEPARTED_VEHICLES_IDS, tc.VAR_ARRIVED_VEHICLES_IDS))
+    traci.simulationStep()
+    assert traci.simulation.getSubscriptionResults()[tc.VAR_DEPARTED_VEHICLES_IDS] == ("trk1",)
+    assert traci.vehicle.getRoadID("trk1") == "in0"
+    assert traci.vehicle.getSpeed("trk1") == pytest.approx(mock_traci.MAX_SPEED)
+
+    traci.vehicle.setSpeedFactor("trk1", 0.5)
+    traci.simulationStep()
+    assert traci.vehicle.getSpeed("trk1") == pytest.approx(mock_traci.MAX_SPEED / 2)
+    traci.vehicle.setSpeedFactor("trk1", 1.0)
+
+    run_until(traci, lambda: "trk1" in traci.simulation.getArrivedIDList())
+    assert "trk1" not in traci.vehicle.getIDList()
+    with pytest.raises(mock_traci.TraCIException):
+        traci.vehicle.getSpeed("trk1")
+    run_until(traci, lambda: traci.simulation.getMinExpectedNumber() == 0)
+
+
+def test_full_parking_area_makes_vehicles_wait(mock_sumo):
+    traci = mock_sumo(10)
+    run_until(traci, lambda: {"trk1", "trk2"} <= set(traci.vehicle.getIDList()))
+    for veh_id in ("trk1", "trk2"):
+        traci.vehicle.changeTarget(veh_id, "c1")
+        traci.vehicle.setParkingAreaStop(veh_id, "Crane1", duration=600)
+    mock_traci._world.parkings["Crane1"][1] = 1 # room for one truck
+    run_until(traci, lambda: traci.vehicle.isStopped("trk1"))
+    for _ in range(100):
+        traci.simulationStep()
+    assert traci.parkingarea.getVehicleIDs("Crane1") == ("trk1",)
+    assert traci.vehicle.getRoadID("trk2") == "c1" and not traci.vehicle.isStopped("trk2")
+    assert traci.vehicle.getSpeed("trk2") == 0.0
+
+
+def test_save_and_load_state(mock_sumo, tmp_path):
+    traci = mock_sumo(10)
+    for _ in range(30):
+        traci.simulationStep()
+    state_file = str(tmp_path / "state.pkl")
+    traci.simulation.saveState(state_file)
+    positions = {veh_id: traci.vehicle.getLanePosition(veh_id) for veh_id in traci.vehicle.getIDList()}
+    for _ in range(30):
+        traci.simulationStep()
+    traci.simulation.loadState(state_file)
+    assert traci.simulation.getTime() == 30.0
+    assert {veh_id: traci.vehicle.getLanePosition(veh_id) for veh_id in traci.vehicle.getIDList()} == positions
@@ -0,0 +1,46 @@
+from monitor_gui import SnapshotChannel, diff_rows, row_values
+
+
+def truck(truck_id, speed=10.0, status="1", road="a"):
+    return {"id": truck_id, "action_type": "Load", "action_target": "Crane1", "mission_status": status,
+            "road_id": road, "speed": speed, "wait_time": 0.0}
+
+
+def test_diff_rows():
+    rows = {}
+    inserted, changed, removed = diff_rows(rows, [truck("trk1"), truck("trk2"), {"speed": 1.0}])
+    assert [truck_id for truck_id, _ in inserted] == ["trk1", "trk2"]
+    assert inserted[0][1] == ("trk1", "Load", "Crane1", "1", "a", "10.0", "0.0")
+    assert (changed, removed) == ([], [])
+
+    inserted, changed, removed = diff_rows(rows, [truck("trk1", speed=10.04), truck("trk2", status="2", road="c1"),
+                                                  truck("trk3")])
+    assert [truck_id for truck_id, _ in inserted] == ["trk3"]
+    assert changed == [("trk2", "mission_status", "2"), ("trk2", "current_edge", "c1")] # 10.04 shows as 10.0
+    assert removed == []
+
+    assert diff_rows(rows, [truck("trk3")]) == ([], [], ["trk1", "trk2"])
+    assert list(rows) == ["trk3"]
+
+
+def test_snapshot_channel_keeps_the_newest():
+    channel = SnapshotChannel()
+    assert channel.take() is None
+    channel.publish([truck("trk1")])
+    channel.publish([truck("trk2")])
+    channel.publish([truck("trk3")])
+    assert channel.take() == [truck("trk3")]
+    assert channel.take() is None
+    assert (channel.published, channel.dropped) == (3, 2)
+
+    channel.publish([])
+    assert channel.take() == []
+    assert channel.dropped == 2
+    assert not channel.closed
+    channel.close()
+    assert channel.closed
+
+
+def test_row_values():
+    assert row_values(truck("trk1", speed=10.04)) == ("trk1", "Load", "Crane1", "1", "a", "10.0", "0.0")
+    assert row_values({"id": "trk2"}) == ("trk2", "N/A", "N/A", "N/A", "N/A", "0.0", "0.0")
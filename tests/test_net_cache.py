@@ -0,0 +1,90 @@
+import os
+import shutil
+
+import pytest
+
+import net_cache
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+MAP_NAME = "Fork"
+
+
+@pytest.fixture
+def fork_map(tmp_path, monkeypatch):
+    """cases/Fork/MyNetwork.net.xml in a temporary working folder (see data/fork.net.xml)."""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(os.path.join("cases", MAP_NAME))
+    shutil.copy(os.path.join(DATA, "fork.net.xml"), net_cache.net_file(MAP_NAME))
+    return net_cache.net_file(MAP_NAME)
+
+
+def test_shortest_paths(fork_map):
+    network, _ = net_cache.load_network(MAP_NAME)
+    paths = network.shortest_paths_from("a", ["a", "b", "d", "e", "missing"])
+    assert paths == {"a": (0.0, ("a",)), "b": (10.0, ("a", "b")), "d": (30.0, ("a", "c", "d"))}
+    assert network.shortest_paths_from("missing", ["a"]) == {}
+
+
+def test_route_table(fork_map):
+    table = net_cache.load_route_table(MAP_NAME, ["a", "b", "d", "e", None])
+    assert table.reachable("a", "d") and not table.reachable("d", "a")
+    assert table.cost("a", "b") == 10.0
+    assert table.cost("a", "e") == float("inf")
+    assert table.path("a", "d") == ("a", "c", "d")
+    assert table.path("b", "a") is None
+
+
+def test_cache_is_reused_until_the_net_changes(fork_map, capsys):
+    net_cache.load_route_table(MAP_NAME, ["a", "b"])
+    assert "Parsing" in capsys.readouterr().out
+    net_cache.load_route_table(MAP_NAME, ["b", "a"])
+    assert "Parsing" not in capsys.readouterr().out
+    net_cache.load_route_table(MAP_NAME, ["a", "d"]) # other points: new table, cached network
+    assert "Parsing" not in capsys.readouterr().out
+
+    with open(fork_map) as f:
+        text = f.read()
+    with open(fork_map, "w") as f:
+        f.write(text.replace('speed="5.00"', 'speed="20.00"'))
+    table = net_cache.load_route_table(MAP_NAME, ["a", "d"])
+    assert "Parsing" in capsys.readouterr().out
+    assert table.cost("a", "d") == 15.0
+
+
+def test_unreadable_cache_is_rebuilt(fork_map, capsys):
+    net_cache.load_network(MAP_NAME)
+    capsys.readouterr()
+    for name in os.listdir(net_cache.cache_dir(MAP_NAME)):
+        with open(os.path.join(net_cache.cache_dir(MAP_NAME), name), "wb") as f:
+            f.write(b"truncated")
+    network, _ = net_cache.load_network(MAP_NAME)
+    assert "Parsing" in capsys.readouterr().out
+    assert network.edge_ids == ["a", "b", "c", "d", "e"]
+
+
+def test_successors_follow_the_lane_connections_of_the_class(fork_map):
+    with open(fork_map) as f:
+        text = f.read()
+    # a gets a passenger-only lane; only that lane is connected to c
+    text = text.replace('<lane id="a_0" index="0" speed="10.00" length="100.00" shape="0,0 100,0"/>',
+                        '<lane id="a_0" index="0" speed="10.00" length="100.00" shape="0,-3 100,-3"/>'
+                        '<lane id="a_1" index="1" allow="passenger" speed="10.00" length="100.00" shape="0,0 100,0"/>')
+    text = text.replace('<connection from="a" to="c" fromLane="0"', '<connection from="a" to="c" fromLane="1"')
+    with open(fork_map, "w") as f:
+        f.write(text)
+    assert net_cache.load_route_table(MAP_NAME, ["a", "b", "d"]).reachable("a", "d")
+    trucks = net_cache.load_route_table(MAP_NAME, ["a", "b", "d"], net_cache.TRUCK_VCLASS)
+    assert trucks.reachable("a", "b") and not trucks.reachable("a", "d")
+
+
+def test_net_file_is_hashed_again_only_when_it_changes(fork_map, monkeypatch):
+    hashed = []
+    file_hash = net_cache.file_hash
+    monkeypatch.setattr(net_cache, "file_hash", lambda path: hashed.append(path) or file_hash(path))
+    net_cache.load_route_table(MAP_NAME, ["a", "b"])
+    net_cache.load_route_table(MAP_NAME, ["a", "d"])
+    assert len(hashed) == 1
+    stat = os.stat(fork_map)
+    os.utime(fork_map, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    net_cache.load_route_table(MAP_NAME, ["a", "b"])
+    assert len(hashed) == 2
@@ -0,0 +1,113 @@
+import os
+import xml.etree.ElementTree as ET
+
+import bench_mock
+import myPyLib
+from map_metadata import Parking
+from net_cache import CompactNetwork, RouteTable
+from parking_registry import AlternativeParkingIndex, ParkingRegistry, parking_capacity
+
+
+def test_parking_capacity():
+    assert parking_capacity(ET.fromstring('<parkingArea id="p" roadsideCapacity="3"><space x="0" y="0"/></parkingArea>')) == 4
+    assert parking_capacity(ET.fromstring('<parkingArea id="p" roadsideCapacity="3" capacity="7"/>')) == 7
+    assert parking_capacity(ET.fromstring('<parkingArea id="p" capacity="7">'
+                                          '<param key="parkingArea.capacity" value="9"/></parkingArea>')) == 9
+    assert parking_capacity(ET.fromstring('<parkingArea id="p"/>')) == 0
+
+
+def test_capacities_from_the_config(tmp_path):
+    (tmp_path / "network.sumocfg").write_text(
+        '<configuration><input><additional-files value="parkings.add.xml, other.add.xml"/></input></configuration>')
+    (tmp_path / "parkings.add.xml").write_text(
+        '<additional><parkingArea id="Crane1" lane="c1_0" roadsideCapacity="20"/></additional>')
+    (tmp_path / "other.add.xml").write_text(
+        '<additional><parkingArea id="Parking1" lane="p1_0" roadsideCapacity="50"/></additional>')
+    registry = ParkingRegistry.from_config(str(tmp_path / "network.sumocfg"))
+    assert registry.capacities == {"Crane1": 20, "Parking1": 50}
+    assert registry.occupancy == {"Crane1": 0, "Parking1": 0}
+
+
+def test_lookups():
+    registry = ParkingRegistry({"Crane1": 2})
+    registry.occupancy["Crane1"] = 1
+    assert (registry.count("Crane1"), registry.free_places("Crane1")) == (1, 1)
+    assert not registry.is_full("Crane1")
+    registry.occupancy["Crane1"] = 2
+    assert registry.is_full("Crane1")
+    assert not registry.is_full("Unknown")
+    assert "Crane1" in registry and "Unknown" not in registry
+
+
+def park(traci, veh_id, parking_id, edge):
+    while veh_id not in traci.vehicle.getIDList():
+        traci.simulationStep()
+    traci.vehicle.changeTarget(veh_id, edge)
+    traci.vehicle.setParkingAreaStop(veh_id, parking_id, duration=600)
+    while not traci.vehicle.isStopped(veh_id):
+        traci.simulationStep()
+
+
+def test_occupancy_follows_the_simulation(mock_sumo):
+    traci = mock_sumo(10)
+    registry = ParkingRegistry.from_config(os.path.join("cases", bench_mock.MAP_NAME, "network.sumocfg"))
+    assert registry.capacities == {name: capacity for name, _, capacity in bench_mock.PARKINGS}
+    registry.start()
+    assert registry.changed == []
+    park(traci, "trk1", "Crane1", "c1")
+    assert registry.refresh() == ["Crane1"]
+    assert (registry.count("Crane1"), registry.free_places("Crane1")) == (1, 19)
+    assert registry.refresh() == []
+    assert not registry.is_full("Crane1")
+    assert not registry.is_full("Unknown")
+
+
+def test_polling_without_subscription(mock_sumo):
+    traci = mock_sumo(10)
+    registry = ParkingRegistry({"Crane1": 1, "Missing": 2})
+    park(traci, "trk1", "Crane1", "c1")
+    assert registry.refresh() == ["Crane1"]
+    assert registry.is_full("Crane1")
+    assert registry.count("Missing") == 0
+
+
+PARKINGS = (Parking("B", "b"), Parking("D", "d"), Parking("E", "e"), Parking("A", "a"))
+
+
+def fork_table():
+    """a -> b (10 s), a -> c -> d (30 s), e unreachable (as tests/data/fork.net.xml)."""
+    network = CompactNetwork(["a", "b", "c", "d", "e"], [10.0, 10.0, 20.0, 10.0, 10.0], [(1, 2), (), (3,), (), ()])
+    return RouteTable.build(network, [p.edge for p in PARKINGS])
+
+
+def test_alternatives_are_ranked_by_travel_cost():
+    index = AlternativeParkingIndex(PARKINGS, fork_table())
+    assert [p.name for p in index.alternatives("A")] == ["B", "D"]
+    assert index.alternatives("B") == ()
+    assert index.alternatives("Unknown") == PARKINGS
+
+
+def test_without_route_table_the_metadata_order_is_kept():
+    index = AlternativeParkingIndex(PARKINGS)
+    assert [p.name for p in index.alternatives("A")] == ["B", "D", "E"]
+
+
+def test_nearest_free_skips_full_parkings():
+    index = AlternativeParkingIndex(PARKINGS, fork_table())
+    registry = ParkingRegistry({"B": 1, "D": 1})
+    assert index.nearest_free("A", registry).name == "B"
+    registry.occupancy["B"] = 1
+    assert index.nearest_free("A", registry).name == "D"
+    registry.occupancy["D"] = 1
+    assert index.nearest_free("A", registry) is None
+
+
+def test_without_c_its_the_alternative_ignores_occupancy():
+    index = AlternativeParkingIndex(PARKINGS, fork_table())
+    registry = ParkingRegistry({"B": 1, "D": 1})
+    registry.occupancy["B"] = 1
+    assert myPyLib.getAlternative(None, "A", index).get("target") == "B" # Mode *0*: by distance only
+    assert myPyLib.getAlternative(None, "A", index, registry).get("target") == "D" # Mode *1*: nearest free
+    registry.occupancy["D"] = 1
+    assert myPyLib.getAlternative(None, "A", index).get("target") == "B"
+    assert myPyLib.getAlternative(None, "A", index, registry) == "no alternatives"
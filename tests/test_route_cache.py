@@ -0,0 +1,94 @@
+import xml.etree.ElementTree as ET
+
+import traci.constants as tc
+
+import sim_backend
+from route_cache import RouteCache
+
+
+def departed(traci, *veh_ids):
+    while not all(veh_id in traci.vehicle.getIDList() for veh_id in veh_ids):
+        traci.simulationStep()
+
+
+def test_route_is_reused_for_the_same_edges(mock_sumo):
+    traci = mock_sumo(10)
+    departed(traci, "trk1", "trk2")
+    routes = RouteCache()
+    routes.change_target("trk1", "in0", "p2")
+    routes.change_target("trk2", "in0", "p2")
+    assert (routes.hits, routes.misses) == (1, 1)
+    assert traci.vehicle.getRoute("trk2")[traci.vehicle.getRouteIndex("trk2"):] == ("in0", "p2")
+
+
+def test_speed_factor_gets_its_own_routes(mock_sumo):
+    traci = mock_sumo(10)
+    departed(traci, "trk1", "trk2", "trk3")
+    routes = RouteCache()
+    routes.change_target("trk1", "in0", "p2", 1.0)
+    routes.change_target("trk2", "in0", "p2", 0.5)
+    routes.change_target("trk3", "in0", "p2", 1.04) # speedDev draw: same routes as 1.0
+    assert (routes.hits, routes.misses) == (1, 2)
+
+
+def test_entries_expire(mock_sumo):
+    traci = mock_sumo(10)
+    departed(traci, "trk1", "trk2", "trk3")
+    routes = RouteCache(max_age=100)
+    routes.set_time(0)
+    routes.change_target("trk1", "in0", "p2")
+    routes.set_time(100)
+    routes.change_target("trk2", "in0", "p2")
+    routes.set_time(250)
+    routes.change_target("trk3", "in0", "p2")
+    assert (routes.hits, routes.misses, routes.expired) == (1, 2, 1)
+
+
+def test_invalidate_forgets_the_routes(mock_sumo):
+    traci = mock_sumo(10)
+    departed(traci, "trk1", "trk2")
+    routes = RouteCache()
+    routes.change_target("trk1", "in0", "p2")
+    routes.invalidate()
+    routes.change_target("trk2", "in0", "p2")
+    assert (routes.hits, routes.misses, routes.invalidations) == (0, 2, 1)
+
+
+def test_refused_route_is_routed_again(mock_sumo):
+    traci = mock_sumo(10)
+    departed(traci, "trk1")
+    routes = RouteCache()
+    routes.routes[("a", "p2", 10)] = (("a", "p2"), 0.0) # trk1 is still on in0
+    routes.change_target("trk1", "a", "p2")
+    assert routes.misses == 1
+    assert traci.vehicle.getRoute("trk1")[-1] == "p2"
+
+
+def test_internal_edges_are_not_cached(mock_sumo):
+    traci = mock_sumo(10)
+    departed(traci, "trk1")
+    routes = RouteCache()
+    routes.change_target("trk1", ":junction_0", "p2")
+    assert routes.routes == {}
+
+
+def counted(function, *args):
+    counter = sim_backend.CallCounter()
+    sim_backend.count_calls(counter)
+    try:
+        function(*args)
+    finally:
+        sim_backend.count_calls(None)
+    return counter.calls
+
+
+def test_launcher_routes_from_the_subscribed_state(mock_sumo):
+    import Launcher
+    traci = mock_sumo(10)
+    departed(traci, "trk1", "trk2")
+    routes = RouteCache()
+    action = ET.fromstring('<action type="Go" target="out0" edge="out0" status="0"/>')
+    state = {tc.VAR_ROAD_ID: "in0", tc.VAR_SPEED_FACTOR: 0.5}
+    calls = counted(Launcher.assign_mission_action, "trk1", action, routes, state)
+    assert list(routes.routes) == [("in0", "out0", 5)]
+    assert calls == counted(RouteCache().change_target, "trk2", "in0", "out0", 0.5) # no getRoadID
@@ -0,0 +1,24 @@
+import pytest
+
+import sim_backend
+from sim_backend import traci
+
+
+@pytest.fixture
+def restore_backend():
+    name = sim_backend.backend_name()
+    yield
+    sim_backend.use_backend(name)
+
+
+def test_unknown_backend_is_rejected(restore_backend):
+    with pytest.raises(ValueError):
+        sim_backend.use_backend("sumo")
+
+
+def test_proxy_forwards_to_the_active_backend(restore_backend):
+    module = sim_backend.use_backend("traci")
+    assert sim_backend.backend_name() == "traci"
+    assert traci.vehicle is module.vehicle
+    assert traci.StepListener is module.StepListener # helper of the traci package
+    assert repr(traci) == "<SUMO backend proxy: traci>"
@@ -0,0 +1,62 @@
+import logging
+
+import pytest
+
+import sim_logging
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sim_logging, "time", clock)
+    return clock
+
+
+def record(category, message, *args, level=logging.INFO):
+    return logging.LogRecord(f"{sim_logging.ROOT_LOGGER}.{category}", level, __file__, 0, message, args, None)
+
+
+def passed(limiter, output, *records):
+    """Feeds the records through the filter to a GuiLogHandler; returns the lines written."""
+    for rec in records:
+        if limiter.filter(rec):
+            output.handle(rec)
+    return output.drain()
+
+
+def test_category_over_its_rate_is_suppressed(clock):
+    limiter = sim_logging.RateLimitFilter({"speed": 2})
+    output = sim_logging.GuiLogHandler()
+    lines = passed(limiter, output, *(record("speed", "trk%d slowed", i) for i in range(5)))
+    assert lines == ["trk0 slowed", "trk1 slowed"]
+    assert limiter.suppressed["speed"] == 3
+
+    clock.now = 0.5 # one token back
+    lines = passed(limiter, output, record("speed", "trk5 slowed"), record("speed", "trk6 slowed"))
+    assert lines == ["trk5 slowed [3 similar messages suppressed]"]
+    assert passed(limiter, output, *(record("fleet", "line %d", i) for i in range(10))) == [f"line {i}" for i in range(10)]
+
+
+def test_repeated_warning_is_written_once_per_interval(clock):
+    limiter = sim_logging.RateLimitFilter({})
+    output = sim_logging.GuiLogHandler()
+    unknown = [record("mission", "Capacity unknown for '%s'", "P9", level=logging.WARNING) for _ in range(4)]
+    other = record("mission", "Capacity unknown for '%s'", "P8", level=logging.WARNING)
+    assert passed(limiter, output, *unknown[:3], other) == ["Capacity unknown for 'P9'", "Capacity unknown for 'P8'"]
+    clock.now = sim_logging.WARNING_REPEAT_SECONDS
+    assert passed(limiter, output, unknown[3]) == ["Capacity unknown for 'P9' [2 similar messages suppressed]"]
+
+
+def test_errors_are_never_dropped(clock):
+    limiter = sim_logging.RateLimitFilter({"alert": 1})
+    output = sim_logging.GuiLogHandler()
+    errors = [record("alert", "TraCI error", level=logging.ERROR) for _ in range(3)]
+    assert passed(limiter, output, *errors) == ["TraCI error"] * 3
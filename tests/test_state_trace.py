@@ -0,0 +1,104 @@
+import os
+
+import pytest
+
+import bench_mock
+import Starter
+import state_trace
+
+HEADER = {"map": "MockPort", "mode": "Mode111", "nb_trucks": 2, "interval": 60,
+          "capacities": {"Parking1": 50}, "report_parkings": ["Parking1"]}
+
+
+def write_steps(path, steps):
+    writer = state_trace.TraceWriter(str(path), HEADER).open()
+    for step, trucks, occupancy in steps:
+        for truck in trucks:
+            writer.truck(*truck)
+        writer.end_step(step, len(trucks), 0, occupancy)
+    writer.close()
+
+
+STEPS = [
+    (1, [("trk1", "in0", 10.0, 0.0, 10.0, 1.0, 2.5, 0.01, False,
+          {"type": "Load", "target": "Crane1", "status": "1"})], {"Parking1": 0}),
+    (2, [("trk1", "a", 12.0, 0.0, 22.0, 0.5, 2.5, 0.01, False,
+          {"type": "Load", "target": "Crane1", "status": "1"}),
+         ("trk2", "in0", 0.0, 1.0, 0.0, 1.0, 0.0, 0.0, True,
+          {"type": "Unknown", "target": "Unknown", "status": "Unknown"})], {"Parking1": 1}),
+    (3, [("trk1", "out0", 13.9, 0.0, 400.0, 1.0, 2.5, 0.01, False,
+          {"type": "Go", "target": "out0", "status": "Completed"}),
+         ("trk2", "in0", 0.0, 2.0, 0.0, 1.0, 0.0, 0.0, True,
+          {"type": "N/A", "target": "N/A", "status": "No Missions"})], {"Parking1": 1}),
+]
+
+
+def test_round_trip_keeps_every_field(tmp_path):
+    path = tmp_path / "trace.bin"
+    write_steps(path, STEPS)
+    reader = state_trace.TraceReader(str(path))
+    assert reader.header["mode"] == "Mode111"
+    records = list(reader.steps())
+    assert [r.step for r in records] == [1, 2, 3]
+    assert [r.occupancy for r in records] == [{"Parking1": 0}, {"Parking1": 1}, {"Parking1": 1}]
+    for record, (_, trucks, _) in zip(records, STEPS):
+        assert record.in_trucks == len(trucks)
+        for state, truck in zip(record.trucks, trucks):
+            action = truck[-1]
+            assert tuple(state) == truck[:-1] + (action["type"], action["target"], action["status"])
+
+
+def test_truncated_trace_stops_at_the_last_complete_step(tmp_path):
+    path = tmp_path / "trace.bin"
+    write_steps(path, STEPS)
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:-10])
+    assert [r.step for r in state_trace.TraceReader(str(path)).steps()] == [1, 2]
+
+
+def test_reopened_writer_continues_the_string_table(tmp_path):
+    path = tmp_path / "trace.bin"
+    write_steps(path, STEPS[:2])
+    offset = os.path.getsize(path)
+    write_steps(path, STEPS) # run that went further, then resumed from offset
+    writer = state_trace.TraceWriter(str(path), HEADER).open(offset)
+    for truck in STEPS[2][1]:
+        writer.truck(*truck)
+    writer.end_step(3, 2, 0, STEPS[2][2])
+    writer.close()
+    records = list(state_trace.TraceReader(str(path)).steps())
+    assert [r.step for r in records] == [1, 2, 3]
+    assert records[2].trucks[0].action_status == "Completed"
+    assert state_trace.TraceReader(str(path)).read_strings(end=offset).count("trk1") == 1
+
+
+def test_other_trace_version_is_rejected(tmp_path):
+    path = tmp_path / "trace.bin"
+    write_steps(path, STEPS)
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data.replace(b'"version": %d' % state_trace.TRACE_VERSION, b'"version": 0'))
+    with pytest.raises(ValueError):
+        state_trace.TraceReader(str(path))
+
+
+def test_replay_rebuilds_the_reports(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    bench_mock.write_case(str(tmp_path), 20)
+    Starter.run_simulation(bench_mock.MAP_NAME, "Mode111", simulation_end_seconds=3000, monitor=False,
+                           record_trace=True)
+    folder = os.path.join("cases", bench_mock.MAP_NAME, "results", "Mode111")
+    replay_dir = str(tmp_path / "replay")
+    steps = state_trace.replay(state_trace.trace_file(folder, "Mode111"), replay_dir)
+    assert steps > 0
+    statuses = {t.action_status for r in state_trace.TraceReader(state_trace.trace_file(folder, "Mode111")).steps()
+                for t in r.trucks}
+    assert "Completed" in statuses
+    for name in os.listdir(replay_dir):
+        with open(os.path.join(folder, name), encoding="utf-8") as original, \
+                open(os.path.join(replay_dir, name), encoding="utf-8") as replayed:
+            skip = 1 if name.endswith("Truck Report.csv") else 0 # wall-clock line, not replayed
+            assert original.readlines()[skip:] == replayed.readlines()
@@ -0,0 +1,32 @@
+from step_profiler import LogHistogram, SUB_BUCKETS, bucket_of, bucket_upper_bound
+
+
+def test_small_values_have_their_own_bucket():
+    assert [bucket_of(v) for v in range(SUB_BUCKETS)] == list(range(SUB_BUCKETS))
+    assert [bucket_upper_bound(b) for b in range(SUB_BUCKETS)] == list(range(SUB_BUCKETS))
+
+
+def test_bucket_boundaries():
+    assert [bucket_of(v) for v in (8, 15, 16, 17, 18, 31, 32, 35, 36)] == [8, 15, 16, 16, 17, 23, 24, 24, 25]
+    assert [bucket_upper_bound(b) for b in (8, 15, 16, 17, 23, 24)] == [8, 15, 17, 19, 31, 35]
+    previous_bound = -1
+    for value in range(1 << 16):
+        bucket = bucket_of(value)
+        bound = bucket_upper_bound(bucket)
+        assert value <= bound # bounds are inclusive...
+        assert bucket == 0 or bucket_upper_bound(bucket - 1) < value # ...and buckets do not overlap
+        assert bound <= value * 1.125 + 1 # about 9% resolution
+        assert bound >= previous_bound
+        previous_bound = bound
+
+
+def test_percentile_at_bucket_boundaries():
+    histogram = LogHistogram()
+    assert histogram.percentile(0.5) == 0
+    for value in [16] * 50 + [18] * 45 + [1000] * 5:
+        histogram.add(value)
+    assert histogram.percentile(0.5) == 17 # exactly 50 samples in bucket 16..17
+    assert histogram.percentile(0.51) == 19
+    assert histogram.percentile(0.95) == 19
+    assert histogram.percentile(0.99) == 1000 # bucket bound 1023, capped at the maximum
+    assert (histogram.samples, histogram.total, histogram.maximum) == (100, 800 + 810 + 5000, 1000)
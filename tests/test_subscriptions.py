@@ -0,0 +1,67 @@
+import traci.constants as tc
+
+import sim_backend
+import subscriptions
+from subscriptions import VehicleSubscriptions
+
+
+def step(traci, subs):
+    traci.simulationStep()
+    counter = sim_backend.CallCounter()
+    sim_backend.count_calls(counter)
+    try:
+        subs.update()
+    finally:
+        sim_backend.count_calls(None)
+    return counter.calls
+
+
+def test_state_helpers():
+    assert subscriptions.speed_of({tc.VAR_SPEED: 4.5}) == 4.5
+    assert subscriptions.speed_of({}) == 0.0
+    assert subscriptions.is_stopped({tc.VAR_STOPSTATE: 1 | 2 | 128}) # parked in a parking area
+    assert not subscriptions.is_stopped({tc.VAR_STOPSTATE: 2})
+    assert not subscriptions.is_stopped({})
+
+
+def test_trucks_get_the_control_loop_variables():
+    subs = VehicleSubscriptions()
+    assert subs.is_truck("trk12") and not subs.is_truck("veh3")
+    assert {tc.VAR_ROAD_ID, tc.VAR_SPEED, tc.VAR_SPEED_FACTOR, tc.VAR_STOPSTATE} <= set(subscriptions.TRUCK_VARS)
+    assert subscriptions.BACKGROUND_VARS == (tc.VAR_SPEED,)
+
+
+def test_departed_vehicles_are_subscribed(mock_sumo):
+    traci = mock_sumo(10)
+    subs = VehicleSubscriptions()
+    subs.start()
+    calls = step(traci, subs)
+    assert subs.departed == ("trk1",)
+    assert calls == 3 # simulation results, vehicle results, one subscribe: no per-vehicle getter
+
+    calls = step(traci, subs)
+    assert subs.departed == ()
+    assert calls == 2
+    state = subs.get("trk1")
+    assert set(state) == set(subscriptions.TRUCK_VARS)
+    assert state[tc.VAR_ROAD_ID] == traci.vehicle.getRoadID("trk1")
+    assert not subscriptions.is_stopped(state)
+
+
+def test_stop_events(mock_sumo):
+    traci = mock_sumo(10)
+    subs = VehicleSubscriptions()
+    subs.start()
+    while "trk1" not in traci.vehicle.getIDList():
+        step(traci, subs)
+    traci.vehicle.setParkingAreaStop("trk1", "Parking1", duration=5)
+    traci.vehicle.changeTarget("trk1", "p1")
+    events = []
+    for _ in range(200):
+        calls = step(traci, subs)
+        assert calls <= 3
+        if "trk1" in subs.stop_events:
+            events.append(subscriptions.is_stopped(subs.get("trk1")))
+        if len(events) == 2:
+            break
+    assert events == [True, False] # stop started, then ended
@@ -0,0 +1,74 @@
+import random
+
+import numpy as np
+
+from truck_accumulators import FIELDS, StepBatch, TruckAccumulators
+
+
+def batch(*rows):
+    step_batch = StepBatch()
+    for row in rows:
+        step_batch.append(*row)
+    return step_batch
+
+
+def test_masked_adds():
+    accumulators = TruckAccumulators(3)
+    # index, distance (m), speed (m/s), speed factor, co2 (mg), nox (mg)
+    accumulators.add(batch((0, 1500.0, 10.0, 1.0, 2000.0, 300.0),
+                           (2, -1.0, 0.05, -1.0, -5.0, 0.0))) # invalid values are not added
+    assert list(accumulators["distances"]) == [1.5, 0.0, 0.0]
+    assert list(accumulators["speeds"]) == [36.0, 0.0, 0.05 * 3.6]
+    assert list(accumulators["speedFactors"]) == [1.0, 0.0, 0.0]
+    assert list(accumulators["co2s"]) == [2.0, 0.0, 0.0]
+    assert list(accumulators["noxs"]) == [0.3, 0.0, 0.0]
+    assert accumulators.waiting == 1 # below 0.1 m/s
+    accumulators.add(batch((0, 500.0, 0.0, 0.5, 0.0, 0.0)))
+    assert accumulators.total("distances") == 2.0
+    assert accumulators.waiting == 2
+
+
+def test_mean_step_speed():
+    accumulators = TruckAccumulators(2)
+    assert accumulators.mean_step_speed() == 0.0
+    accumulators.add(batch((0, 0.0, 10.0, 1.0, 0.0, 0.0), (1, 0.0, 20.0, 1.0, 0.0, 0.0)))
+    assert accumulators.mean_step_speed() == 54.0 # km/h, last step only
+    accumulators.add(batch())
+    assert accumulators.mean_step_speed() == 0.0
+
+
+def test_reset_keeps_the_arrays():
+    accumulators = TruckAccumulators(2)
+    speeds = accumulators["speeds"]
+    accumulators.add(batch((1, 100.0, 1.0, 1.0, 1.0, 1.0), (0, 0.0, 0.0, 1.0, 0.0, 0.0)))
+    state = accumulators.state()
+    accumulators.reset()
+    assert all(accumulators.total(name) == 0.0 for name in FIELDS)
+    assert accumulators.waiting == 0
+    assert not speeds.any() # zeroed in place
+    accumulators.load_state(state)
+    assert accumulators.total("distances") == 0.1 and accumulators.waiting == 1
+
+
+def test_same_sums_as_the_lists():
+    """Same results as the per-truck list arithmetic of the former step loop."""
+    rng = random.Random(3)
+    nb_trucks = 50
+    accumulators = TruckAccumulators(nb_trucks)
+    lists = {name: [0.0] * nb_trucks for name in FIELDS}
+    waiting = 0
+    for _ in range(100):
+        rows = [(i, rng.uniform(-5, 30), rng.choice([0.0, 0.05, rng.uniform(0, 20)]), rng.uniform(0.4, 1.2),
+                 rng.uniform(-10, 5000), rng.uniform(-10, 50)) for i in rng.sample(range(nb_trucks), 30)]
+        accumulators.add(batch(*rows))
+        for index, distance, speed_ms, speed_factor, co2, nox in rows:
+            if distance > 0: lists["distances"][index] += distance / 1000.0
+            if speed_ms >= 0: lists["speeds"][index] += speed_ms * 3.6
+            if speed_factor >= 0: lists["speedFactors"][index] += speed_factor
+            if co2 > 0: lists["co2s"][index] += co2 / 1000.0
+            if nox > 0: lists["noxs"][index] += nox / 1000.0
+            if speed_ms < 0.1: waiting += 1
+    for name in FIELDS:
+        assert np.allclose(accumulators[name], lists[name], rtol=0, atol=1e-9)
+        assert f"{accumulators.total(name):.3f}" == f"{sum(lists[name]):.3f}"
+    assert accumulators.waiting == waiting
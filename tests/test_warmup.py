@@ -0,0 +1,95 @@
+import os
+import shutil
+import xml.etree.ElementTree as ET
+
+import BatchRunner
+import bench_mock
+import Starter
+import warmup
+
+TRUCK_DELAY = 300 # s, trucks depart after the background traffic has started
+
+
+def write_case(mock_case, nb_trucks=20):
+    """MockPort with background cars from t=0 and the trucks departing from TRUCK_DELAY on."""
+    case_dir = mock_case(nb_trucks)
+    routes = os.path.join(case_dir, "MyRoutes.rou.xml")
+    vehicles = [(i * 5.0, f"car{i}", "in0 a b out0") for i in range(80)]
+    for el in ET.parse(routes).getroot().iter("vehicle"):
+        vehicles.append((float(el.get("depart")) + TRUCK_DELAY, el.get("id"), el.find("route").get("edges")))
+    with open(routes, "w") as f:
+        f.write("<routes>\n")
+        for depart, veh_id, edges in sorted(vehicles, key=lambda v: v[0]):
+            f.write(f'  <vehicle id="{veh_id}" depart="{depart:.2f}"><route edges="{edges}"/></vehicle>\n')
+        f.write("</routes>\n")
+    return case_dir
+
+
+def reports(mode):
+    folder = os.path.join("cases", bench_mock.MAP_NAME, "results", mode)
+    contents = {}
+    for name in ("_Truck Report.csv", "_DistancesRep.csv", "_co2sRep.csv"):
+        with open(os.path.join(folder, f"{mode}{name}"), encoding="utf-8") as f:
+            contents[name] = f.readlines()[1 if name == "_Truck Report.csv" else 0:]
+    return contents
+
+
+def test_first_truck_depart(tmp_path):
+    routes = tmp_path / "MyRoutes.rou.xml"
+    routes.write_text('<routes>\n'
+                      '  <vehicle id="car1" depart="0.00"><route edges="in0 a"/></vehicle>\n'
+                      f'  <vehicle id="trk2" depart="{TRUCK_DELAY + 60}.00"><route edges="in0 a"/></vehicle>\n'
+                      f'  <vehicle id="trk1" depart="{TRUCK_DELAY}.00"><route edges="in0 a"/></vehicle>\n'
+                      '</routes>\n')
+    assert warmup.first_truck_depart(str(routes)) == TRUCK_DELAY
+    assert warmup.first_truck_depart(str(routes), truck_prefix="bus") is None
+
+
+def test_headless_binary():
+    assert warmup.headless_binary(None) == "sumo"
+    assert warmup.headless_binary("sumo-gui") == "sumo"
+    assert warmup.headless_binary(os.path.join("opt", "bin", "sumo-gui")) == os.path.join("opt", "bin", "sumo")
+
+
+def test_warmup_key():
+    key = warmup.warmup_key("Nantes", "0123456789abcdef", 1, TRUCK_DELAY - 1)
+    assert key == f"Nantes_0123456789ab_seed1_t{TRUCK_DELAY - 1}"
+    assert warmup.warmup_dir("Nantes", key) == os.path.join("cases", "Nantes", ".cache", "warmup", key)
+
+
+def test_warmup_is_clamped_and_cached(mock_case, capsys):
+    write_case(mock_case)
+    directory = warmup.ensure(bench_mock.MAP_NAME, 1000, seed=1)
+    assert directory.endswith(f"_seed1_t{TRUCK_DELAY - 1}")
+    assert warmup.checkpoint_path(directory).endswith(f"step_{TRUCK_DELAY - 1:07d}")
+    capsys.readouterr()
+    assert warmup.ensure(bench_mock.MAP_NAME, 1000, seed=1) == directory
+    assert "Using cached warm-up" in capsys.readouterr().out
+
+
+def test_no_warmup_before_the_first_truck(mock_case):
+    mock_case(5) # trucks depart from t=0
+    assert warmup.ensure(bench_mock.MAP_NAME, 600) is None
+
+
+def test_forked_run_matches_a_full_run(mock_case):
+    write_case(mock_case)
+    full = Starter.run_simulation(bench_mock.MAP_NAME, "Mode111", simulation_end_seconds=3000, monitor=False, seed=1)
+    expected = reports("Mode111")
+    forked = Starter.run_simulation(bench_mock.MAP_NAME, "Mode111", simulation_end_seconds=3000, monitor=False, seed=1,
+                                    warmup_seconds=1000)
+    assert full["warmup"] is None
+    assert forked == dict(full, warmup=TRUCK_DELAY - 1)
+    assert reports("Mode111") == expected
+
+
+def test_batch_summary_records_the_warmup_used(mock_case):
+    write_case(mock_case)
+    cell = BatchRunner.build_cells([bench_mock.MAP_NAME], ["Mode111"], [1], [None], 3000, "sumo", "mock", warmup=1000)[0]
+    row = BatchRunner.run_cell(cell)
+    assert (row["status"], row["warmup"], row["warmup_used"]) == ("ok", 1000, TRUCK_DELAY - 1)
+
+    shutil.rmtree(os.path.join("cases", bench_mock.MAP_NAME))
+    mock_case(5) # trucks depart from t=0: nothing to fork from
+    row = BatchRunner.run_cell(dict(cell, mode="Mode000"))
+    assert (row["status"], row["warmup_used"]) == ("ok", 0)
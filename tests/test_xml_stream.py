@@ -0,0 +1,65 @@
+import os
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from xml_stream import XMLStreamWriter, merge_by_depart, write_vtype
+
+
+def vehicle(veh_id, depart):
+    el = ET.Element("vehicle", {"id": veh_id, "depart": depart})
+    ET.SubElement(el, "route", {"edges": "in0 a"})
+    return el
+
+
+def test_writer_output(tmp_path):
+    file_path = str(tmp_path / "MyRoutes.rou.xml")
+    with XMLStreamWriter(file_path, "routes") as writer:
+        writer.element("vType", {"id": "Truck"})
+        writer.write(vehicle("trk1", "0.00"))
+        writer.element("mission", {"id": "trk1"}, [("action", {"type": "Go", "target": "a & b"}, ())])
+    assert writer.count == 3
+    assert not os.path.exists(file_path + ".tmp")
+    with open(file_path, encoding="utf-8") as f:
+        assert f.read() == ('<?xml version="1.0" encoding="utf-8"?>\n<routes>\n'
+                            '  <vType id="Truck"/>\n'
+                            '  <vehicle id="trk1" depart="0.00">\n    <route edges="in0 a"/>\n  </vehicle>\n'
+                            '  <mission id="trk1">\n    <action type="Go" target="a &amp; b"/>\n  </mission>\n'
+                            '</routes>\n')
+    assert [el.tag for el in ET.parse(file_path).getroot()] == ["vType", "vehicle", "mission"]
+
+
+def test_raw_children_are_counted(tmp_path):
+    file_path = str(tmp_path / "missions.mis.xml")
+    with XMLStreamWriter(file_path, "missions") as writer:
+        writer.raw('\n  <mission id="trk1"/>\n  <mission id="trk2"/>', 2)
+        writer.element("mission", {"id": "trk3"})
+    assert writer.count == 3
+    assert [el.get("id") for el in ET.parse(file_path).getroot()] == ["trk1", "trk2", "trk3"]
+
+
+def test_error_keeps_the_previous_file(tmp_path):
+    file_path = tmp_path / "MyRoutes.rou.xml"
+    file_path.write_text("<routes/>")
+    with pytest.raises(RuntimeError):
+        with XMLStreamWriter(str(file_path), "routes") as writer:
+            writer.write(vehicle("trk1", "0.00"))
+            raise RuntimeError("generation failed")
+    assert file_path.read_text() == "<routes/>"
+    assert os.listdir(tmp_path) == ["MyRoutes.rou.xml"]
+
+
+def test_merge_by_depart():
+    trucks = [vehicle("trk1", "0.00"), vehicle("trk2", "10.00")]
+    cars = [vehicle("car1", "0.00"), vehicle("car2", "5.00"), vehicle("car3", "20.00")]
+    assert [el.get("id") for el in merge_by_depart(trucks, cars)] == ["trk1", "car1", "car2", "trk2", "car3"]
+
+
+def test_write_vtype(tmp_path):
+    file_path = str(tmp_path / "MyRoutes.rou.xml")
+    with XMLStreamWriter(file_path, "routes") as writer:
+        write_vtype(writer, "Truck")
+        write_vtype(writer, "MissionVehicle")
+    truck, car = ET.parse(file_path).getroot()
+    assert truck.attrib == {"id": "Truck", "vClass": "trailer", "guiShape": "truck"}
+    assert (car.get("vClass"), car.get("maxSpeed")) == ("passenger", "25")
@@ -0,0 +1,76 @@
+"""Per-truck interval accumulators (distance, speed, speed factor, CO2, NOx) backed by NumPy."""
+import numpy as np
+
+FIELDS = ("distances", "speeds", "speedFactors", "co2s", "noxs")
+WAITING_SPEED = 0.1 # m/s, below this a truck counts as waiting
+
+
+class TruckAccumulators:
+    """
+    Structured array indexed by truck index (trkN -> N-1), one column per series.
+
+    Each step the control loop collects the trucks' values in a StepBatch and
+    calls add(); the masked adds are applied to all trucks at once. reset()
+    zeroes the columns in place at the end of a reporting interval.
+    """
+
+    def __init__(self, nb_trucks):
+        self.data = np.zeros(nb_trucks, dtype=[(name, "f8") for name in FIELDS])
+        self.waiting = 0 # truck-steps below WAITING_SPEED in the current interval
+        self.last_speeds_kmh = np.zeros(0)
+
+    def __getitem__(self, name):
+        return self.data[name]
+
+    def total(self, name):
+        return float(self.data[name].sum())
+
+    def add(self, batch):
+        """Applies one step of truck values (see StepBatch)."""
+        if not batch.indices:
+            self.last_speeds_kmh = np.zeros(0)
+            return
+        idx = np.asarray(batch.indices, dtype=np.intp)
+        distance, speed_ms, speed_factor, co2, nox = np.asarray(batch.values, dtype=np.float64).T
+        speed_kmh = speed_ms * 3.6
+        data = self.data
+        # Indices are unique within a step, so plain fancy-index adds are safe
+        data["distances"][idx] += np.where(distance > 0, distance / 1000.0, 0.0)
+        data["speeds"][idx] += np.where(speed_ms >= 0, speed_kmh, 0.0)
+        data["speedFactors"][idx] += np.where(speed_factor >= 0, speed_factor, 0.0)
+        data["co2s"][idx] += np.where(co2 > 0, co2 / 1000.0, 0.0)
+        data["noxs"][idx] += np.where(nox > 0, nox / 1000.0, 0.0)
+        self.waiting += int(np.count_nonzero(speed_ms < WAITING_SPEED))
+        self.last_speeds_kmh = speed_kmh
+
+    def mean_step_speed(self):
+        """Average speed (km/h) of the trucks in the last step added."""
+        return float(self.last_speeds_kmh.mean()) if self.last_speeds_kmh.size else 0.0
+
+    def state(self):
+        """Copy of the interval state, for checkpoints."""
+        return {"data": self.data.copy(), "waiting": self.waiting, "last_speeds_kmh": self.last_speeds_kmh.copy()}
+
+    def load_state(self, state):
+        self.data[:] = state["data"]
+        self.waiting = state["waiting"]
+        self.last_speeds_kmh = state["last_speeds_kmh"]
+
+    def reset(self):
+        """Starts a new reporting interval."""
+        for name in FIELDS:
+            self.data[name].fill(0.0)
+        self.waiting = 0
+
+
+class StepBatch:
+    """Truck values gathered during one step, handed to TruckAccumulators.add()."""
+    __slots__ = ("indices", "values")
+
+    def __init__(self):
+        self.indices = []
+        self.values = []
+
+    def append(self, index, distance, speed_ms, speed_factor, co2, nox):
+        self.indices.append(index)
+        self.values.append((distance, speed_ms, speed_factor, co2, nox))
@@ -0,0 +1,135 @@
+"""
+Warm-up cache shared by the mode variants of a comparison sweep.
+
+A warm-up is a run of the map up to a fixed time with no mode-specific logic
+(no initMode, no C-ITS branches), saved as a checkpoint (see checkpoint.py) in
+    cases/<map>/.cache/warmup/<key>/checkpoints/step_<T>/
+    cases/<map>/.cache/warmup/<key>/results/           reports of steps 1..T
+keyed by map, demand hash (routes + missions files), seed and warm-up time.
+Each Mode000..Mode111 run then loads that state, applies its mode and continues,
+so the sweep pays the warm-up once and all modes share the same random numbers
+up to the fork point.
+
+The warm-up ends before the first truck departs, so the saved mission state is
+the initial one and no mission decision depends on the mode before the fork.
+The time actually used (clamped, or 0 when trucks depart from the start) is in
+the run summary of Starter.run_simulation and in BatchRunner's batch_summary.csv.
+"""
+import hashlib
+import os
+import shutil
+import xml.etree.ElementTree as ET
+
+import checkpoint
+from metrics_sink import SERIES_FILES
+
+WARMUP_MODE = "Warmup"
+
+
+def demand_hash(*file_paths):
+    sha1 = hashlib.sha1()
+    for file_path in file_paths:
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def warmup_key(map_name, digest, seed, warmup_time):
+    return f"{map_name}_{digest[:12]}_seed{seed}_t{warmup_time}"
+
+
+def warmup_dir(map_name, key):
+    return os.path.join("cases", map_name, ".cache", "warmup", key)
+
+
+def first_truck_depart(routes_file, truck_prefix="trk"):
+    """Earliest depart time of the trucks of a routes file, None if there is none."""
+    first = None
+    for _, el in ET.iterparse(routes_file, events=("end",)):
+        if el.tag == "vehicle":
+            if truck_prefix in el.get("id", ""):
+                depart = float(el.get("depart", "0"))
+                first = depart if first is None else min(first, depart)
+            el.clear()
+    return first
+
+
+def headless_binary(sumo_binary):
+    """sumo instead of sumo-gui: the saved state does not depend on the GUI."""
+    if not sumo_binary:
+        return "sumo"
+    head, tail = os.path.split(sumo_binary)
+    return os.path.join(head, tail.replace("sumo-gui", "sumo")) if head else tail.replace("sumo-gui", "sumo")
+
+
+def checkpoint_path(directory):
+    return checkpoint.latest(os.path.join(directory, "checkpoints"))
+
+
+def ensure(map_name, warmup_time, seed=None, instance_dir=None, sumo_binary=None, backend=None):
+    """
+    Returns the warm-up folder of (map, demand, seed, time), running the warm-up if it is not cached.
+    The warm-up time is clamped to just before the first truck departure; None if nothing is left.
+    """
+    import Starter
+    instance_path = instance_dir or os.path.join("cases", map_name)
+    routes_file = os.path.join(instance_path, "MyRoutes.rou.xml")
+    missions_file = os.path.join(instance_path, "missions.mis.xml")
+
+    warmup_time = int(warmup_time)
+    first_depart = first_truck_depart(routes_file)
+    if first_depart is not None and warmup_time >= first_depart:
+        warmup_time = int(first_depart) - 1
+        print(f"Warm-up clamped to {warmup_time}s (first truck departs at {first_depart}s).")
+    if warmup_time <= 0:
+        print("No warm-up possible before the first truck departure.")
+        return None
+
+    key = warmup_key(map_name, demand_hash(routes_file, missions_file), seed, warmup_time)
+    directory = warmup_dir(map_name, key)
+    if checkpoint_path(directory) is not None:
+        print(f"Using cached warm-up {directory}")
+        return directory
+
+    print(f"Building warm-up {key} ({warmup_time}s)...")
+    tmp_dir = f"{directory}.tmp{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    Starter.run_simulation(map_name, WARMUP_MODE, simulation_end_seconds=warmup_time,
+                           sumo_binary=headless_binary(sumo_binary), instance_dir=instance_dir,
+                           results_dir=os.path.join(tmp_dir, "results"), seed=seed,
+                           label=f"warmup_{key}", monitor=False, backend=backend,
+                           checkpoint_every=warmup_time, checkpoint_dir=os.path.join(tmp_dir, "checkpoints"),
+                           output_prefix=f"{WARMUP_MODE}_{key}_")
+    if checkpoint_path(tmp_dir) is None:
+        print(f"ERROR: warm-up {key} did not produce a checkpoint.")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return None
+    try:
+        os.rename(tmp_dir, directory)
+    except OSError:
+        # Built concurrently by another worker: keep theirs
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return directory
+
+
+def fork_results(directory, results_dir, mode):
+    """
+    Copies the warm-up reports into results_dir under the mode's file names.
+    Returns the MetricsSink offsets to continue them from.
+    """
+    source = os.path.join(directory, "results")
+    os.makedirs(results_dir, exist_ok=True)
+    offsets = {}
+    for name, suffix in SERIES_FILES.items():
+        target = os.path.join(results_dir, f"{mode}{suffix}")
+        shutil.copyfile(os.path.join(source, f"{WARMUP_MODE}{suffix}"), target)
+        offsets[name] = os.path.getsize(target)
+    # The exported report starts with a "Simulation started at" line that MetricsSink adds on close
+    target = os.path.join(results_dir, f"{mode}_Truck Report.part.csv")
+    with open(os.path.join(source, f"{WARMUP_MODE}_Truck Report.csv"), "r", encoding="utf-8") as f_in, \
+            open(target, "w", encoding="utf-8", newline="") as f_out:
+        f_in.readline()
+        shutil.copyfileobj(f_in, f_out)
+    offsets["report"] = os.path.getsize(target)
+    return offsets
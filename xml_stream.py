@@ -0,0 +1,125 @@
+"""Incremental XML writer for the generated route and mission files."""
+import heapq
+import os
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import XMLGenerator
+
+
+class XMLStreamWriter:
+    """
+    Writes one root element and its children to disk as they are produced, so
+    memory stays flat whatever the number of vehicles or missions.
+
+    Output goes to '<file>.tmp' and is moved in place on a clean close; on error
+    the partial file is removed and the previous file is left untouched.
+
+    with XMLStreamWriter("MyRoutes.rou.xml", "routes") as writer:
+        writer.element("vType", {"id": "Truck"})
+        writer.write(vehicle_element)
+    """
+
+    def __init__(self, file_path, root_tag, root_attrs=None, indent="  ", encoding="utf-8"):
+        self.file_path = file_path
+        self.root_tag = root_tag
+        self.root_attrs = root_attrs or {}
+        self.indent = indent  # None or "" writes everything on one line
+        self.encoding = encoding
+        self.count = 0  # top-level children written
+        self._tmp_path = file_path + ".tmp"
+        self._file = None
+        self._gen = None
+
+    def open(self):
+        self._file = open(self._tmp_path, "w", encoding=self.encoding, newline="\n")
+        self._gen = XMLGenerator(self._file, self.encoding, short_empty_elements=True)
+        self._gen.startDocument()
+        self._gen.startElement(self.root_tag, self.root_attrs)
+        return self
+
+    def _newline(self, depth):
+        if self.indent:
+            self._gen.ignorableWhitespace("\n" + self.indent * depth)
+
+    def element(self, tag, attrs=None, children=(), depth=1):
+        """Writes <tag attrs> with children given as ET.Element or (tag, attrs, children) tuples."""
+        self._newline(depth)
+        self._gen.startElement(tag, attrs or {})
+        has_children = False
+        for child in children:
+            has_children = True
+            if isinstance(child, tuple):
+                self.element(*child, depth=depth + 1)
+            else:
+                self.write(child, depth + 1)
+        if has_children:
+            self._newline(depth)
+        self._gen.endElement(tag)
+        if depth == 1:
+            self.count += 1
+
+    def write(self, el, depth=1):
+        """Writes an xml.etree.ElementTree.Element (text and tail are dropped, as in the generated files)."""
+        self.element(el.tag, el.attrib, list(el), depth)
+
+    def raw(self, text, count=0):
+        """
+        Writes already rendered top-level children (escaped, each starting with its newline and indent).
+        Args:
+            text (str): The rendered elements.
+            count (int): Number of elements in text.
+        """
+        self._gen.ignorableWhitespace(text) # also closes a pending start tag
+        self.count += count
+
+    def close(self):
+        if self._file is None:
+            return
+        self._newline(0)
+        self._gen.endElement(self.root_tag)
+        self._gen.ignorableWhitespace("\n")
+        self._gen.endDocument()
+        self._file.close()
+        self._file = None
+        os.replace(self._tmp_path, self.file_path)
+
+    def abort(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def merge_by_depart(*sources):
+    """
+    Merges iterables of <vehicle> elements, each already sorted by depart time.
+    On equal departs the earlier source comes first (same order as a stable sort).
+    """
+    return heapq.merge(*sources, key=lambda veh: float(veh.get("depart")))
+
+
+def write_vtype(writer, vehicle_type):
+    """Writes the <vType> of the generated trucks: "Truck" (trailer) or "MissionVehicle" (passenger)."""
+    vtype = ET.Element("vType")
+    vtype.set("id", vehicle_type)
+
+    if vehicle_type == "Truck":
+        vtype.set("vClass", "trailer")
+        vtype.set("guiShape", "truck")
+    else:  # MissionVehicle
+        vtype.set("vClass", "passenger")
+        vtype.set("guiShape", "passenger")
+        vtype.set("color", "0,0,255")
+        vtype.set("accel", "2.6")
+        vtype.set("decel", "4.5")
+        vtype.set("length", "4.5")
+        vtype.set("maxSpeed", "25")
+    writer.write(vtype)